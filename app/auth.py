@@ -2,13 +2,24 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from typing import Optional
-from fastapi import HTTPException, status, Depends
+from uuid import UUID
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from app.schemas import TokenData
-from app.database import get_db
-from app import crud
+from app.database import get_db, last_write_seq
+from app import database
+from app.cache import TTLCache
+from app.models import User
+from app import crud, events
 import secrets
+import asyncio
+import hashlib
+import time
+import os
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -20,9 +31,96 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Authenticated user cache. Changes to a user are broadcast through the
+# event broker, so with EVENTS_BACKEND=postgres every worker drops the entry
+# after commit; with the in-process backend under several workers, or when
+# a notification is lost, other workers may serve the old user for up to
+# USER_CACHE_TTL seconds
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+# Prefix of user cache keys sent over the event broker
+USER_CACHE_INVALIDATION_PREFIX = "user:"
+
+# Verified token cache
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+
+# Password hashing runs on its own threads, bcrypt releases the GIL
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "64"))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+
 # Security scheme
 security = HTTPBearer()
 
+# Resolved users keyed by the token's "sub" claim
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+# Verified payloads keyed by token type and a digest of the token, each
+# entry expires together with the token itself
+token_cache = TTLCache(TOKEN_CACHE_SIZE, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+# Executor for bcrypt work and the number of jobs running or waiting on it
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_password_jobs = 0
+
+
+def _user_cache_key(user_id) -> str:
+    """Canonical form of a user id, whichever way it was serialized"""
+    try:
+        return str(UUID(str(user_id)))
+    except ValueError:
+        return str(user_id)
+
+
+def invalidate_cached_user(user_id):
+    """Drop a user from the authenticated user cache of every process"""
+    events.broker.invalidate(USER_CACHE_INVALIDATION_PREFIX + _user_cache_key(user_id))
+
+
+def _on_cache_invalidation(key: Optional[str]):
+    """Apply an invalidation received from the event broker"""
+    if key is None:
+        user_cache.clear()
+    elif key.startswith(USER_CACHE_INVALIDATION_PREFIX):
+        user_cache.invalidate(key[len(USER_CACHE_INVALIDATION_PREFIX):])
+
+
+events.broker.add_invalidation_listener(_on_cache_invalidation)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    """Remember users updated or deleted in this transaction"""
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            session.info.setdefault("changed_user_ids", set()).add(obj.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_user_changes(orm_execute_state):
+    """Bulk UPDATE/DELETE on users can't be traced to ids, drop everything"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is User:
+            orm_execute_state.session.info["clear_user_cache"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    """Evict changed users once their new state is committed"""
+    if session.info.pop("clear_user_cache", False):
+        events.broker.invalidate(None)
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_cached_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    """Changes that were rolled back never reached the database"""
+    session.info.pop("changed_user_ids", None)
+    session.info.pop("clear_user_cache", None)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password"""
@@ -34,12 +132,44 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_password_job(func, *args):
+    """Run a bcrypt call on the password executor without blocking the loop.
+
+    Raises 503 with Retry-After once PASSWORD_HASH_QUEUE_SIZE jobs are
+    already waiting for a worker.
+    """
+    global _password_jobs
+    if _password_jobs >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again later",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+        )
+
+    _password_jobs += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        _password_jobs -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password executor"""
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the password executor"""
+    return await _run_password_job(get_password_hash, password)
+
+
 async def authenticate_user(db: AsyncSession, email: str, password: str):
     """Authenticate a user by email and password"""
     user = await crud.get_user_by_email(db, email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
@@ -66,16 +196,30 @@ def create_refresh_token(data: dict):
 
 
 def verify_token(token: str, token_type: str = "access"):
-    """Verify and decode a JWT token"""
+    """Verify and decode a JWT token.
+
+    Verified payloads are cached until the token's own expiry, so a token
+    sent again skips signature verification. Any modified token has a
+    different digest and is verified from scratch.
+    """
+    cache_key = (token_type, hashlib.sha256(token.encode("utf-8")).digest())
+    payload = token_cache.get(cache_key)
+    if payload is not None:
+        return payload
+
     try:
         secret_key = SECRET_KEY if token_type == "access" else REFRESH_SECRET_KEY
         payload = jwt.decode(token, secret_key, algorithms=[ALGORITHM])
         if payload.get("type") != token_type:
             return None
-        return payload
     except JWTError:
         return None
 
+    expires_in = payload.get("exp", 0) - time.time()
+    if expires_in > 0:
+        token_cache.set(cache_key, payload, expires_at=time.monotonic() + expires_in)
+    return payload
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -99,7 +243,14 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = await crud.get_user(db, user_id)
+    cache_key = _user_cache_key(user_id)
+    user = user_cache.get(cache_key)
+    if user is None:
+        user = await crud.get_user(db, user_id)
+        if user is not None:
+            # Detach it so a later commit or rollback can't expire the cached copy
+            db.expunge(user)
+            user_cache.set(cache_key, user)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -110,6 +261,27 @@ async def get_current_user(
     return user
 
 
+async def get_read_db(
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """Yield a session on the read replica for the current user.
+
+    A client that wrote recently sends back the change_seq of that write
+    in the read-your-writes cookie. While the replica's stats row of the
+    user is behind it, the read is served by the primary instead, so this
+    holds whichever worker took the write.
+    """
+    change_seq = last_write_seq(request, current_user.id)
+    async with database.AsyncReadSessionLocal() as session:
+        if change_seq is None or await crud.get_change_seq(session, current_user.id) >= change_seq:
+            yield session
+            return
+
+    async with database.AsyncSessionLocal() as session:
+        yield session
+
+
 def create_token_pair(user_id: str):
     """Create both access and refresh tokens"""
     access_token = create_access_token(data={"sub": user_id})
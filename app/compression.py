@@ -0,0 +1,148 @@
+import os
+import zlib
+from typing import AsyncIterable, AsyncIterator, Union
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Complete responses smaller than this are sent uncompressed
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+
+# zlib level: 1 is fastest, 9 is smallest
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+
+# Media types worth compressing; already compressed downloads are skipped
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml")
+
+# Event streams have to reach the client one event at a time
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+def _gzip_compressor(level: int):
+    # wbits=31 writes a gzip header and trailer instead of a raw zlib stream
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Check whether an Accept-Encoding header allows gzip"""
+    for coding in accept_encoding.lower().split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip() not in ("gzip", "*"):
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def is_compressible(content_type: str) -> bool:
+    """Check whether a response with this media type should be compressed"""
+    content_type = content_type.lower()
+    if content_type.startswith(UNCOMPRESSED_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+async def gzip_stream(
+    chunks: AsyncIterable[Union[str, bytes]],
+    level: int = GZIP_LEVEL
+) -> AsyncIterator[bytes]:
+    """Compress a stream into a gzip file, one output piece per input chunk"""
+    compressor = _gzip_compressor(level)
+    async for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class GZipMiddleware:
+    """Compresses responses with gzip when the client accepts it.
+
+    Streamed bodies are compressed as they are sent: every body message is
+    flushed with Z_SYNC_FLUSH, so the client receives each piece without the
+    response being buffered and memory stays bounded by the zlib window.
+    A complete body below ``minimum_size`` is sent as is.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = GZIP_MIN_SIZE, level: int = GZIP_LEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not accepts_gzip(Headers(scope=scope).get("accept-encoding", "")):
+            await self.app(scope, receive, send)
+            return
+        await _GZipResponder(self.minimum_size, self.level, send)(self.app, scope, receive)
+
+
+class _GZipResponder:
+    """Per-request state: holds the start message until the first body message"""
+
+    def __init__(self, minimum_size: int, level: int, send: Send):
+        self.minimum_size = minimum_size
+        self.level = level
+        self.send = send
+        self.start_message: Message = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, app: ASGIApp, scope: Scope, receive: Receive):
+        await app(scope, receive, self.send_with_gzip)
+
+    async def send_with_gzip(self, message: Message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.start_message = message
+            self.passthrough = (
+                "content-encoding" in headers
+                or not is_compressible(headers.get("content-type", ""))
+            )
+            if not self.passthrough:
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send_start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self._send_start()
+                await self.send(message)
+                return
+
+            self.compressor = _gzip_compressor(self.level)
+            data = self._compress(body, more_body)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = "gzip"
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(data))
+            await self._send_start()
+        else:
+            data = self._compress(body, more_body)
+
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        data = self.compressor.compress(body)
+        return data + self.compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+
+    async def _send_start(self):
+        if self.start_message is not None:
+            await self.send(self.start_message)
+            self.start_message = None
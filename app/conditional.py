@@ -0,0 +1,39 @@
+from typing import Optional
+from uuid import UUID
+
+from fastapi import Response, status
+
+# Clients may keep the response but have to revalidate it on every use
+REVALIDATE = "private, no-cache"
+
+
+def bookmarks_etag(owner_id: UUID, change_seq: int) -> str:
+    """ETag for any view of the user's bookmarks.
+
+    Weak, since gzip and the export formats change the bytes but not what
+    the client has to resync.
+    """
+    return f'W/"{owner_id}.{change_seq}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def cache_headers(etag: str) -> dict:
+    """Validator headers sent with full and 304 responses"""
+    return {"ETag": etag, "Cache-Control": REVALIDATE}
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a client whose copy is current"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
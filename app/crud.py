@@ -1,13 +1,46 @@
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy import and_, or_, desc, func
-from app.models import User, Bookmark, BookmarkStatus, AccessLevel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload, aliased
+from sqlalchemy import and_, or_, desc, func, tuple_, update, insert, delete, true, any_, case, cast, column, literal, literal_column, values as value_rows, Boolean, Integer, BigInteger, String, Text
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from app.models import User, Bookmark, BookmarkStatus, AccessLevel, UserBookmarkStats, BookmarkTombstone, SyncDevice, Job, JobKind, JobStatus
 from app.schemas import UserCreate, BookmarkCreate, BookmarkUpdate
-from app.auth import get_password_hash
-from typing import List, Optional, Tuple
-from uuid import UUID
+from app.auth import get_password_hash_async
+from app.database import pin_to_primary
+from app import events, suggest
+from app.urls import url_hash
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+from uuid import UUID, uuid4
 from datetime import datetime
+from itertools import groupby
+
+# Maximum number of bookmarks on a free account
+FREE_TIER_BOOKMARK_LIMIT = 100
+
+# Rows per INSERT statement in bulk writes
+IMPORT_CHUNK_SIZE = 500
+
+
+# What an import does with a bookmark whose URL the user already has
+DUPLICATE_MODES = ("skip", "merge", "overwrite")
+
+
+class DuplicateURLError(ValueError):
+    """Raised when a write would give a user two bookmarks of the same URL"""
+
+
+# Sort orders of GET /bookmarks, each backed by its own indexes
+BOOKMARK_SORTS = ("created_at", "updated_at", "title")
+
+
+class BookmarkFilter(NamedTuple):
+    status: Optional[BookmarkStatus] = None
+    access_level: Optional[AccessLevel] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    # Compared with updated_at, or created_at for never edited bookmarks
+    updated_after: Optional[datetime] = None
 
 
 # User CRUD operations
@@ -30,22 +63,20 @@ async def get_user_by_email(db: AsyncSession, email: str):
 
 
 async def create_user(db: AsyncSession, user: UserCreate):
-    """Create a new user"""
-    # Hash the password
-    hashed_password = get_password_hash(user.password)
+    """Create a new user together with an empty stats row.
 
-    # Create the user object
-    db_user = User(
-        username=user.username, 
-        email=user.email, 
-        hashed_password=hashed_password
-    )
+    The INSERT returns the generated columns, so the user is not read back.
+    """
+    hashed_password = await get_password_hash_async(user.password)
 
-    # Add to database
-    db.add(db_user)
+    result = await db.execute(
+        insert(User)
+        .values(username=user.username, email=user.email, hashed_password=hashed_password)
+        .returning(User)
+    )
+    db_user = result.scalar_one()
+    await db.execute(insert(UserBookmarkStats).values(user_id=db_user.id))
     await db.commit()
-    await db.refresh(db_user)
-
     return db_user
 
 
@@ -60,21 +91,227 @@ async def get_bookmark(db: AsyncSession, bookmark_id: UUID, owner_id: UUID):
     return result.scalar_one_or_none()
 
 
+def _sort_order(columns, sort: str):
+    """The value a listing is sorted by, its ORDER BY and whether it descends.
+
+    ``columns`` is the bookmarks table's or a page subquery's columns.
+    """
+    if sort == "updated_at":
+        # Never edited bookmarks count as modified when they were created
+        key = func.coalesce(columns.updated_at, columns.created_at)
+    else:
+        key = columns[sort]
+    descending = sort != "title"
+    if descending:
+        return key, (desc(key), desc(columns.id)), True
+    return key, (key, columns.id), False
+
+
+def _user_bookmarks_query(
+    owner_id: UUID,
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[Tuple[Any, UUID]] = None,
+    sort: str = "created_at",
+    filters: Optional[BookmarkFilter] = None
+):
+    """Build the page query shared by the list functions"""
+    query = select(Bookmark).filter(Bookmark.owner_id == owner_id)
+    key, order, descending = _sort_order(Bookmark.__table__.c, sort)
+
+    if filters is not None:
+        if filters.status is not None:
+            # Inlined so the planner can match the partial indexes on
+            # status even when the statement runs as a generic plan
+            query = query.filter(Bookmark.status == literal_column(f"'{filters.status.name}'"))
+        if filters.access_level is not None:
+            query = query.filter(Bookmark.access_level == filters.access_level)
+        if filters.created_after is not None:
+            query = query.filter(Bookmark.created_at > filters.created_after)
+        if filters.created_before is not None:
+            query = query.filter(Bookmark.created_at < filters.created_before)
+        if filters.updated_after is not None:
+            query = query.filter(func.coalesce(Bookmark.updated_at, Bookmark.created_at) > filters.updated_after)
+
+    if cursor is not None:
+        value, bookmark_id = cursor
+        position = tuple_(key, Bookmark.id)
+        after = tuple_(value, UUID(str(bookmark_id)))
+        query = query.filter(position < after if descending else position > after)
+    else:
+        query = query.offset(offset)
+
+    return query.order_by(*order).limit(limit)
+
+
 async def get_user_bookmarks(
     db: AsyncSession, 
     owner_id: UUID, 
     limit: int = 50, 
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[Tuple[Any, UUID]] = None,
+    sort: str = "created_at",
+    filters: Optional[BookmarkFilter] = None
 ):
-    """Get bookmarks for a user"""
-    result = await db.execute(
-        select(Bookmark)
+    """Get bookmarks for a user, newest first by default.
+
+    When ``cursor`` is given, the page starts right after that (sort value,
+    id) position instead of skipping ``offset`` rows, so deep pages cost
+    the same as the first one.
+    """
+    result = await db.execute(_user_bookmarks_query(owner_id, limit, offset, cursor, sort, filters))
+    return result.scalars().all()
+
+
+async def get_bookmark_page(
+    db: AsyncSession,
+    owner_id: UUID,
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[Tuple[Any, UUID]] = None,
+    include_total: bool = True,
+    sort: str = "created_at",
+    filters: Optional[BookmarkFilter] = None
+) -> Tuple[List[Bookmark], Optional[int], bool]:
+    """Get one page of bookmarks with its total count in a single statement.
+
+    One extra row is fetched to tell whether another page exists. With
+    ``include_total`` the page is left-joined onto the user's stats row, so
+    the total comes back in the same round trip even when the page is empty.
+    The stored total counts all of the user's bookmarks, so it isn't
+    available together with ``filters``.
+
+    Returns (bookmarks, total_count, has_more); total_count is None when
+    ``include_total`` is false or the page is filtered.
+    """
+    page_query = _user_bookmarks_query(owner_id, limit + 1, offset, cursor, sort, filters)
+
+    if include_total and filters is None:
+        page = page_query.subquery()
+        page_bookmark = aliased(Bookmark, page)
+        _, order, _ = _sort_order(page.c, sort)
+        result = await db.execute(
+            select(UserBookmarkStats.bookmark_count, page_bookmark)
+            .select_from(UserBookmarkStats)
+            .outerjoin(page, true())
+            .filter(UserBookmarkStats.user_id == owner_id)
+            .order_by(*order)
+        )
+        rows = result.all()
+        total_count = rows[0].bookmark_count if rows else 0
+        bookmarks = [row[1] for row in rows if row[1] is not None]
+    else:
+        result = await db.execute(page_query)
+        total_count = None
+        bookmarks = result.scalars().all()
+
+    has_more = len(bookmarks) > limit
+    return bookmarks[:limit], total_count, has_more
+
+
+async def stream_user_bookmarks(
+    db: AsyncSession,
+    owner_id: UUID,
+    chunk_size: int = 1000
+):
+    """Yield all bookmarks of a user, newest first, in chunks of rows.
+
+    Rows come from a server-side cursor and are plain rows rather than ORM
+    objects, so memory use doesn't grow with the size of the account.
+    """
+    columns = [col for col in Bookmark.__table__.c if col.key != "search_vector"]
+    result = await db.stream(
+        select(*columns)
         .filter(Bookmark.owner_id == owner_id)
-        .order_by(desc(Bookmark.created_at))
+        .order_by(desc(Bookmark.created_at), desc(Bookmark.id))
+        .execution_options(yield_per=chunk_size)
+    )
+    async for rows in result.partitions():
+        yield rows
+
+
+class SearchPage(NamedTuple):
+    bookmarks: List[Bookmark]
+    # (rank, id) of the last bookmark, the cursor for the next page
+    last_position: Optional[Tuple[float, UUID]]
+    has_more: bool
+
+
+async def search_bookmarks(
+    db: AsyncSession,
+    owner_id: UUID,
+    query: str,
+    limit: int = 50,
+    cursor: Optional[Tuple[float, UUID]] = None
+) -> SearchPage:
+    """Full-text search over the user's bookmarks, best match first.
+
+    ``query`` takes web search syntax: words, "quoted phrases", OR and
+    -word. Matches are ranked with ts_rank_cd over the weighted
+    search_vector and paged by (rank, id), so a page after ``cursor``
+    doesn't rank the skipped matches again.
+    """
+    ts_query = func.websearch_to_tsquery(literal_column("'simple'"), query)
+    rank = func.ts_rank_cd(Bookmark.search_vector, ts_query)
+    page_query = select(Bookmark, rank).filter(
+        Bookmark.owner_id == owner_id,
+        Bookmark.search_vector.bool_op("@@")(ts_query)
+    )
+    if cursor is not None:
+        cursor_rank, bookmark_id = cursor
+        page_query = page_query.filter(
+            tuple_(rank, Bookmark.id) < tuple_(cursor_rank, UUID(str(bookmark_id)))
+        )
+
+    result = await db.execute(page_query.order_by(desc(rank), desc(Bookmark.id)).limit(limit + 1))
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    last_position = (rows[-1][1], rows[-1][0].id) if rows else None
+    return SearchPage([row[0] for row in rows], last_position, has_more)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def suggest_bookmarks(
+    db: AsyncSession,
+    owner_id: UUID,
+    prefix: str,
+    limit: int = 10
+) -> List[suggest.Suggestion]:
+    """Typeahead matches for ``prefix`` among the user's titles and URLs.
+
+    Postgres matches substrings through the pg_trgm indexes, titles that
+    start with the prefix first. Other databases use the in-memory prefix
+    index from app.suggest, which matches the start of words.
+    """
+    if db.bind.dialect.name != "postgresql":
+        async def load_rows():
+            result = await db.execute(
+                select(Bookmark.id, Bookmark.title, Bookmark.url).filter(Bookmark.owner_id == owner_id)
+            )
+            return result.all()
+
+        change_seq = await get_change_seq(db, owner_id)
+        return await suggest.suggest_from_index(owner_id, change_seq, prefix, limit, load_rows)
+
+    escaped = _escape_like(prefix)
+    result = await db.execute(
+        select(Bookmark.id, Bookmark.title, Bookmark.url)
+        .filter(
+            Bookmark.owner_id == owner_id,
+            or_(Bookmark.title.ilike(f"%{escaped}%"), Bookmark.url.ilike(f"%{escaped}%"))
+        )
+        .order_by(
+            Bookmark.title.ilike(f"{escaped}%").desc(),
+            func.similarity(Bookmark.title, prefix).desc(),
+            Bookmark.id
+        )
         .limit(limit)
-        .offset(offset)
     )
-    return result.scalars().all()
+    return [suggest.Suggestion(*row) for row in result.all()]
 
 
 async def get_bookmarks_count(
@@ -82,78 +319,1022 @@ async def get_bookmarks_count(
     owner_id: UUID
 ):
     """Get total count of bookmarks for a user"""
+    stats = await get_bookmark_stats(db, owner_id)
+    return stats.bookmark_count if stats else 0
+
+
+# Bookmark statistics
+async def get_bookmark_stats(db: AsyncSession, owner_id: UUID):
+    """Get the per-user bookmark statistics row"""
+    result = await db.execute(
+        select(UserBookmarkStats).filter(UserBookmarkStats.user_id == owner_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_change_seq(db: AsyncSession, owner_id: UUID) -> int:
+    """Get the user's change counter, a primary key lookup on the stats row"""
     result = await db.execute(
-        select(func.count(Bookmark.id)).filter(Bookmark.owner_id == owner_id)
+        select(UserBookmarkStats.change_seq).filter(UserBookmarkStats.user_id == owner_id)
     )
-    return result.scalar()
+    return result.scalar_one_or_none() or 0
 
 
-async def create_bookmark(db: AsyncSession, bookmark: BookmarkCreate, owner_id: UUID):
-    """Create a new bookmark"""
-    db_bookmark = Bookmark(
-        url=str(bookmark.url),
-        title=bookmark.title,
-        description=bookmark.description,
-        access_level=bookmark.access_level,
-        owner_id=owner_id
+# Lock order: every write path locks the user's stats row, through the
+# helpers below or a SELECT ... FOR UPDATE, before it writes any of their
+# bookmark or tombstone rows. Two writes of the same user then queue on the
+# stats row instead of each holding a row the other one waits for.
+# compact_tombstones updates stats rows last, but it only deletes old
+# tombstones, which no write path locks.
+async def _ensure_bookmark_stats(db: AsyncSession, owner_id: UUID):
+    """Create the stats row for a user if it does not exist yet"""
+    await db.execute(
+        pg_insert(UserBookmarkStats)
+        .values(user_id=owner_id)
+        .on_conflict_do_nothing(index_elements=[UserBookmarkStats.user_id])
     )
-    db.add(db_bookmark)
+
+
+async def _reserve_bookmark_slots(
+    db: AsyncSession,
+    owner_id: UUID,
+    count: int = 1,
+    limit: Optional[int] = None
+) -> Optional[int]:
+    """Atomically add ``count`` to the user's bookmark count.
+
+    With a ``limit`` the increment only happens if the new count stays within
+    it. The same UPDATE advances change_seq by ``count`` and returns it, or
+    None when the limit was hit. It locks the stats row until the caller
+    commits, so concurrent creates for the same user are serialized and
+    cannot overshoot the limit.
+    """
+    query = update(UserBookmarkStats).where(UserBookmarkStats.user_id == owner_id)
+    if limit is not None:
+        query = query.where(UserBookmarkStats.bookmark_count + count <= limit)
+    query = (
+        query
+        .values(
+            bookmark_count=UserBookmarkStats.bookmark_count + count,
+            change_seq=UserBookmarkStats.change_seq + count,
+            last_modified=func.now()
+        )
+        .returning(UserBookmarkStats.change_seq)
+    )
+
+    change_seq = (await db.execute(query)).scalar_one_or_none()
+    if change_seq is None and await get_bookmark_stats(db, owner_id) is None:
+        # Users created before the stats table have no row yet
+        await _ensure_bookmark_stats(db, owner_id)
+        change_seq = (await db.execute(query)).scalar_one_or_none()
+    return change_seq
+
+
+async def _update_bookmark_stats(db: AsyncSession, owner_id: UUID, query):
+    """Run an UPDATE ... RETURNING of the user's stats row and return its row.
+
+    Users created before the stats table may have no row yet; it is
+    created and the UPDATE run again, so no write depends on the backfill
+    of migration 0003.
+    """
+    row = (await db.execute(query)).one_or_none()
+    if row is None:
+        await _ensure_bookmark_stats(db, owner_id)
+        row = (await db.execute(query)).one()
+    return row
+
+
+async def _touch_bookmark_stats(
+    db: AsyncSession,
+    owner_id: UUID,
+    sync_version: Optional[int] = None,
+    count_delta: int = 0,
+    changes: int = 1
+) -> int:
+    """Record a change to the user's bookmarks in the stats row.
+
+    Every write path goes through here, so ``change_seq`` moves whenever
+    anything a list or export shows may have changed. It advances by
+    ``changes``, one per written row, and the new value is returned: the
+    rows are stamped with the sequence numbers up to it. The UPDATE locks
+    the stats row, so numbers are handed out in commit order.
+    """
+    values = {
+        "last_modified": func.now(),
+        "change_seq": UserBookmarkStats.change_seq + changes
+    }
+    if count_delta:
+        values["bookmark_count"] = UserBookmarkStats.bookmark_count + count_delta
+    if sync_version is not None:
+        values["max_sync_version"] = func.greatest(UserBookmarkStats.max_sync_version, sync_version)
+
+    row = await _update_bookmark_stats(
+        db, owner_id,
+        update(UserBookmarkStats)
+        .where(UserBookmarkStats.user_id == owner_id)
+        .values(**values)
+        .returning(UserBookmarkStats.change_seq)
+    )
+    return row.change_seq
+
+
+async def create_bookmark(
+    db: AsyncSession,
+    bookmark: BookmarkCreate,
+    owner_id: UUID,
+    limit: Optional[int] = None
+):
+    """Create a new bookmark.
+
+    One UPDATE of the stats row checks the limit and hands out the
+    change_seq, one INSERT ... RETURNING writes the bookmark and returns
+    its generated columns.
+
+    Returns None if the user already has ``limit`` bookmarks. Raises
+    DuplicateURLError if they already have a bookmark of the same URL.
+    """
+    change_seq = await _reserve_bookmark_slots(db, owner_id, 1, limit)
+    if change_seq is None:
+        await db.rollback()
+        return None
+
+    url = str(bookmark.url)
+    result = await db.execute(
+        pg_insert(Bookmark)
+        .values(
+            url=url,
+            url_hash=url_hash(url),
+            title=bookmark.title,
+            description=bookmark.description,
+            access_level=bookmark.access_level,
+            owner_id=owner_id,
+            change_seq=change_seq
+        )
+        .on_conflict_do_nothing(index_elements=[Bookmark.owner_id, Bookmark.url_hash])
+        .returning(Bookmark)
+    )
+    db_bookmark = result.scalar_one_or_none()
+    if db_bookmark is None:
+        await db.rollback()
+        raise DuplicateURLError(url)
     await db.commit()
-    await db.refresh(db_bookmark)
+    pin_to_primary(owner_id, change_seq)
+    events.publish(owner_id, change_seq)
     return db_bookmark
 
 
+def _bulk_bookmark_row(bookmark: BookmarkCreate, owner_id: UUID, change_seq: int) -> dict:
+    """Column values for a bookmark created by create_bookmarks_bulk"""
+    url = str(bookmark.url)
+    row = {
+        "id": uuid4(),
+        "url": url,
+        "url_hash": url_hash(url),
+        "title": bookmark.title,
+        "description": bookmark.description,
+        "access_level": bookmark.access_level,
+        "status": BookmarkStatus.ACTIVE,
+        "owner_id": owner_id,
+        "sync_version": 0,
+        "change_seq": change_seq,
+    }
+    # Imported bookmarks may keep their original creation time
+    created_at = getattr(bookmark, "created_at", None)
+    if created_at is not None:
+        row["created_at"] = created_at
+    return row
+
+
+class BulkResult(NamedTuple):
+    created: int
+    # Existing bookmarks changed by merge or overwrite
+    updated: int
+    # Duplicates of a bookmark the user has, or of an earlier row, left alone
+    skipped: int
+    # Positions of the new bookmarks that did not fit into ``limit``
+    rejected: List[int]
+
+
+def _on_duplicate(query, mode: str):
+    """ON CONFLICT (owner_id, url_hash) clause of an import INSERT"""
+    target = [Bookmark.owner_id, Bookmark.url_hash]
+    if mode == "skip":
+        return query.on_conflict_do_nothing(index_elements=target)
+
+    excluded = query.excluded
+    if mode == "merge":
+        # Fill in what the bookmark lacks and keep the earlier creation time
+        merged = {
+            "description": func.coalesce(func.nullif(Bookmark.description, ""), excluded.description),
+            "created_at": func.least(Bookmark.created_at, excluded.created_at),
+        }
+    else:
+        merged = {field: excluded[field] for field in UPDATABLE_FIELDS}
+    current = [getattr(Bookmark, field) for field in merged]
+    return query.on_conflict_do_update(
+        index_elements=target,
+        set_={
+            **merged,
+            "sync_version": Bookmark.sync_version + 1,
+            "change_seq": excluded.change_seq,
+            "updated_at": func.now(),
+        },
+        # Rows the import would not change are not written
+        where=tuple_(*current).is_distinct_from(tuple_(*merged.values()))
+    )
+
+
+async def create_bookmarks_bulk(
+    db: AsyncSession,
+    bookmarks: Sequence[BookmarkCreate],
+    owner_id: UUID,
+    limit: Optional[int] = None,
+    commit: bool = True,
+    on_duplicate: str = "skip"
+) -> BulkResult:
+    """Create many bookmarks in a single transaction.
+
+    Bookmarks whose canonical URL the user already has are handled as
+    ``on_duplicate`` says: skip leaves them alone, merge fills in a missing
+    description and an earlier creation time, overwrite replaces the URL,
+    title, description and access level. Either way this is the
+    INSERT ... ON CONFLICT of the row, so importing the same file again
+    changes nothing. Of repeated URLs within ``bookmarks`` the first wins.
+
+    Rows are sent in chunks of IMPORT_CHUNK_SIZE as multi-row INSERTs. The
+    stats row is locked first, so the bookmarks found to exist stay put
+    until the commit. With a ``limit`` only the leading new bookmarks that
+    fit are created. With ``commit=False`` the caller commits, e.g.
+    together with a job checkpoint, and publishes the change once it is
+    committed.
+    """
+    positions = {}
+    for i, bookmark in enumerate(bookmarks):
+        positions.setdefault(url_hash(str(bookmark.url)), i)
+
+    await _ensure_bookmark_stats(db, owner_id)
+    result = await db.execute(
+        select(UserBookmarkStats.bookmark_count)
+        .filter(UserBookmarkStats.user_id == owner_id)
+        .with_for_update()
+    )
+    bookmark_count = result.scalar_one()
+    result = await db.execute(
+        select(Bookmark.url_hash)
+        .filter(
+            Bookmark.owner_id == owner_id,
+            Bookmark.url_hash == any_(literal(list(positions), ARRAY(Bookmark.url_hash.type)))
+        )
+    )
+    existing = set(result.scalars())
+
+    new = [i for url_digest, i in positions.items() if url_digest not in existing]
+    room = len(new) if limit is None else max(0, min(len(new), limit - bookmark_count))
+    written = sorted(new[:room] if on_duplicate == "skip" else new[:room] + [positions[h] for h in existing])
+    if not written:
+        if commit:
+            await db.rollback()
+        return BulkResult(0, 0, len(bookmarks) - len(new), new[room:])
+
+    last_seq = await _touch_bookmark_stats(
+        db, owner_id, sync_version=0, count_delta=room, changes=len(written)
+    )
+    first_seq = last_seq - len(written) + 1
+    rows = [
+        _bulk_bookmark_row(bookmarks[i], owner_id, first_seq + n)
+        for n, i in enumerate(written)
+    ]
+
+    updated = []
+    # A multi-row INSERT needs the same columns in every row
+    rows.sort(key=lambda row: "created_at" in row)
+    for _, group in groupby(rows, key=lambda row: "created_at" in row):
+        group = list(group)
+        for start in range(0, len(group), IMPORT_CHUNK_SIZE):
+            query = pg_insert(Bookmark).values(group[start:start + IMPORT_CHUNK_SIZE])
+            if existing and on_duplicate != "skip":
+                result = await db.execute(
+                    _on_duplicate(query, on_duplicate)
+                    .returning(Bookmark.url_hash, Bookmark.sync_version)
+                )
+                updated.extend(version for digest, version in result if digest in existing)
+            else:
+                await db.execute(_on_duplicate(query, "skip"))
+
+    if updated:
+        await db.execute(
+            update(UserBookmarkStats)
+            .where(UserBookmarkStats.user_id == owner_id)
+            .values(max_sync_version=func.greatest(UserBookmarkStats.max_sync_version, max(updated)))
+        )
+    if commit:
+        await db.commit()
+        events.publish(owner_id, last_seq)
+    pin_to_primary(owner_id, last_seq)
+    return BulkResult(
+        created=room,
+        updated=len(updated),
+        skipped=len(bookmarks) - room - len(updated) - len(new[room:]),
+        rejected=new[room:]
+    )
+
+
+# Columns PUT /bookmarks/{id} may change
+UPDATABLE_FIELDS = ("url", "title", "description", "access_level")
+
+# Of those, the ones an explicit null clears; null for the others is ignored
+CLEARABLE_FIELDS = ("description",)
+
+
+def _update_values(changes: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values of an update from the fields the client sent"""
+    values = {
+        field: value for field, value in changes.items()
+        if field in UPDATABLE_FIELDS and (value is not None or field in CLEARABLE_FIELDS)
+    }
+    if "url" in values:
+        values["url"] = str(values["url"])
+        values["url_hash"] = url_hash(values["url"])
+    return values
+
+
 async def update_bookmark(db: AsyncSession, bookmark_id: UUID, owner_id: UUID, **kwargs):
-    """Update a bookmark"""
-    bookmark = await get_bookmark(db, bookmark_id, owner_id)
-    if not bookmark:
+    """Update a bookmark.
+
+    The bookmark is changed by a single UPDATE ... RETURNING that checks the
+    owner and increments sync_version in SQL, so concurrent updates never
+    lose an increment. The stats row is updated first and stays locked, so
+    the max_sync_version it returned is still current afterwards and only
+    needs writing when this update goes past it.
+
+    Returns None if the user has no such bookmark. Raises DuplicateURLError
+    if the new URL is that of another of their bookmarks.
+    """
+    values = _update_values(kwargs)
+
+    stats = await _update_bookmark_stats(
+        db, owner_id,
+        update(UserBookmarkStats)
+        .where(UserBookmarkStats.user_id == owner_id)
+        .values(change_seq=UserBookmarkStats.change_seq + 1, last_modified=func.now())
+        .returning(UserBookmarkStats.change_seq, UserBookmarkStats.max_sync_version)
+    )
+
+    try:
+        result = await db.execute(
+            select(Bookmark)
+            .from_statement(
+                update(Bookmark)
+                .where(Bookmark.id == bookmark_id, Bookmark.owner_id == owner_id)
+                .values(**values, sync_version=Bookmark.sync_version + 1, change_seq=stats.change_seq)
+                .returning(Bookmark)
+            )
+            # A copy already in the session is overwritten with the returned row
+            .execution_options(populate_existing=True)
+        )
+    except IntegrityError:
+        await db.rollback()
+        raise DuplicateURLError(values["url"])
+    bookmark = result.scalar_one_or_none()
+    if bookmark is None:
+        await db.rollback()
         return None
-    
-    for key, value in kwargs.items():
-        if hasattr(bookmark, key) and value is not None:
-            setattr(bookmark, key, value)
-    
-    bookmark.sync_version += 1
+
+    if bookmark.sync_version > stats.max_sync_version:
+        await db.execute(
+            update(UserBookmarkStats)
+            .where(UserBookmarkStats.user_id == owner_id)
+            .values(max_sync_version=bookmark.sync_version)
+        )
     await db.commit()
-    await db.refresh(bookmark)
+    pin_to_primary(owner_id, stats.change_seq)
+    events.publish(owner_id, stats.change_seq)
     return bookmark
 
 
 async def delete_bookmark(db: AsyncSession, bookmark_id: UUID, owner_id: UUID):
-    """Delete a bookmark"""
-    bookmark = await get_bookmark(db, bookmark_id, owner_id)
-    if not bookmark:
+    """Delete a bookmark.
+
+    The stats row is updated first, taking its lock before the bookmark's
+    (see _touch_bookmark_stats). One INSERT then writes the tombstone with
+    the DELETE ... RETURNING, which checks the owner, in its WITH clause.
+    """
+    stats = await _update_bookmark_stats(
+        db, owner_id,
+        update(UserBookmarkStats)
+        .where(UserBookmarkStats.user_id == owner_id)
+        .values(
+            change_seq=UserBookmarkStats.change_seq + 1,
+            bookmark_count=UserBookmarkStats.bookmark_count - 1,
+            last_modified=func.now()
+        )
+        .returning(UserBookmarkStats.change_seq)
+    )
+    change_seq = stats.change_seq
+
+    removed = (
+        delete(Bookmark)
+        .where(Bookmark.id == bookmark_id, Bookmark.owner_id == owner_id)
+        .returning(Bookmark.id)
+        .cte("removed")
+    )
+    # Left for GET /sync until compact_tombstones removes it
+    result = await db.execute(
+        insert(BookmarkTombstone)
+        .from_select(
+            ["bookmark_id", "owner_id", "change_seq"],
+            select(
+                removed.c.id,
+                literal(owner_id, BookmarkTombstone.owner_id.type),
+                literal(change_seq, BookmarkTombstone.change_seq.type)
+            )
+        )
+        .add_cte(removed)
+        .returning(BookmarkTombstone.change_seq)
+    )
+    if result.scalar_one_or_none() is None:
+        await db.rollback()
         return False
-    
-    await db.delete(bookmark)
     await db.commit()
+    pin_to_primary(owner_id, change_seq)
+    events.publish(owner_id, change_seq)
     return True
 
 
+# Columns a batch update may change, with url_hash following url
+BATCH_UPDATE_FIELDS = (*UPDATABLE_FIELDS, "url_hash")
+
+
+class BookmarkOperation(NamedTuple):
+    # create, update or delete
+    op: str
+    # Bookmark to update or delete
+    bookmark_id: Optional[UUID] = None
+    # BookmarkCreate for create, {field: value} of the fields sent for update
+    data: Any = None
+
+
+class OperationOutcome(NamedTuple):
+    # created, updated, deleted, not_found, limit_exceeded or duplicate
+    status: str
+    bookmark_id: Optional[UUID] = None
+    sync_version: Optional[int] = None
+
+
+async def apply_bookmark_batch(
+    db: AsyncSession,
+    owner_id: UUID,
+    operations: Sequence[BookmarkOperation],
+    limit: Optional[int] = None
+) -> Tuple[List[OperationOutcome], int]:
+    """Apply creates, updates and deletes in one transaction.
+
+    Each kind is a single statement whatever the number of operations: a
+    DELETE ... WHERE id = ANY(...), an UPDATE ... FROM (VALUES ...) and
+    multi-row INSERTs for the new bookmarks and the tombstones. The stats
+    row is locked before any of them and written last. Operation i is
+    stamped with the i-th change_seq after the locked one, so operations
+    on missing bookmarks leave gaps. Creates of a URL the user has once
+    the deletes and updates are applied, or that an earlier create of the
+    batch has, are duplicates and take no slot; the other creates get the
+    free slots in order, counting those the deletes made, and the ones
+    past ``limit`` are not applied. Bookmark ids must be distinct.
+
+    Returns (an outcome per operation, the user's change_seq afterwards).
+    Raises DuplicateURLError, and applies nothing, if an update would give
+    two bookmarks the same URL.
+    """
+    if not operations:
+        return [], await get_change_seq(db, owner_id)
+
+    positions = {operation.bookmark_id: i for i, operation in enumerate(operations) if operation.op != "create"}
+    delete_ids = [operation.bookmark_id for operation in operations if operation.op == "delete"]
+    creates = [i for i, operation in enumerate(operations) if operation.op == "create"]
+
+    # The stats row is locked before the DELETE takes any bookmark row
+    await _ensure_bookmark_stats(db, owner_id)
+    result = await db.execute(
+        select(UserBookmarkStats.bookmark_count, UserBookmarkStats.change_seq)
+        .filter(UserBookmarkStats.user_id == owner_id)
+        .with_for_update()
+    )
+    bookmark_count, change_seq = result.one()
+    first_seq = change_seq + 1
+
+    deleted = []
+    if delete_ids:
+        result = await db.execute(
+            delete(Bookmark)
+            # One statement for any number of ids, unlike an expanding IN
+            .where(Bookmark.owner_id == owner_id, Bookmark.id == any_(literal(delete_ids, ARRAY(Bookmark.id.type))))
+            .returning(Bookmark.id)
+            .execution_options(synchronize_session=False)
+        )
+        deleted = result.scalars().all()
+        await db.execute(insert(BookmarkTombstone), [
+            {"bookmark_id": bookmark_id, "owner_id": owner_id, "change_seq": first_seq + positions[bookmark_id]}
+            for bookmark_id in deleted
+        ])
+
+    updated = {}
+    updates = [(i, operation) for i, operation in enumerate(operations) if operation.op == "update"]
+    if updates:
+        # Each field comes with a flag saying whether to write it, so a
+        # cleared field (NULL) is told apart from one that was not sent
+        changed = value_rows(
+            column("id", Bookmark.id.type),
+            column("url", String),
+            column("title", String),
+            column("description", Text),
+            column("access_level", Bookmark.access_level.type),
+            column("url_hash", Bookmark.url_hash.type),
+            *(column(f"set_{field}", Boolean) for field in BATCH_UPDATE_FIELDS),
+            column("change_seq", BigInteger),
+            name="changed"
+        ).data([
+            (
+                operation.bookmark_id,
+                *(values.get(field) for field in BATCH_UPDATE_FIELDS),
+                *(field in values for field in BATCH_UPDATE_FIELDS),
+                first_seq + i
+            )
+            for i, operation in updates
+            for values in (_update_values(operation.data),)
+        ])
+        try:
+            result = await db.execute(
+                update(Bookmark)
+                .where(Bookmark.owner_id == owner_id, Bookmark.id == changed.c.id)
+                .values(
+                    # A column that is NULL in every row comes out as text, hence the casts
+                    **{
+                        field: case(
+                            (changed.c[f"set_{field}"], cast(changed.c[field], getattr(Bookmark, field).type)),
+                            else_=getattr(Bookmark, field)
+                        )
+                        for field in BATCH_UPDATE_FIELDS
+                    },
+                    sync_version=Bookmark.sync_version + 1,
+                    change_seq=changed.c.change_seq
+                )
+                .returning(Bookmark.id, Bookmark.sync_version)
+                .execution_options(synchronize_session=False)
+            )
+        except IntegrityError:
+            await db.rollback()
+            raise DuplicateURLError("Two bookmarks would have the same URL")
+        updated = dict(result.all())
+
+    rows = {}
+    if creates:
+        digests = {i: url_hash(str(operations[i].data.url)) for i in creates}
+        # Read after the deletes and updates, which may free or take URLs
+        result = await db.execute(
+            select(Bookmark.url_hash)
+            .filter(
+                Bookmark.owner_id == owner_id,
+                Bookmark.url_hash == any_(literal(list(set(digests.values())), ARRAY(Bookmark.url_hash.type)))
+            )
+        )
+        taken = set(result.scalars())
+        room = None if limit is None else max(0, limit + len(deleted) - bookmark_count)
+        for i in creates:
+            if digests[i] in taken or (room is not None and len(rows) >= room):
+                continue
+            taken.add(digests[i])
+            rows[i] = _bulk_bookmark_row(operations[i].data, owner_id, first_seq + i)
+
+    inserted = set()
+    values = list(rows.values())
+    for start in range(0, len(values), IMPORT_CHUNK_SIZE):
+        result = await db.execute(
+            pg_insert(Bookmark)
+            .values(values[start:start + IMPORT_CHUNK_SIZE])
+            .on_conflict_do_nothing(index_elements=[Bookmark.owner_id, Bookmark.url_hash])
+            .returning(Bookmark.id)
+        )
+        inserted.update(result.scalars())
+
+    deleted = set(deleted)
+    outcomes = []
+    for i, operation in enumerate(operations):
+        if operation.op == "create":
+            if i in rows and rows[i]["id"] in inserted:
+                outcome = OperationOutcome("created", rows[i]["id"], 0)
+            elif i in rows or digests[i] in taken:
+                outcome = OperationOutcome("duplicate")
+            else:
+                outcome = OperationOutcome("limit_exceeded")
+        elif operation.op == "update" and operation.bookmark_id in updated:
+            outcome = OperationOutcome("updated", operation.bookmark_id, updated[operation.bookmark_id])
+        elif operation.op == "delete" and operation.bookmark_id in deleted:
+            outcome = OperationOutcome("deleted", operation.bookmark_id)
+        else:
+            outcome = OperationOutcome("not_found", operation.bookmark_id)
+        outcomes.append(outcome)
+
+    if not (deleted or updated or inserted):
+        await db.rollback()
+        return outcomes, change_seq
+
+    last_seq = await _touch_bookmark_stats(
+        db, owner_id,
+        sync_version=max(updated.values()) if updated else None,
+        count_delta=len(inserted) - len(deleted),
+        changes=len(operations)
+    )
+    await db.commit()
+    pin_to_primary(owner_id, last_seq)
+    events.publish(owner_id, last_seq)
+    return outcomes, last_seq
+
+
 # Sync operations
+class SyncDelta(NamedTuple):
+    bookmarks: List[Bookmark]
+    deleted_ids: List[UUID]
+    server_version: int
+    has_more: bool
+    # Tombstones after ``since`` were compacted, deletions may be missing
+    full_resync: bool
+
+
 async def get_sync_data(
-    db: AsyncSession, 
-    owner_id: UUID, 
-    last_sync: Optional[datetime] = None,
-    sync_version: Optional[int] = None
-):
-    """Get data for synchronization"""
-    query = select(Bookmark).filter(Bookmark.owner_id == owner_id)
-    
-    if last_sync:
-        query = query.filter(Bookmark.updated_at > last_sync)
-    
-    if sync_version is not None:
-        query = query.filter(Bookmark.sync_version > sync_version)
-    
-    result = await db.execute(query.order_by(Bookmark.updated_at))
-    return result.scalars().all()
+    db: AsyncSession,
+    owner_id: UUID,
+    since: int = 0,
+    limit: int = 500
+) -> SyncDelta:
+    """Get the bookmarks written and deleted after change sequence ``since``.
+
+    Both come from range scans on (owner_id, change_seq) and are merged
+    into at most ``limit`` changes in change order. Changes are capped at
+    the change_seq read first, so a write committed meanwhile is left for
+    the next call rather than returned without the changes before it.
+
+    The client passes server_version as ``since`` next time, right away
+    while has_more is set.
+    """
+    stats = await get_bookmark_stats(db, owner_id)
+    server_version = stats.change_seq if stats else 0
+    full_resync = 0 < since < (stats.tombstone_floor if stats else 0)
+
+    bookmarks = await db.execute(
+        select(Bookmark)
+        .filter(
+            Bookmark.owner_id == owner_id,
+            Bookmark.change_seq > since,
+            Bookmark.change_seq <= server_version
+        )
+        .order_by(Bookmark.change_seq)
+        .limit(limit + 1)
+    )
+    tombstones = await db.execute(
+        select(BookmarkTombstone.change_seq, BookmarkTombstone.bookmark_id)
+        .filter(
+            BookmarkTombstone.owner_id == owner_id,
+            BookmarkTombstone.change_seq > since,
+            BookmarkTombstone.change_seq <= server_version
+        )
+        .order_by(BookmarkTombstone.change_seq)
+        .limit(limit + 1)
+    )
+    changes = sorted(
+        [(bookmark.change_seq, bookmark) for bookmark in bookmarks.scalars()]
+        + [(row.change_seq, row.bookmark_id) for row in tombstones],
+        key=lambda change: change[0]
+    )
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if has_more:
+        server_version = changes[-1][0]
+    return SyncDelta(
+        bookmarks=[change for _, change in changes if isinstance(change, Bookmark)],
+        deleted_ids=[change for _, change in changes if not isinstance(change, Bookmark)],
+        server_version=server_version,
+        has_more=has_more,
+        full_resync=full_resync
+    )
+
+
+async def register_sync_device(db: AsyncSession, owner_id: UUID, device_id: str, watermark: int):
+    """Record that a device has applied every change up to ``watermark``"""
+    await db.execute(
+        pg_insert(SyncDevice)
+        .values(user_id=owner_id, device_id=device_id, watermark=watermark, last_seen_at=func.now())
+        .on_conflict_do_update(
+            index_elements=[SyncDevice.user_id, SyncDevice.device_id],
+            set_={"watermark": watermark, "last_seen_at": func.now()}
+        )
+    )
+    await db.commit()
+
+
+async def compact_tombstones(
+    db: AsyncSession,
+    active_after: datetime,
+    expire_before: datetime,
+    batch_size: int = 1000
+) -> int:
+    """Delete one batch of tombstones that no device needs any more.
+
+    A tombstone goes once every device seen since ``active_after`` has
+    synced past it, or once it was deleted before ``expire_before``.
+    Devices not seen since ``active_after`` are forgotten first; when they
+    come back below the owner's tombstone_floor they get a full resync.
+
+    Returns the number of tombstones deleted, 0 when nothing is left.
+    """
+    await db.execute(delete(SyncDevice).where(SyncDevice.last_seen_at < active_after))
+
+    watermarks = (
+        select(SyncDevice.user_id, func.min(SyncDevice.watermark).label("watermark"))
+        .group_by(SyncDevice.user_id)
+        .subquery()
+    )
+    expired = (
+        select(BookmarkTombstone.bookmark_id)
+        .outerjoin(watermarks, watermarks.c.user_id == BookmarkTombstone.owner_id)
+        .filter(or_(
+            BookmarkTombstone.deleted_at < expire_before,
+            BookmarkTombstone.change_seq <= watermarks.c.watermark
+        ))
+        .limit(batch_size)
+    )
+    result = await db.execute(
+        delete(BookmarkTombstone)
+        .where(BookmarkTombstone.bookmark_id.in_(expired))
+        .returning(BookmarkTombstone.owner_id, BookmarkTombstone.change_seq)
+    )
+
+    deleted = 0
+    floors = {}
+    for owner_id, change_seq in result:
+        deleted += 1
+        floors[owner_id] = max(change_seq, floors.get(owner_id, 0))
+    for owner_id, floor in floors.items():
+        await db.execute(
+            update(UserBookmarkStats)
+            .where(UserBookmarkStats.user_id == owner_id)
+            .values(tombstone_floor=func.greatest(UserBookmarkStats.tombstone_floor, floor))
+        )
+    await db.commit()
+    return deleted
+
+
+# Columns a client-side conflict resolution overwrites
+RESOLVABLE_FIELDS = ("url", "title", "description", "access_level", "status")
+
+
+class ResolutionChange(NamedTuple):
+    bookmark_id: UUID
+    # sync_version the client resolved against
+    expected_version: int
+    # Values for RESOLVABLE_FIELDS
+    values: dict
+
+
+async def apply_resolutions(
+    db: AsyncSession,
+    owner_id: UUID,
+    changes: Sequence[ResolutionChange]
+) -> Tuple[Dict[UUID, int], int]:
+    """Apply conflict resolutions in one transaction with compare-and-swap.
+
+    All rows are written by a single UPDATE ... FROM (VALUES ...), and a
+    row only changes while its sync_version still equals the expected one.
+    Rows another write got to first are left alone. Each resolution is
+    stamped with its own change_seq, reserved up front.
+
+    Returns ({bookmark_id: new sync_version} for the applied resolutions,
+    the user's change_seq afterwards). Raises DuplicateURLError, and
+    applies nothing, if two bookmarks would end up with the same URL.
+    """
+    if not changes:
+        return {}, await get_change_seq(db, owner_id)
+
+    last_seq = await _touch_bookmark_stats(db, owner_id, changes=len(changes))
+    first_seq = last_seq - len(changes) + 1
+    resolved = value_rows(
+        column("id", Bookmark.id.type),
+        column("expected", Integer),
+        column("url", String),
+        column("title", String),
+        column("description", Text),
+        column("access_level", Bookmark.access_level.type),
+        column("status", Bookmark.status.type),
+        column("url_hash", Bookmark.url_hash.type),
+        column("change_seq", BigInteger),
+        name="resolved"
+    ).data([
+        (
+            change.bookmark_id,
+            change.expected_version,
+            *(change.values[field] for field in RESOLVABLE_FIELDS),
+            url_hash(change.values["url"]),
+            first_seq + i
+        )
+        for i, change in enumerate(changes)
+    ])
+
+    try:
+        result = await db.execute(
+            update(Bookmark)
+            .where(
+                Bookmark.owner_id == owner_id,
+                Bookmark.id == resolved.c.id,
+                Bookmark.sync_version == resolved.c.expected
+            )
+            .values(
+                **{field: resolved.c[field] for field in (*RESOLVABLE_FIELDS, "url_hash")},
+                sync_version=Bookmark.sync_version + 1,
+                change_seq=resolved.c.change_seq
+            )
+            .returning(Bookmark.id, Bookmark.sync_version)
+            .execution_options(synchronize_session=False)
+        )
+    except IntegrityError:
+        await db.rollback()
+        raise DuplicateURLError("Two bookmarks would have the same URL")
+    applied = dict(result.all())
+    if not applied:
+        await db.rollback()
+        return {}, await get_change_seq(db, owner_id)
+
+    await db.execute(
+        update(UserBookmarkStats)
+        .where(UserBookmarkStats.user_id == owner_id)
+        .values(max_sync_version=func.greatest(UserBookmarkStats.max_sync_version, max(applied.values())))
+    )
+    await db.commit()
+    pin_to_primary(owner_id, last_seq)
+    events.publish(owner_id, last_seq)
+    return applied, last_seq
+
+
+async def get_sync_versions(db: AsyncSession, owner_id: UUID, bookmark_ids: Sequence[UUID]) -> Dict[UUID, int]:
+    """Get the current sync_version of the user's bookmarks that exist"""
+    if not bookmark_ids:
+        return {}
+    result = await db.execute(
+        select(Bookmark.id, Bookmark.sync_version)
+        .filter(Bookmark.owner_id == owner_id, Bookmark.id.in_(bookmark_ids))
+    )
+    return dict(result.all())
 
 
 async def get_server_version(db: AsyncSession, owner_id: UUID):
     """Get current server version for user"""
+    stats = await get_bookmark_stats(db, owner_id)
+    return stats.max_sync_version if stats else 0
+
+
+# Background jobs
+ACTIVE_JOB_STATUSES = (JobStatus.PENDING, JobStatus.RUNNING)
+
+
+async def count_active_jobs(db: AsyncSession, owner_id: UUID) -> int:
+    """Number of the user's jobs that are queued or running"""
     result = await db.execute(
-        select(func.max(Bookmark.sync_version))
-        .filter(Bookmark.owner_id == owner_id)
+        select(func.count())
+        .select_from(Job)
+        .filter(Job.owner_id == owner_id, Job.status.in_(ACTIVE_JOB_STATUSES))
+    )
+    return result.scalar_one()
+
+
+async def create_job(
+    db: AsyncSession,
+    owner_id: UUID,
+    kind: JobKind,
+    format: str,
+    file_path: Optional[str] = None,
+    job_id: Optional[UUID] = None,
+    max_active: Optional[int] = None,
+    on_duplicate: str = "skip"
+) -> Optional[Job]:
+    """Queue a job, or return None if the user has max_active jobs already.
+
+    The user's stats row is locked while counting so that concurrent
+    requests can't both take the last slot.
+    """
+    await _ensure_bookmark_stats(db, owner_id)
+    await db.execute(
+        select(UserBookmarkStats.user_id)
+        .filter(UserBookmarkStats.user_id == owner_id)
+        .with_for_update()
+    )
+    if max_active is not None and await count_active_jobs(db, owner_id) >= max_active:
+        await db.rollback()
+        return None
+
+    db_job = Job(
+        id=job_id or uuid4(),
+        owner_id=owner_id,
+        kind=kind,
+        format=format,
+        status=JobStatus.PENDING,
+        file_path=file_path,
+        processed_count=0,
+        imported_count=0,
+        updated_count=0,
+        skipped_count=0,
+        failed_count=0,
+        errors=[],
+        on_duplicate=on_duplicate,
+    )
+    db.add(db_job)
+    await db.commit()
+    await db.refresh(db_job)
+    return db_job
+
+
+async def get_job(db: AsyncSession, job_id: UUID, owner_id: UUID) -> Optional[Job]:
+    """Get a user's job by ID"""
+    result = await db.execute(
+        select(Job).filter(Job.id == job_id, Job.owner_id == owner_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def claim_job(db: AsyncSession, job_id: UUID) -> Optional[Job]:
+    """Move a pending job to running; None if another worker claimed it"""
+    result = await db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == JobStatus.PENDING)
+        .values(status=JobStatus.RUNNING, updated_at=func.now())
+        .returning(Job)
+        .execution_options(synchronize_session=False)
     )
-    return result.scalar() or 0
+    job = result.scalar_one_or_none()
+    await db.commit()
+    return job
+
+
+async def update_job(db: AsyncSession, job_id: UUID, **values):
+    """Update job progress; the caller commits"""
+    await db.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(updated_at=func.now(), **values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def finish_job(db: AsyncSession, job_id: UUID, status: JobStatus, error: Optional[str] = None):
+    """Mark a job completed or failed"""
+    await update_job(db, job_id, status=status, error=error, finished_at=func.now())
+    await db.commit()
+
+
+async def requeue_stale_jobs(db: AsyncSession, stale_before: datetime) -> List[UUID]:
+    """Requeue running jobs with no progress since ``stale_before``.
+
+    Returns the IDs of all pending jobs, oldest first.
+    """
+    await db.execute(
+        update(Job)
+        .where(Job.status == JobStatus.RUNNING, Job.updated_at < stale_before)
+        .values(status=JobStatus.PENDING)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(
+        select(Job.id).filter(Job.status == JobStatus.PENDING).order_by(Job.created_at)
+    )
+    job_ids = list(result.scalars().all())
+    await db.commit()
+    return job_ids
+
+
+async def delete_finished_jobs(db: AsyncSession, finished_before: datetime, batch_size: int = 1000) -> List[Optional[str]]:
+    """Delete one batch of jobs that finished before ``finished_before``.
+
+    Returns the file paths of the deleted jobs (None for jobs without a
+    file), an empty list when nothing is left.
+    """
+    # A finished job's updated_at is its finish time, filtering on it
+    # reads ix_jobs_status_updated_at
+    expired = (
+        select(Job.id)
+        .filter(
+            Job.status.in_((JobStatus.COMPLETED, JobStatus.FAILED)),
+            Job.updated_at < finished_before
+        )
+        .limit(batch_size)
+    )
+    result = await db.execute(
+        delete(Job)
+        .where(Job.id.in_(expired))
+        .returning(Job.file_path)
+        .execution_options(synchronize_session=False)
+    )
+    file_paths = list(result.scalars().all())
+    await db.commit()
+    return file_paths
+
+
+async def get_job_file_paths(db: AsyncSession, file_paths: Sequence[str]) -> Set[str]:
+    """Those of ``file_paths`` that belong to a job"""
+    result = await db.execute(select(Job.file_path).filter(Job.file_path.in_(file_paths)))
+    return set(result.scalars().all())
@@ -2,20 +2,96 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from contextvars import ContextVar
+from typing import Optional
+import math
 import os
 
 # Database URL from environment variable or default
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://postgres:postgres@db:5432/hw_checker")
 
+# Optional read replica, reads fall back to the primary when unset
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+# Seconds a client keeps checking the replica against its last write
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "5"))
+
+# Cookie holding "<user id>:<change_seq>" of the client's last write
+READ_YOUR_WRITES_COOKIE = "last_write"
+
 # Create async engine
 engine = create_async_engine(DATABASE_URL, echo=True)
+read_engine = create_async_engine(DATABASE_READ_URL, echo=True) if DATABASE_READ_URL else engine
 
 # Create async session factory
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+AsyncReadSessionLocal = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
 
 # Base class for models
 Base = declarative_base()
 
+# Last write of the request being served, set up by ReadYourWritesMiddleware
+_request_write = ContextVar("request_write", default=None)
+
+
+def pin_to_primary(user_id, change_seq: int):
+    """Keep the user's reads off the replica until it has this change_seq.
+
+    The write is recorded for the current request and handed back to the
+    client in a cookie, so whichever worker serves the next read can tell
+    whether the replica has caught up. Outside a request it does nothing.
+    """
+    write = _request_write.get()
+    if write is None:
+        return
+    if write.get("user_id") != str(user_id) or write["change_seq"] < change_seq:
+        write.update(user_id=str(user_id), change_seq=change_seq)
+
+
+def last_write_seq(request: Request, user_id) -> Optional[int]:
+    """change_seq of the user's last write as reported by the client, if any"""
+    cookie_user, _, change_seq = request.cookies.get(READ_YOUR_WRITES_COOKIE, "").rpartition(":")
+    if cookie_user != str(user_id) or not change_seq.isdigit():
+        return None
+    return int(change_seq)
+
+
+class ReadYourWritesMiddleware:
+    """Sets the read-your-writes cookie on responses to requests that wrote.
+
+    The cookie lives for READ_YOUR_WRITES_WINDOW seconds and carries the
+    change_seq the user's stats row had after the write, which get_read_db
+    compares with the replica's copy of that row.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        write = {}
+
+        async def send_with_cookie(message: Message):
+            if message["type"] == "http.response.start" and write:
+                cookie = (
+                    f"{READ_YOUR_WRITES_COOKIE}={write['user_id']}:{write['change_seq']}; "
+                    f"Max-Age={math.ceil(READ_YOUR_WRITES_WINDOW)}; Path=/; HttpOnly; SameSite=lax"
+                )
+                MutableHeaders(scope=message).append("set-cookie", cookie)
+            await send(message)
+
+        token = _request_write.set(write)
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _request_write.reset(token)
+
 
 # Dependency to get DB session
 async def get_db():
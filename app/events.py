@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import os
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+
+# "memory" delivers changes within this process only, "postgres" fans them
+# out to every worker through LISTEN/NOTIFY
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "memory")
+
+# Seconds between keep-alive comments on an idle event stream
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "25"))
+
+# Milliseconds an EventSource waits before reconnecting
+EVENTS_RETRY = int(os.getenv("EVENTS_RETRY", "5000"))
+
+# Postgres notification channel shared by all workers
+EVENTS_CHANNEL = "bookmark_changes"
+
+# Postgres notification channel for cache invalidations
+INVALIDATIONS_CHANNEL = "cache_invalidations"
+
+# Seconds between attempts to reconnect the Postgres broker
+EVENTS_RECONNECT_DELAY = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def format_change(change_seq: int) -> str:
+    """Server-sent event telling the client to sync past ``change_seq``"""
+    return f"id: {change_seq}\nevent: changed\ndata: {{\"server_version\": {change_seq}}}\n\n"
+
+
+class Subscription:
+    """One open event stream.
+
+    Only the latest change_seq is kept rather than a queue of events, so
+    an idle or slow client costs an int and an asyncio.Event, and a burst
+    of writes collapses into a single notification.
+    """
+
+    __slots__ = ("user_id", "change_seq", "_changed")
+
+    def __init__(self, user_id: str, change_seq: int = 0):
+        self.user_id = user_id
+        self.change_seq = change_seq
+        self._changed = asyncio.Event()
+
+    def notify(self, change_seq: int):
+        if change_seq > self.change_seq:
+            self.change_seq = change_seq
+            self._changed.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for a newer change_seq, False on timeout"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._changed.clear()
+        return True
+
+
+class LocalBroker:
+    """In-process pub/sub, enough when a single worker serves all streams.
+
+    Besides bookmark changes it carries cache invalidations: a key passed
+    to ``invalidate`` reaches the invalidation listeners of every process,
+    None meaning the whole cache.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._invalidation_listeners: List[Callable[[Optional[str]], None]] = []
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def subscribe(self, user_id) -> Subscription:
+        subscription = Subscription(str(user_id))
+        self._subscribers.setdefault(subscription.user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.user_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, user_id, change_seq: int):
+        """Announce that the user's bookmarks changed up to ``change_seq``"""
+        self._deliver(str(user_id), change_seq)
+
+    def _deliver(self, user_id: str, change_seq: int):
+        for subscription in self._subscribers.get(user_id, ()):
+            subscription.notify(change_seq)
+
+    def add_invalidation_listener(self, callback: Callable[[Optional[str]], None]):
+        """Call ``callback`` with every invalidated key"""
+        self._invalidation_listeners.append(callback)
+
+    def invalidate(self, key: Optional[str]):
+        """Tell every process to drop ``key``, or everything when None"""
+        self._invalidate(key)
+
+    def _invalidate(self, key: Optional[str]):
+        for callback in self._invalidation_listeners:
+            callback(key)
+
+
+class PostgresBroker(LocalBroker):
+    """Fans changes out to all workers through Postgres LISTEN/NOTIFY.
+
+    Each process holds one connection: it LISTENs on the channels and
+    sends the NOTIFYs. Local subscribers are fed from the listener,
+    including for this process's own writes. Publishing never waits for the
+    database; pending changes are coalesced per user and sent by a
+    background task, together with pending cache invalidations. Those are
+    applied locally right away, and every cache is dropped on (re)connect
+    since invalidations sent while the listener was down are lost.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str = EVENTS_CHANNEL,
+        invalidations_channel: str = INVALIDATIONS_CHANNEL
+    ):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self.invalidations_channel = invalidations_channel
+        self._connection = None
+        self._pending: Dict[str, int] = {}
+        self._pending_invalidations: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._sender: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        await self._connect()
+        self._sender = asyncio.create_task(self._send_pending())
+
+    async def stop(self):
+        if self._sender is not None:
+            self._sender.cancel()
+            await asyncio.gather(self._sender, return_exceptions=True)
+            self._sender = None
+        await self._disconnect()
+
+    def publish(self, user_id, change_seq: int):
+        user_id = str(user_id)
+        if self._wakeup is None:
+            # Not started (e.g. a script), fall back to this process
+            self._deliver(user_id, change_seq)
+            return
+        self._pending[user_id] = max(change_seq, self._pending.get(user_id, 0))
+        self._wakeup.set()
+
+    def invalidate(self, key: Optional[str]):
+        self._invalidate(key)
+        if self._wakeup is None:
+            return
+        # An empty payload stands for the whole cache
+        self._pending_invalidations.add(key or "")
+        self._wakeup.set()
+
+    async def _connect(self):
+        import asyncpg
+
+        self._connection = await asyncpg.connect(self.dsn)
+        await self._connection.add_listener(self.channel, self._on_notification)
+        await self._connection.add_listener(self.invalidations_channel, self._on_invalidation)
+        self._connection.add_termination_listener(self._on_termination)
+        self._invalidate(None)
+
+    async def _disconnect(self):
+        # Forget the connection first so its termination isn't taken for a drop
+        connection, self._connection = self._connection, None
+        if connection is None or connection.is_closed():
+            return
+        try:
+            await connection.close(timeout=5)
+        except Exception:
+            connection.terminate()
+
+    def _on_termination(self, connection):
+        # LISTEN went with the connection: reconnect now rather than on the
+        # next publish, or other workers' changes are missed until then
+        if connection is self._connection and self._wakeup is not None:
+            self._connection = None
+            self._wakeup.set()
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str):
+        user_id, _, change_seq = payload.rpartition(":")
+        self._deliver(user_id, int(change_seq))
+
+    def _on_invalidation(self, connection, pid: int, channel: str, payload: str):
+        self._invalidate(payload or None)
+
+    async def _send_pending(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            pending, self._pending = self._pending, {}
+            invalidations, self._pending_invalidations = self._pending_invalidations, set()
+            try:
+                if self._connection is None or self._connection.is_closed():
+                    await self._connect()
+                notifications = [
+                    (self.channel, f"{user_id}:{change_seq}") for user_id, change_seq in pending.items()
+                ] + [(self.invalidations_channel, key) for key in invalidations]
+                if notifications:
+                    await self._connection.executemany("SELECT pg_notify($1, $2)", notifications)
+            except Exception:
+                logger.exception("Event broker connection failed")
+                await self._disconnect()
+                # Other workers miss these, but local streams still get
+                # them; clients catch up on their next change or reconnect.
+                # Missed invalidations expire with the cache TTL
+                for user_id, change_seq in pending.items():
+                    self._deliver(user_id, change_seq)
+                # Retry even if nothing else is published, to LISTEN again
+                self._wakeup.set()
+                await asyncio.sleep(EVENTS_RECONNECT_DELAY)
+
+
+def _create_broker() -> LocalBroker:
+    if EVENTS_BACKEND == "postgres":
+        from app.database import engine
+
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresBroker(dsn)
+    return LocalBroker()
+
+
+broker = _create_broker()
+
+
+def publish(user_id, change_seq: int):
+    """Notify the user's event streams of a committed change"""
+    broker.publish(user_id, change_seq)
+
+
+async def change_stream(
+    subscription: Subscription,
+    since: int,
+    heartbeat: float = EVENTS_HEARTBEAT
+) -> AsyncIterator[str]:
+    """Server-sent events for a subscription.
+
+    Emits a "changed" event whenever the user's change_seq moves past what
+    the client was last told, and a comment every ``heartbeat`` seconds of
+    silence so proxies keep the connection open.
+    """
+    try:
+        yield f"retry: {EVENTS_RETRY}\n\n"
+        sent = since
+        while True:
+            if subscription.change_seq > sent:
+                sent = subscription.change_seq
+                yield format_change(sent)
+            elif not await subscription.wait(heartbeat):
+                yield ": ping\n\n"
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,138 @@
+import csv
+import html
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Sequence
+
+# Rows fetched from the database cursor per chunk
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "html": "text/html",
+    "csv": "text/csv",
+}
+
+
+def export_filename(format: str) -> str:
+    """Download name for an export file"""
+    return f"bookmarks_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+
+
+def _bookmark_to_dict(bookmark) -> dict:
+    return {
+        "id": str(bookmark.id),
+        "url": str(bookmark.url),
+        "title": bookmark.title,
+        "description": bookmark.description,
+        "access_level": bookmark.access_level.value,
+        "status": bookmark.status.value,
+        "created_at": bookmark.created_at.isoformat(),
+        "updated_at": bookmark.updated_at.isoformat() if bookmark.updated_at else None
+    }
+
+
+async def export_json(chunks: AsyncIterable[Sequence]) -> AsyncIterator[str]:
+    """Export bookmarks as JSON"""
+    yield '{"bookmarks":['
+    separator = ""
+    async for bookmarks in chunks:
+        items = ",".join(
+            json.dumps(_bookmark_to_dict(bookmark), ensure_ascii=False, separators=(",", ":"))
+            for bookmark in bookmarks
+        )
+        yield separator + items
+        separator = ","
+    yield "]}"
+
+
+async def export_html(chunks: AsyncIterable[Sequence], total_count: int) -> AsyncIterator[str]:
+    """Export bookmarks as HTML"""
+    yield f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Bookmarks Export</title>
+        <meta charset="utf-8">
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 20px; }}
+            .bookmark {{ margin-bottom: 20px; padding: 10px; border: 1px solid #ddd; }}
+            .title {{ font-size: 18px; font-weight: bold; margin-bottom: 5px; }}
+            .url {{ color: #0066cc; text-decoration: none; }}
+            .description {{ color: #666; margin-top: 5px; }}
+            .meta {{ font-size: 12px; color: #999; margin-top: 10px; }}
+        </style>
+    </head>
+    <body>
+        <h1>Bookmarks Export</h1>
+        <p>Exported on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+        <p>Total bookmarks: {total_count}</p>
+    """
+
+    async for bookmarks in chunks:
+        parts = []
+        for bookmark in bookmarks:
+            title = html.escape(bookmark.title)
+            url = html.escape(str(bookmark.url))
+            description = (
+                f'<div class="description">{html.escape(bookmark.description)}</div>'
+                if bookmark.description else ''
+            )
+            parts.append(f"""
+        <div class="bookmark">
+            <div class="title">{title}</div>
+            <a href="{url}" class="url">{url}</a>
+            {description}
+            <div class="meta">
+                Status: {bookmark.status.value} |
+                Access: {bookmark.access_level.value} |
+                Created: {bookmark.created_at.strftime('%Y-%m-%d %H:%M:%S')}
+            </div>
+        </div>
+        """)
+        yield "".join(parts)
+
+    yield """
+    </body>
+    </html>
+    """
+
+
+async def export_csv(chunks: AsyncIterable[Sequence]) -> AsyncIterator[str]:
+    """Export bookmarks as CSV"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    # Write header
+    writer.writerow([
+        "Title", "URL", "Description", "Status", "Access Level",
+        "Created At", "Updated At"
+    ])
+
+    # Write data one chunk at a time
+    async for bookmarks in chunks:
+        for bookmark in bookmarks:
+            writer.writerow([
+                bookmark.title,
+                str(bookmark.url),
+                bookmark.description or "",
+                bookmark.status.value,
+                bookmark.access_level.value,
+                bookmark.created_at.isoformat(),
+                bookmark.updated_at.isoformat() if bookmark.updated_at else ""
+            ])
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate()
+
+    yield output.getvalue()
+
+
+def export_writer(format: str, chunks: AsyncIterable[Sequence], total_count: int) -> AsyncIterator[str]:
+    """Writer for ``format`` over chunks of bookmark rows"""
+    if format == "json":
+        return export_json(chunks)
+    if format == "html":
+        return export_html(chunks, total_count)
+    return export_csv(chunks)
@@ -0,0 +1,552 @@
+import base64
+import binascii
+import codecs
+import csv
+import json
+import re
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, events, schemas
+from app.models import AccessLevel
+
+# Characters of import data decoded per chunk
+IMPORT_READ_SIZE = 64 * 1024
+
+
+class NetscapeBookmark(NamedTuple):
+    """A link read from a Netscape bookmark file"""
+    url: str
+    title: str
+    folder: Tuple[str, ...]
+    add_date: Optional[datetime]
+    description: Optional[str] = None
+
+
+async def iter_import_text(data: str, chunk_size: int = IMPORT_READ_SIZE) -> AsyncIterator[str]:
+    """Yield import data as text chunks.
+
+    ``data`` is either plain text or a ``data:`` URL with base64 content,
+    which is decoded chunk by chunk instead of all at once.
+    """
+    if not data.startswith('data:'):
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+        return
+
+    start = data.index(',') + 1
+    # Base64 decodes in groups of 4 characters
+    chunk_size -= chunk_size % 4
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    for offset in range(start, len(data), chunk_size):
+        try:
+            raw = base64.b64decode(data[offset:offset + chunk_size], validate=True)
+        except binascii.Error as e:
+            raise ValueError(f"Invalid base64 data: {e}") from e
+        text = decoder.decode(raw)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+async def iter_upload_text(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Decode an uploaded UTF-8 byte stream into text chunks"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+async def iter_multipart_file(
+    chunks: AsyncIterable[bytes],
+    content_type: str,
+    field: str = 'file'
+) -> AsyncIterator[bytes]:
+    """Yield the content of one file from a multipart/form-data stream.
+
+    The part named ``field`` is used, or else the first part that carries
+    a filename. Other parts are skipped without being buffered.
+    """
+    _, params = parse_options_header(content_type)
+    boundary = params.get(b'boundary')
+    if not boundary:
+        raise ValueError("Missing boundary in multipart body")
+
+    state = {'headers': {}, 'field': b'', 'value': b'', 'selected': False, 'done': False}
+    ready: List[bytes] = []
+
+    def on_part_begin():
+        state['headers'] = {}
+
+    def on_header_field(data, start, end):
+        state['field'] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state['value'] += data[start:end]
+
+    def on_header_end():
+        state['headers'][state['field'].lower()] = state['value']
+        state['field'] = state['value'] = b''
+
+    def on_headers_finished():
+        _, options = parse_options_header(state['headers'].get(b'content-disposition', b''))
+        state['selected'] = not state['done'] and (
+            options.get(b'name') == field.encode() or b'filename' in options
+        )
+
+    def on_part_data(data, start, end):
+        if state['selected']:
+            ready.append(data[start:end])
+
+    def on_part_end():
+        if state['selected']:
+            state['selected'] = False
+            state['done'] = True
+
+    parser = MultipartParser(boundary, {
+        'on_part_begin': on_part_begin,
+        'on_part_data': on_part_data,
+        'on_part_end': on_part_end,
+        'on_header_field': on_header_field,
+        'on_header_value': on_header_value,
+        'on_header_end': on_header_end,
+        'on_headers_finished': on_headers_finished,
+    })
+    async for chunk in chunks:
+        parser.write(chunk)
+        for data in ready:
+            yield data
+        ready.clear()
+    parser.finalize()
+
+    if not state['done']:
+        raise ValueError(f"Multipart body has no '{field}' file")
+
+
+_WHITESPACE = re.compile(r'\s*')
+_BOOKMARKS_WRAPPER = re.compile(r'\{\s*"bookmarks"\s*:\s*\[')
+
+
+async def iter_json_items(chunks: AsyncIterable[str]) -> AsyncIterator[Any]:
+    """Yield the bookmark objects of a JSON import one at a time.
+
+    Accepts a list, an object whose first key is a "bookmarks" list (the
+    export format) or a single object. List items are decoded as they
+    arrive; other documents are read whole.
+    """
+    decoder = json.JSONDecoder()
+    chunks = chunks.__aiter__()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    async def fill() -> bool:
+        """Append the next chunk to the buffer, dropping what was consumed"""
+        nonlocal buffer, pos, eof
+        try:
+            chunk = await chunks.__anext__()
+        except StopAsyncIteration:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    async def peek() -> str:
+        """Skip whitespace and return the next character, '' at the end"""
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer):
+                return buffer[pos]
+            if not await fill():
+                return ''
+
+    first = await peek()
+    if first == '[':
+        pos += 1
+    elif first == '{':
+        while len(buffer) - pos < 64 and await fill():
+            pass
+        wrapper = _BOOKMARKS_WRAPPER.match(buffer, pos)
+        if wrapper:
+            pos = wrapper.end()
+            first = '['
+
+    if first != '[':
+        while await fill():
+            pass
+        document = json.loads(buffer[pos:])
+        if isinstance(document, dict) and 'bookmarks' in document:
+            for item in document['bookmarks']:
+                yield item
+        else:
+            yield document
+        return
+
+    while True:
+        char = await peek()
+        if char == ']':
+            return
+        if char == ',':
+            pos += 1
+            continue
+        if not char:
+            raise json.JSONDecodeError("Unterminated array", buffer, pos)
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof or not await fill():
+                    raise
+                continue
+            # A value that ends the buffer may continue in the next chunk
+            if end == len(buffer) and not eof and await fill():
+                continue
+            break
+        pos = end
+        yield item
+
+
+async def iter_csv_rows(chunks: AsyncIterable[str]) -> AsyncIterator[Dict[str, Optional[str]]]:
+    """Yield CSV rows as dicts keyed by the header row.
+
+    Text is split into records at line ends outside quoted fields, so rows
+    are parsed as soon as they are complete.
+    """
+    header = None
+    pending = ''
+    record: List[str] = []
+    quotes = 0
+
+    def parse(records: List[str]):
+        nonlocal header
+        lines = iter(records)
+        if header is None:
+            for row in csv.reader(lines):
+                if row:
+                    header = row
+                    break
+        if header is not None:
+            yield from csv.DictReader(lines, fieldnames=header)
+
+    async for chunk in chunks:
+        lines = (pending + chunk).splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(('\n', '\r')) else ''
+        records = []
+        for line in lines:
+            record.append(line)
+            quotes += line.count('"')
+            # An odd number of quotes means a quoted field is still open
+            if quotes % 2 == 0:
+                records.append(''.join(record))
+                record = []
+                quotes = 0
+        for row in parse(records):
+            yield row
+
+    tail = ''.join(record) + pending
+    if tail:
+        for row in parse([tail]):
+            yield row
+
+
+def _parse_add_date(value: Optional[str]) -> Optional[datetime]:
+    """Convert an ADD_DATE attribute to a UTC datetime"""
+    try:
+        timestamp = int(value)
+    except (TypeError, ValueError):
+        return None
+    if timestamp <= 0:
+        return None
+    # Some exporters write milliseconds or microseconds instead of seconds
+    while timestamp > 10 ** 11:
+        timestamp //= 1000
+    try:
+        return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+class NetscapeBookmarkParser(HTMLParser):
+    """Incremental reader for the Netscape bookmark file format.
+
+    This is the format exported by Chrome, Firefox, Safari and Edge: folders
+    are ``<DT><H3>`` headings followed by a nested ``<DL>``, links are
+    ``<DT><A HREF>`` entries optionally followed by a ``<DD>`` description.
+    Feed text with ``feed()`` and collect finished links with ``pop()``.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._folders: List[Optional[str]] = []
+        self._folder_path: Tuple[str, ...] = ()
+        self._heading: Optional[List[str]] = None
+        self._next_folder: Optional[str] = None
+        self._link: Optional[dict] = None
+        self._link_text: Optional[List[str]] = None
+        self._description: Optional[List[str]] = None
+        self._ready: List[NetscapeBookmark] = []
+
+    def pop(self) -> List[NetscapeBookmark]:
+        """Return and forget the links finished so far"""
+        ready, self._ready = self._ready, []
+        return ready
+
+    def close(self):
+        super().close()
+        self._finish_link()
+
+    def _update_folder_path(self):
+        self._folder_path = tuple(name for name in self._folders if name is not None)
+
+    def _finish_link(self):
+        """Emit the pending link once its description (if any) is complete"""
+        if self._link is None:
+            return
+        description = None
+        if self._description is not None:
+            description = ' '.join(''.join(self._description).split()) or None
+        self._ready.append(NetscapeBookmark(description=description, **self._link))
+        self._link = None
+        self._description = None
+
+    def handle_starttag(self, tag, attrs):
+        if self._link_text is not None:
+            # Markup nested in a link title, e.g. an icon
+            if tag not in ('a', 'dt', 'dd', 'dl', 'h3'):
+                return
+            self.handle_endtag('a')
+        if tag == 'dd':
+            if self._link is not None:
+                self._description = []
+            return
+        self._finish_link()
+
+        if tag == 'a':
+            attrs = dict(attrs)
+            href = attrs.get('href')
+            if href:
+                self._link = {
+                    'url': href.strip(),
+                    'title': '',
+                    'folder': self._folder_path,
+                    'add_date': _parse_add_date(attrs.get('add_date')),
+                }
+                self._link_text = []
+        elif tag == 'dt':
+            # A heading only names the list that directly follows it
+            self._next_folder = None
+        elif tag == 'h3':
+            self._heading = []
+        elif tag == 'dl':
+            # The root list has no heading, its folder is None
+            self._folders.append(self._next_folder)
+            self._next_folder = None
+            self._update_folder_path()
+
+    def handle_endtag(self, tag):
+        if tag == 'a' and self._link_text is not None:
+            self._link['title'] = ' '.join(''.join(self._link_text).split())
+            self._link_text = None
+        elif tag == 'h3' and self._heading is not None:
+            self._next_folder = ' '.join(''.join(self._heading).split())
+            self._heading = None
+        elif tag == 'dl':
+            self._finish_link()
+            if self._folders:
+                self._folders.pop()
+                self._update_folder_path()
+
+    def handle_data(self, data):
+        if self._link_text is not None:
+            self._link_text.append(data)
+        elif self._heading is not None:
+            self._heading.append(data)
+        elif self._description is not None:
+            self._description.append(data)
+
+
+async def iter_netscape_bookmarks(chunks: AsyncIterable[str]) -> AsyncIterator[NetscapeBookmark]:
+    """Parse a Netscape bookmark file given as text chunks, yielding links"""
+    parser = NetscapeBookmarkParser()
+    async for chunk in chunks:
+        parser.feed(chunk)
+        for link in parser.pop():
+            yield link
+    parser.close()
+    for link in parser.pop():
+        yield link
+
+
+class ImportRecord(NamedTuple):
+    """One record of an import file, either a valid bookmark or an error"""
+    title: str
+    bookmark: Optional[schemas.BookmarkCreate]
+    error: Optional[str] = None
+
+
+async def json_records(chunks: AsyncIterable[str]) -> AsyncIterator[ImportRecord]:
+    """Validate bookmarks read from a JSON document one at a time"""
+    async for bookmark_data in iter_json_items(chunks):
+        try:
+            bookmark_create = schemas.BookmarkCreate(
+                url=bookmark_data['url'],
+                title=bookmark_data.get('title', bookmark_data['url']),
+                description=bookmark_data.get('description'),
+                access_level=AccessLevel(bookmark_data.get('access_level', 'private'))
+            )
+            yield ImportRecord(bookmark_create.title, bookmark_create)
+        except Exception as e:
+            title = bookmark_data.get('title', 'Unknown') if isinstance(bookmark_data, dict) else 'Unknown'
+            yield ImportRecord(title, None, str(e))
+
+
+async def html_records(chunks: AsyncIterable[str]) -> AsyncIterator[ImportRecord]:
+    """Validate links read from a Netscape bookmark file one at a time"""
+    async for link in iter_netscape_bookmarks(chunks):
+        # Firefox smart folders are queries, not links
+        if link.url.startswith('place:'):
+            continue
+        title = link.title or link.url
+        try:
+            bookmark_create = schemas.BookmarkImport(
+                url=link.url,
+                title=title[:255],
+                description=link.description[:1000] if link.description else None,
+                created_at=link.add_date
+            )
+            yield ImportRecord(title, bookmark_create)
+        except Exception as e:
+            yield ImportRecord(title, None, str(e))
+
+
+async def csv_records(chunks: AsyncIterable[str]) -> AsyncIterator[ImportRecord]:
+    """Validate bookmarks read from CSV rows one at a time"""
+    async for row in iter_csv_rows(chunks):
+        try:
+            bookmark_create = schemas.BookmarkCreate(
+                url=row['URL'],
+                title=row.get('Title', row['URL']),
+                description=row.get('Description', ''),
+                access_level=AccessLevel(row.get('Access Level', 'private'))
+            )
+            yield ImportRecord(bookmark_create.title, bookmark_create)
+        except Exception as e:
+            yield ImportRecord(row.get('Title', 'Unknown'), None, str(e))
+
+
+IMPORT_RECORDS = {
+    'json': json_records,
+    'html': html_records,
+    'csv': csv_records,
+}
+
+# Called with (records consumed, bookmarks created, updated and skipped,
+# errors) for each batch before the batch is committed
+BatchCallback = Callable[[int, int, int, int, List[str]], Awaitable[None]]
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    updated: int
+    skipped: int
+    errors: List[str]
+
+
+async def save_import_records(
+    db: AsyncSession,
+    records: AsyncIterable[ImportRecord],
+    owner_id: UUID,
+    limit: Optional[int] = None,
+    skip: int = 0,
+    on_batch: Optional[BatchCallback] = None,
+    on_duplicate: str = "skip"
+) -> ImportResult:
+    """Insert import records in batches of IMPORT_CHUNK_SIZE.
+
+    Without ``on_batch`` the whole import is one transaction: it is
+    committed at the end, and rolled back if reading the records fails, so
+    an import rejected halfway saves nothing. It holds the user's stats row
+    locked from the first batch on, so ``records`` must not wait on a
+    client; the import route reads them from the stored upload. Background
+    jobs pass ``on_batch`` to record a checkpoint, and each batch is then
+    committed together with its checkpoint. The first ``skip`` records were handled
+    by an earlier run and are only read past. Bookmarks the user already
+    has are handled as ``on_duplicate`` says, see
+    crud.create_bookmarks_bulk, so a resumed or repeated import doesn't
+    create them twice.
+    """
+    imported_count = updated_count = skipped_count = 0
+    errors: List[str] = []
+    consumed = 0
+    batch: List[ImportRecord] = []
+
+    async def flush():
+        nonlocal imported_count, updated_count, skipped_count
+        candidates = [record for record in batch if record.bookmark is not None]
+        result = crud.BulkResult(0, 0, 0, [])
+        if candidates:
+            result = await crud.create_bookmarks_bulk(
+                db,
+                [record.bookmark for record in candidates],
+                owner_id,
+                limit=limit,
+                commit=False,
+                on_duplicate=on_duplicate
+            )
+
+        rejected = set(result.rejected)
+        batch_errors = []
+        candidate_index = 0
+        for record in batch:
+            if record.bookmark is None:
+                batch_errors.append(f"Failed to import bookmark {record.title}: {record.error}")
+                continue
+            # Rows that didn't fit into the account limit
+            if candidate_index in rejected:
+                batch_errors.append(f"Failed to import bookmark {record.title}: bookmark limit exceeded for free account")
+            candidate_index += 1
+
+        if on_batch is not None:
+            await on_batch(consumed, result.created, result.updated, result.skipped, batch_errors)
+            await db.commit()
+            if result.created or result.updated:
+                events.publish(owner_id, await crud.get_change_seq(db, owner_id))
+        imported_count += result.created
+        updated_count += result.updated
+        skipped_count += result.skipped
+        errors.extend(batch_errors)
+        batch.clear()
+
+    try:
+        async for record in records:
+            consumed += 1
+            if consumed <= skip:
+                continue
+            batch.append(record)
+            if len(batch) >= crud.IMPORT_CHUNK_SIZE:
+                await flush()
+        if batch:
+            await flush()
+    except BaseException:
+        await db.rollback()
+        raise
+
+    if on_batch is None:
+        await db.commit()
+        if imported_count or updated_count:
+            events.publish(owner_id, await crud.get_change_seq(db, owner_id))
+    return ImportResult(imported_count, updated_count, skipped_count, errors)
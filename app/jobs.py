@@ -0,0 +1,387 @@
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+from contextlib import aclosing
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterable, AsyncIterator, Callable, Dict, List, Optional
+from uuid import UUID
+
+from app import crud, database, exporters
+from app.importers import IMPORT_READ_SIZE, IMPORT_RECORDS, ImportRecord, iter_upload_text, save_import_records
+from app.models import AccountType, Job, JobKind, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# Directory for uploaded import files and produced export files
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join(tempfile.gettempdir(), "bookmark-jobs"))
+
+# Jobs run at the same time by one process
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Queued or running jobs allowed per user
+JOB_MAX_ACTIVE_PER_USER = int(os.getenv("JOB_MAX_ACTIVE_PER_USER", "2"))
+
+# Seconds without progress after which a running job is considered orphaned
+# by a crashed process and is requeued, at startup and on every job sweep
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "300"))
+
+# Error messages kept per job, the rest are only counted
+JOB_MAX_ERRORS = 1000
+
+# Import records handed from the parser thread to the job at a time, and
+# batches parsed ahead of the database writes
+JOB_PARSE_BATCH = 500
+JOB_PARSE_AHEAD = 4
+
+# Seconds a finished job and its file are kept
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 24 * 3600)))
+
+# Seconds between job retention sweeps
+JOB_SWEEP_INTERVAL = float(os.getenv("JOB_SWEEP_INTERVAL", "3600"))
+
+# Jobs deleted per transaction
+JOB_SWEEP_BATCH = 1000
+
+# Seconds after which a device that stopped syncing no longer holds back
+# tombstone compaction
+SYNC_DEVICE_STALE_AFTER = float(os.getenv("SYNC_DEVICE_STALE_AFTER", str(30 * 24 * 3600)))
+
+# Seconds after which a tombstone is compacted even if a device still needs it
+TOMBSTONE_TTL = float(os.getenv("TOMBSTONE_TTL", str(90 * 24 * 3600)))
+
+# Seconds between tombstone compaction runs
+TOMBSTONE_COMPACT_INTERVAL = float(os.getenv("TOMBSTONE_COMPACT_INTERVAL", "3600"))
+
+# Tombstones deleted per transaction
+TOMBSTONE_COMPACT_BATCH = 1000
+
+
+def job_file_path(job_id: UUID, suffix: str) -> str:
+    """Location of a job's input or output file"""
+    return os.path.join(JOBS_DIR, f"{job_id}.{suffix}")
+
+
+def remove_job_file(path: Optional[str]):
+    """Delete a job file if it exists"""
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+async def save_upload(chunks: AsyncIterable[str], path: str):
+    """Write uploaded import text to ``path`` as it arrives"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        async for chunk in chunks:
+            await asyncio.to_thread(f.write, chunk)
+
+
+async def _read_file(path: str) -> AsyncIterator[bytes]:
+    # Runs on the parser thread, a blocking read holds up nothing else
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(IMPORT_READ_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+# Marks the end of an import file's records
+_PARSE_DONE = object()
+
+
+def _parse_import_file(path: str, format: str, deliver: Callable[[object], bool]):
+    """Parse an import file on an executor thread, in the thread's own event loop.
+
+    Hands ``deliver`` lists of up to JOB_PARSE_BATCH records, then
+    _PARSE_DONE or the exception that stopped parsing. ``deliver`` returns
+    False once the job wants no more records.
+    """
+    async def parse():
+        batch = []
+        async for record in IMPORT_RECORDS[format](iter_upload_text(_read_file(path))):
+            batch.append(record)
+            if len(batch) >= JOB_PARSE_BATCH:
+                if not deliver(batch):
+                    return
+                batch = []
+        if not batch or deliver(batch):
+            deliver(_PARSE_DONE)
+
+    try:
+        asyncio.run(parse())
+    except Exception as e:
+        deliver(e)
+
+
+async def import_file_records(path: str, format: str) -> AsyncIterator[ImportRecord]:
+    """Records of a stored import file, parsed off the event loop.
+
+    Parsing a large file is CPU-bound; on the event loop it would stall
+    every request of the process, so it runs in the default executor.
+    """
+    loop = asyncio.get_running_loop()
+    batches: asyncio.Queue = asyncio.Queue()
+    room = threading.Semaphore(JOB_PARSE_AHEAD)
+    stopped = threading.Event()
+
+    def deliver(item) -> bool:
+        # The parser waits while JOB_PARSE_AHEAD batches are unconsumed
+        while not room.acquire(timeout=0.1):
+            if stopped.is_set():
+                return False
+        if stopped.is_set():
+            return False
+        loop.call_soon_threadsafe(batches.put_nowait, item)
+        return True
+
+    parser = loop.run_in_executor(None, _parse_import_file, path, format, deliver)
+    try:
+        while True:
+            item = await batches.get()
+            room.release()
+            if item is _PARSE_DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            for record in item:
+                yield record
+    finally:
+        stopped.set()
+        await parser
+
+
+async def _run_import(db, job: Job):
+    """Import the uploaded file, resuming after the last committed batch"""
+    user = await crud.get_user(db, job.owner_id)
+    limit = crud.FREE_TIER_BOOKMARK_LIMIT if user.account_type == AccountType.FREE else None
+    imported_count = job.imported_count
+    updated_count = job.updated_count
+    skipped_count = job.skipped_count
+    failed_count = job.failed_count
+    errors: List[str] = list(job.errors or [])
+
+    async def checkpoint(consumed: int, created: int, updated: int, skipped: int, batch_errors: List[str]):
+        nonlocal imported_count, updated_count, skipped_count, failed_count
+        imported_count += created
+        updated_count += updated
+        skipped_count += skipped
+        failed_count += len(batch_errors)
+        errors.extend(batch_errors[:max(0, JOB_MAX_ERRORS - len(errors))])
+        await crud.update_job(
+            db, job.id,
+            processed_count=consumed,
+            imported_count=imported_count,
+            updated_count=updated_count,
+            skipped_count=skipped_count,
+            failed_count=failed_count,
+            errors=list(errors)
+        )
+
+    async with aclosing(import_file_records(job.file_path, job.format)) as records:
+        await save_import_records(
+            db, records, job.owner_id,
+            limit=limit,
+            skip=job.processed_count,
+            on_batch=checkpoint,
+            on_duplicate=job.on_duplicate
+        )
+    await crud.finish_job(db, job.id, JobStatus.COMPLETED)
+    remove_job_file(job.file_path)
+
+
+async def _run_export(db, job: Job):
+    """Write the export file; exports are read-only and restart from scratch"""
+    total_count = await crud.get_bookmarks_count(db, job.owner_id)
+    await crud.update_job(db, job.id, processed_count=0, total_count=total_count)
+    await db.commit()
+
+    written = 0
+
+    async def counted(chunks):
+        nonlocal written
+        async for rows in chunks:
+            yield rows
+            written += len(rows)
+
+    os.makedirs(os.path.dirname(job.file_path), exist_ok=True)
+    # The cursor is read in its own session, progress is committed in ``db``
+    async with database.AsyncSessionLocal() as read_db:
+        chunks = crud.stream_user_bookmarks(
+            db=read_db,
+            owner_id=job.owner_id,
+            chunk_size=exporters.EXPORT_CHUNK_SIZE
+        )
+        with open(job.file_path, "w", encoding="utf-8") as f:
+            async for piece in exporters.export_writer(job.format, counted(chunks), total_count):
+                await asyncio.to_thread(f.write, piece)
+                await crud.update_job(db, job.id, processed_count=written)
+                await db.commit()
+
+    await crud.finish_job(db, job.id, JobStatus.COMPLETED)
+
+
+async def run_job(job_id: UUID):
+    """Claim and run one job in its own session"""
+    async with database.AsyncSessionLocal() as db:
+        job = await crud.claim_job(db, job_id)
+        if job is None:
+            return
+        # The job instance is expired by a rollback, keep what cleanup needs
+        file_path = job.file_path
+        try:
+            if job.kind == JobKind.IMPORT:
+                await _run_import(db, job)
+            else:
+                await _run_export(db, job)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back, it resumes from its checkpoint
+            await db.rollback()
+            await crud.update_job(db, job_id, status=JobStatus.PENDING)
+            await db.commit()
+            raise
+        except Exception as e:
+            await db.rollback()
+            await crud.finish_job(db, job_id, JobStatus.FAILED, error=str(e) or type(e).__name__)
+            # The upload of an import, or what an export wrote before failing
+            remove_job_file(file_path)
+
+
+async def compact_tombstones() -> int:
+    """Delete the tombstones no device needs, one batch per transaction"""
+    now = datetime.now(timezone.utc)
+    total = 0
+    async with database.AsyncSessionLocal() as db:
+        while True:
+            deleted = await crud.compact_tombstones(
+                db,
+                active_after=now - timedelta(seconds=SYNC_DEVICE_STALE_AFTER),
+                expire_before=now - timedelta(seconds=TOMBSTONE_TTL),
+                batch_size=TOMBSTONE_COMPACT_BATCH
+            )
+            total += deleted
+            if deleted < TOMBSTONE_COMPACT_BATCH:
+                return total
+
+
+async def compact_tombstones_periodically():
+    """Run compact_tombstones every TOMBSTONE_COMPACT_INTERVAL seconds until cancelled"""
+    while True:
+        try:
+            await compact_tombstones()
+        except Exception:
+            # Nothing is lost by skipping a run, the next one catches up
+            logger.exception("Tombstone compaction failed")
+        await asyncio.sleep(TOMBSTONE_COMPACT_INTERVAL)
+
+
+def _old_job_files(modified_before: float) -> List[str]:
+    try:
+        names = os.listdir(JOBS_DIR)
+    except FileNotFoundError:
+        return []
+    paths = [os.path.join(JOBS_DIR, name) for name in names]
+    return [path for path in paths if os.path.isfile(path) and os.path.getmtime(path) < modified_before]
+
+
+async def sweep_jobs() -> int:
+    """Delete the jobs finished more than JOB_RETENTION seconds ago.
+
+    Their files go with them, as do files in JOBS_DIR that are as old and
+    belong to no job, e.g. uploads whose job was never created.
+    Returns the number of jobs deleted.
+    """
+    expire_before = datetime.now(timezone.utc) - timedelta(seconds=JOB_RETENTION)
+    total = 0
+    async with database.AsyncSessionLocal() as db:
+        while True:
+            file_paths = await crud.delete_finished_jobs(db, expire_before, batch_size=JOB_SWEEP_BATCH)
+            for path in file_paths:
+                remove_job_file(path)
+            total += len(file_paths)
+            if len(file_paths) < JOB_SWEEP_BATCH:
+                break
+
+        old_files = await asyncio.to_thread(_old_job_files, expire_before.timestamp())
+        if old_files:
+            in_use = await crud.get_job_file_paths(db, old_files)
+            for path in old_files:
+                if path not in in_use:
+                    remove_job_file(path)
+    return total
+
+
+async def sweep_jobs_periodically():
+    """Run sweep_jobs and requeue stale jobs every JOB_SWEEP_INTERVAL seconds until cancelled"""
+    while True:
+        try:
+            await sweep_jobs()
+        except Exception:
+            logger.exception("Job retention sweep failed")
+        try:
+            await runner.requeue_stale()
+        except Exception:
+            logger.exception("Requeueing stale jobs failed")
+        await asyncio.sleep(JOB_SWEEP_INTERVAL)
+
+
+class JobRunner:
+    """Runs jobs as tasks on the event loop, at most ``workers`` at a time.
+
+    Jobs are persisted before they are submitted, so a process restart only
+    delays them: ``requeue_stale`` picks up pending jobs and running jobs
+    orphaned by a crashed process, at startup and from the job sweep.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Dict[UUID, asyncio.Task] = {}
+
+    def submit(self, job_id: UUID):
+        """Schedule a persisted job"""
+        if job_id in self._tasks:
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id: UUID):
+        async with self._semaphore:
+            await run_job(job_id)
+
+    async def requeue_stale(self):
+        """Requeue stale running jobs and submit every pending job.
+
+        Jobs another process is about to run are submitted too; whichever
+        process claims a job first runs it, the other skips it.
+        """
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=JOB_STALE_AFTER)
+        async with database.AsyncSessionLocal() as db:
+            job_ids = await crud.requeue_stale_jobs(db, stale_before)
+        for job_id in job_ids:
+            self.submit(job_id)
+
+    async def start(self):
+        """Resume the jobs left over by previous processes"""
+        await self.requeue_stale()
+
+    async def join(self):
+        """Wait until the submitted jobs are done"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def stop(self):
+        """Cancel running jobs, they go back to the queue"""
+        for task in self._tasks.values():
+            task.cancel()
+        await self.join()
+
+
+runner = JobRunner(JOB_WORKERS)
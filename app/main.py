@@ -1,8 +1,11 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import users, base, bookmarks, export, import_routes
-from app.database import engine, Base
-import asyncio
+from app import events, jobs
+from app.compression import GZipMiddleware
+from app.database import ReadYourWritesMiddleware
+from app.routes import users, base, bookmarks, export, import_routes, sync, jobs as jobs_routes
+from app.auth import token_cache, user_cache
 
 app = FastAPI(
     title="Bookmark Management Service API",
@@ -22,12 +25,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(GZipMiddleware)
 
-# Create tables
-@app.on_event("startup")
-async def startup_event():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+app.add_middleware(ReadYourWritesMiddleware)
 
 
 # Include routers
@@ -36,8 +36,66 @@ app.include_router(users.router)
 app.include_router(bookmarks.router)
 app.include_router(export.router)
 app.include_router(import_routes.router)
+app.include_router(sync.router)
+app.include_router(jobs_routes.router)
+
+
+@app.on_event("startup")
+async def start_job_runner():
+    await jobs.runner.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_runner():
+    await jobs.runner.stop()
+
+
+@app.on_event("startup")
+async def start_tombstone_compaction():
+    app.state.tombstone_compaction = asyncio.create_task(jobs.compact_tombstones_periodically())
+
+
+@app.on_event("shutdown")
+async def stop_tombstone_compaction():
+    task = app.state.tombstone_compaction
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+@app.on_event("startup")
+async def start_job_sweep():
+    app.state.job_sweep = asyncio.create_task(jobs.sweep_jobs_periodically())
+
+
+@app.on_event("shutdown")
+async def stop_job_sweep():
+    task = app.state.job_sweep
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+@app.on_event("startup")
+async def start_event_broker():
+    await events.broker.start()
+
+
+@app.on_event("shutdown")
+async def stop_event_broker():
+    await events.broker.stop()
 
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Bookmark Management Service API"}
+
+
+@app.get("/health")
+async def health():
+    """Liveness check with the hit/miss counters of the in-process caches"""
+    return {
+        "status": "ok",
+        "caches": {
+            "user": user_cache.stats(),
+            "token": token_cache.stats(),
+        },
+    }
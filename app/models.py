@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Enum
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, ForeignKey, Enum, Index, JSON, Computed, LargeBinary, text
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from app.database import Base
 import uuid
 import enum
@@ -22,6 +22,18 @@ class AccessLevel(str, enum.Enum):
     PUBLIC = "public"
 
 
+class JobKind(str, enum.Enum):
+    IMPORT = "import"
+    EXPORT = "export"
+
+
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -37,6 +49,16 @@ class User(Base):
     bookmarks = relationship("Bookmark", back_populates="owner", cascade="all, delete-orphan")
 
 
+# Weighted search document: title ranks above description above the URL
+# words. The "simple" configuration doesn't stem, since bookmarks come in
+# any language. Keep in sync with migration 0008.
+BOOKMARK_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('simple', title), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('simple', regexp_replace(url, '^[[:alpha:]]+://(www[.])?|[^[:alnum:]]+', ' ', 'g')), 'C')"
+)
+
+
 class Bookmark(Base):
     __tablename__ = "bookmarks"
 
@@ -48,8 +70,141 @@ class Bookmark(Base):
     access_level = Column(Enum(AccessLevel), default=AccessLevel.PRIVATE, nullable=False)
     owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     sync_version = Column(Integer, default=0, nullable=False)
+    # Owner's change_seq at the last write of this row, see crud.get_sync_data
+    change_seq = Column(BigInteger, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # urls.url_hash of the URL; NULL only for duplicates that predate it
+    url_hash = Column(LargeBinary)
+    # Kept up to date by Postgres on every write, see crud.search_bookmarks.
+    # Deferred so that ordinary reads don't carry it around.
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(BOOKMARK_SEARCH_DOCUMENT, persisted=True),
+        nullable=False
+    ))
 
     # Relationships
     owner = relationship("User", back_populates="bookmarks")
+
+    # Created by migrations 0002, 0006, 0008, 0009, 0010 and 0011, keep in sync with migrations/versions
+    __table_args__ = (
+        # Matches the keyset ordering used by crud.get_user_bookmarks
+        Index("ix_bookmarks_owner_created_id", owner_id, created_at.desc(), id.desc()),
+        Index("ix_bookmarks_owner_sync_version", owner_id, sync_version),
+        Index("ix_bookmarks_owner_updated_at", owner_id, updated_at),
+        # "Changed since N" is a range scan
+        Index("ix_bookmarks_owner_change_seq", owner_id, change_seq),
+        # Needs btree_gin for owner_id, so one index scan finds the user's matches
+        Index("ix_bookmarks_owner_search", owner_id, search_vector, postgresql_using="gin"),
+        # Trigram indexes for crud.suggest_bookmarks, need pg_trgm and btree_gin
+        Index(
+            "ix_bookmarks_owner_title_trgm", owner_id, title,
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}
+        ),
+        Index(
+            "ix_bookmarks_owner_url_trgm", owner_id, url,
+            postgresql_using="gin", postgresql_ops={"url": "gin_trgm_ops"}
+        ),
+        # The other sort orders of GET /bookmarks, see crud._sort_order
+        Index(
+            "ix_bookmarks_owner_modified_id",
+            owner_id, func.coalesce(updated_at, created_at).desc(), id.desc()
+        ),
+        Index("ix_bookmarks_owner_title_id", owner_id, title, id),
+        # Active-only copies of each sort order for the common status=active
+        # listing, so archived rows are never read and skipped
+        Index(
+            "ix_bookmarks_owner_active_created_id",
+            owner_id, created_at.desc(), id.desc(),
+            postgresql_where=text("status = 'ACTIVE'")
+        ),
+        Index(
+            "ix_bookmarks_owner_active_modified_id",
+            owner_id, func.coalesce(updated_at, created_at).desc(), id.desc(),
+            postgresql_where=text("status = 'ACTIVE'")
+        ),
+        Index(
+            "ix_bookmarks_owner_active_title_id", owner_id, title, id,
+            postgresql_where=text("status = 'ACTIVE'")
+        ),
+        # One bookmark per canonical URL, the conflict target of imports
+        Index("ix_bookmarks_owner_url_hash", owner_id, url_hash, unique=True),
+    )
+
+
+class UserBookmarkStats(Base):
+    """Per-user bookmark aggregates maintained by the crud write paths"""
+    __tablename__ = "user_bookmark_stats"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    bookmark_count = Column(Integer, default=0, server_default="0", nullable=False)
+    max_sync_version = Column(Integer, default=0, server_default="0", nullable=False)
+    last_modified = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Bumped by every write to the user's bookmarks, the validator behind ETags
+    change_seq = Column(BigInteger, default=0, server_default="0", nullable=False)
+    # Highest change_seq of a compacted tombstone; a sync from below it
+    # may have missed deletions
+    tombstone_floor = Column(BigInteger, default=0, server_default="0", nullable=False)
+
+
+class BookmarkTombstone(Base):
+    """Deleted bookmark, kept until every device has synced past it"""
+    __tablename__ = "bookmark_tombstones"
+
+    bookmark_id = Column(UUID(as_uuid=True), primary_key=True)
+    owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    # Created by migration 0007
+    __table_args__ = (
+        Index("ix_bookmark_tombstones_owner_change_seq", owner_id, change_seq),
+        Index("ix_bookmark_tombstones_deleted_at", deleted_at),
+    )
+
+
+class SyncDevice(Base):
+    """Sync watermark of one of a user's devices"""
+    __tablename__ = "sync_devices"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    device_id = Column(String(64), primary_key=True)
+    # The device has applied every change up to this change_seq
+    watermark = Column(BigInteger, default=0, server_default="0", nullable=False)
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class Job(Base):
+    """Background import or export; the table is also the job runner's queue"""
+    __tablename__ = "jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(Enum(JobKind), nullable=False)
+    format = Column(String(10), nullable=False)
+    status = Column(Enum(JobStatus), default=JobStatus.PENDING, nullable=False)
+    # Uploaded file for imports, produced file for exports
+    file_path = Column(String)
+    # Import: source records consumed and committed, the resume checkpoint.
+    # Export: rows written.
+    processed_count = Column(Integer, default=0, nullable=False)
+    total_count = Column(Integer)
+    imported_count = Column(Integer, default=0, nullable=False)
+    # Import: existing bookmarks changed and duplicates left alone
+    updated_count = Column(Integer, default=0, server_default="0", nullable=False)
+    skipped_count = Column(Integer, default=0, server_default="0", nullable=False)
+    failed_count = Column(Integer, default=0, nullable=False)
+    errors = Column(JSON, default=list, nullable=False)
+    # Import: skip, merge or overwrite, see crud.create_bookmarks_bulk
+    on_duplicate = Column(String(10), default="skip", server_default="skip", nullable=False)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True))
+
+    # Created by migration 0004
+    __table_args__ = (
+        Index("ix_jobs_owner_status", owner_id, status),
+        Index("ix_jobs_status_updated_at", status, updated_at),
+    )
@@ -0,0 +1,65 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Tuple
+from uuid import UUID
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(value: Any, bookmark_id, sort: str = "created_at") -> str:
+    """Encode the (sort value, id) position of the last row of a page.
+
+    created_at cursors keep their original two-element form, other sort
+    orders are recorded in the cursor.
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    position = [value, str(bookmark_id)]
+    if sort != "created_at":
+        position.insert(0, sort)
+    payload = json.dumps(position, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str = "created_at") -> Tuple[Any, str]:
+    """Decode a cursor produced by encode_cursor back into (sort value, id).
+
+    A cursor from a listing with another sort order is invalid.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        cursor_sort = position.pop(0) if len(position) == 3 else "created_at"
+        if cursor_sort != sort:
+            raise ValueError("Cursor is for another sort order")
+        value, bookmark_id = position
+        if sort == "title":
+            if not isinstance(value, str):
+                raise TypeError("title must be a string")
+        else:
+            value = datetime.fromisoformat(value)
+        return value, str(UUID(bookmark_id))
+    except (binascii.Error, UnicodeError, ValueError, TypeError, AttributeError) as e:
+        raise InvalidCursorError("Invalid cursor") from e
+
+
+def encode_search_cursor(rank: float, bookmark_id) -> str:
+    """Encode the (rank, id) position of the last row of a search page"""
+    payload = json.dumps([rank, str(bookmark_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, str]:
+    """Decode a cursor produced by encode_search_cursor back into (rank, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        rank, bookmark_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if isinstance(rank, bool) or not isinstance(rank, (int, float)):
+            raise TypeError("rank must be a number")
+        return float(rank), str(UUID(bookmark_id))
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid cursor") from e
@@ -1,40 +1,173 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from app import schemas, crud, auth
 from app.database import get_db
-from app.models import User
+from app.models import User, BookmarkStatus, AccessLevel
+from app.pagination import encode_cursor, decode_cursor, encode_search_cursor, decode_search_cursor, InvalidCursorError
+from app.conditional import bookmarks_etag, etag_matches, cache_headers, not_modified
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
 router = APIRouter(prefix="/bookmarks", tags=["Bookmarks"])
 
 
-@router.get("/", response_model=schemas.BookmarkListResponse)
+@router.get(
+    "/",
+    response_model=schemas.BookmarkListResponse,
+    responses={304: {"description": "Bookmarks unchanged since the ETag in If-None-Match"}}
+)
 async def get_bookmarks(
+    response: Response,
     limit: int = Query(50, ge=1, le=200, description="Number of bookmarks to return"),
-    offset: int = Query(0, ge=0, description="Number of bookmarks to skip"),
+    offset: int = Query(0, ge=0, description="Number of bookmarks to skip (deprecated, use cursor)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Set to false to skip counting, total_count is then null"),
+    sort: str = Query(
+        "created_at", pattern="^(created_at|updated_at|title)$",
+        description="created_at and updated_at list newest first, title alphabetically"
+    ),
+    status_filter: Optional[BookmarkStatus] = Query(None, alias="status"),
+    access_level: Optional[AccessLevel] = Query(None),
+    created_after: Optional[datetime] = Query(None, description="Requires sort=created_at"),
+    created_before: Optional[datetime] = Query(None, description="Requires sort=created_at"),
+    updated_after: Optional[datetime] = Query(None, description="Requires sort=updated_at"),
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(auth.get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(auth.get_read_db)
 ):
-    """Get user's bookmarks"""
-    bookmarks = await crud.get_user_bookmarks(
+    """Get user's bookmarks.
+
+    Every accepted combination of sort and filters is served from an
+    index. Date filters are only accepted on the matching sort order, where
+    they bound the index range; status and access_level narrow it. A
+    filtered page has no total_count.
+
+    The ETag changes with any write to the user's bookmarks. A matching
+    If-None-Match is answered with 304 before the page is queried.
+    """
+    if (created_after or created_before) and sort != "created_at":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="created_after and created_before require sort=created_at"
+        )
+    if updated_after and sort != "updated_at":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="updated_after requires sort=updated_at"
+        )
+
+    position = None
+    if cursor is not None:
+        try:
+            position = decode_cursor(cursor, sort)
+        except InvalidCursorError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+
+    filters = crud.BookmarkFilter(
+        status=status_filter,
+        access_level=access_level,
+        created_after=created_after,
+        created_before=created_before,
+        updated_after=updated_after
+    )
+    if filters == crud.BookmarkFilter():
+        filters = None
+
+    # Read before the page, so the ETag is never newer than the data
+    etag = bookmarks_etag(current_user.id, await crud.get_change_seq(db, current_user.id))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+
+    bookmarks, total_count, has_more = await crud.get_bookmark_page(
         db=db,
         owner_id=current_user.id,
         limit=limit,
-        offset=offset
-    )
-    
-    total_count = await crud.get_bookmarks_count(
-        db=db,
-        owner_id=current_user.id
+        offset=offset,
+        cursor=position,
+        include_total=include_total,
+        sort=sort,
+        filters=filters
     )
     
-    has_more = (offset + limit) < total_count
+    next_cursor = None
+    if has_more:
+        last = bookmarks[-1]
+        if sort == "updated_at":
+            value = last.updated_at or last.created_at
+        else:
+            value = getattr(last, sort)
+        next_cursor = encode_cursor(value, last.id, sort)
     
     return schemas.BookmarkListResponse(
         bookmarks=bookmarks,
         total_count=total_count,
-        has_more=has_more
+        has_more=has_more,
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/search", response_model=schemas.BookmarkListResponse)
+async def search_bookmarks(
+    q: str = Query(..., min_length=1, max_length=200, description="Words, \"quoted phrases\", OR and -word"),
+    limit: int = Query(50, ge=1, le=200, description="Number of bookmarks to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    current_user: User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(auth.get_read_db)
+):
+    """Search the user's bookmarks by title, description and URL.
+
+    Results are ordered by relevance; total_count is always null.
+    """
+    position = None
+    if cursor is not None:
+        try:
+            position = decode_search_cursor(cursor)
+        except InvalidCursorError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+
+    page = await crud.search_bookmarks(
+        db=db,
+        owner_id=current_user.id,
+        query=q,
+        limit=limit,
+        cursor=position
+    )
+
+    next_cursor = None
+    if page.has_more:
+        next_cursor = encode_search_cursor(*page.last_position)
+
+    return schemas.BookmarkListResponse(
+        bookmarks=page.bookmarks,
+        has_more=page.has_more,
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/suggest", response_model=schemas.BookmarkSuggestResponse)
+async def suggest_bookmarks(
+    prefix: str = Query(..., min_length=1, max_length=100, description="Text typed so far"),
+    limit: int = Query(10, ge=1, le=20, description="Number of suggestions to return"),
+    current_user: User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(auth.get_read_db)
+):
+    """Typeahead suggestions by title and URL, cheap enough for every keystroke"""
+    suggestions = await crud.suggest_bookmarks(
+        db=db,
+        owner_id=current_user.id,
+        prefix=prefix,
+        limit=limit
+    )
+    return schemas.BookmarkSuggestResponse(
+        suggestions=[suggestion._asdict() for suggestion in suggestions]
     )
 
 
@@ -45,22 +178,89 @@ async def create_bookmark(
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new bookmark"""
-    # Check bookmark limits for free users
-    if current_user.account_type.value == "free":
-        bookmark_count = await crud.get_bookmarks_count(db, current_user.id)
-        if bookmark_count >= 100:  # Free tier limit
+    # Free accounts are limited, the check is done atomically with the insert
+    limit = crud.FREE_TIER_BOOKMARK_LIMIT if current_user.account_type.value == "free" else None
+    
+    try:
+        new_bookmark = await crud.create_bookmark(
+            db=db,
+            bookmark=bookmark,
+            owner_id=current_user.id,
+            limit=limit
+        )
+    except crud.DuplicateURLError:
+        raise _duplicate_url()
+    
+    if new_bookmark is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Bookmark limit exceeded for free account"
+        )
+    
+    return new_bookmark
+
+
+@router.post("/batch", response_model=schemas.BookmarkBatchResponse)
+async def batch_bookmarks(
+    request: schemas.BookmarkBatchRequest,
+    current_user: User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create, update and delete bookmarks in one transaction.
+
+    Every operation gets a result in request order: an update or delete of
+    a bookmark that doesn't exist is reported as not_found, a create past
+    the free account limit as limit_exceeded, a create of a URL the user
+    already has as duplicate, and the rest of the batch is still applied.
+    An update to the URL of another bookmark fails the whole batch with
+    409. A bookmark may appear in only one operation.
+    """
+    operations = []
+    for operation in request.operations:
+        if operation.op == "create":
+            if operation.bookmark is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="bookmark is required for create"
+                )
+            operations.append(crud.BookmarkOperation("create", data=operation.bookmark))
+            continue
+        if operation.id is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Bookmark limit exceeded for free account"
+                detail=f"id is required for {operation.op}"
             )
-    
-    new_bookmark = await crud.create_bookmark(
-        db=db,
-        bookmark=bookmark,
-        owner_id=current_user.id
+        data = None
+        if operation.op == "update":
+            if operation.changes is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="changes is required for update"
+                )
+            # Only the fields sent, so an explicit null clears the field as in PUT
+            data = operation.changes.model_dump(exclude_unset=True)
+        operations.append(crud.BookmarkOperation(operation.op, operation.id, data))
+
+    bookmark_ids = [operation.bookmark_id for operation in operations if operation.op != "create"]
+    if len(set(bookmark_ids)) != len(bookmark_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Duplicate id in operations"
+        )
+
+    limit = crud.FREE_TIER_BOOKMARK_LIMIT if current_user.account_type.value == "free" else None
+    try:
+        outcomes, server_version = await crud.apply_bookmark_batch(db, current_user.id, operations, limit)
+    except crud.DuplicateURLError:
+        raise _duplicate_url()
+
+    return schemas.BookmarkBatchResponse(
+        results=[
+            schemas.BookmarkOperationResult(status=outcome.status, id=outcome.bookmark_id, sync_version=outcome.sync_version)
+            for outcome in outcomes
+        ],
+        server_version=server_version
     )
-    
-    return new_bookmark
 
 
 @router.put("/{bookmark_id}", response_model=schemas.Bookmark)
@@ -74,12 +274,15 @@ async def update_bookmark(
     # Get update data, excluding None values
     update_data = bookmark_update.dict(exclude_unset=True)
     
-    updated_bookmark = await crud.update_bookmark(
-        db=db,
-        bookmark_id=bookmark_id,
-        owner_id=current_user.id,
-        **update_data
-    )
+    try:
+        updated_bookmark = await crud.update_bookmark(
+            db=db,
+            bookmark_id=bookmark_id,
+            owner_id=current_user.id,
+            **update_data
+        )
+    except crud.DuplicateURLError:
+        raise _duplicate_url()
     
     if not updated_bookmark:
         raise HTTPException(
@@ -110,3 +313,10 @@ async def delete_bookmark(
         )
     
     return {"success": True}
+
+
+def _duplicate_url() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="A bookmark with this URL already exists"
+    )
@@ -1,197 +1,204 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from app import schemas, crud, auth
+from app import schemas, crud, auth, jobs
 from app.database import get_db
-from app.models import User, BookmarkStatus, AccessLevel
-from typing import List
-from uuid import UUID
+from app.importers import (
+    IMPORT_RECORDS,
+    iter_import_text,
+    iter_multipart_file,
+    iter_upload_text,
+    save_import_records,
+)
+from app.models import User, JobKind
+from contextlib import aclosing
+from typing import AsyncIterator
+from uuid import uuid4
+import csv
 import json
-import base64
-import re
-from datetime import datetime
 
 router = APIRouter(prefix="/import", tags=["Import"])
 
+# Accepted request bodies, documented by hand since the body is read as a stream
+IMPORT_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": schemas.ImportRequest.model_json_schema()},
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            },
+            "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
 
-@router.post("/{format}", response_model=schemas.ImportResponse)
+
+@router.post(
+    "/{format}",
+    response_model=schemas.ImportResponse,
+    responses={status.HTTP_202_ACCEPTED: {"model": schemas.Job}},
+    openapi_extra=IMPORT_REQUEST_BODY
+)
 async def import_bookmarks(
     format: str,
-    import_request: schemas.ImportRequest,
+    request: Request,
+    run_async: bool = Query(False, alias="async", description="Run the import as a background job"),
+    on_duplicate: str = Query(
+        "skip",
+        pattern="^(skip|merge|overwrite)$",
+        description="What to do with bookmarks whose URL the user already has"
+    ),
     current_user: User = Depends(auth.get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Import bookmarks from specified format"""
+    """Import bookmarks from specified format.
+
+    The file is sent as a multipart ``file`` field, as a raw
+    application/octet-stream body, or base64-encoded in a JSON
+    ImportRequest for older clients. The upload is stored in JOBS_DIR as
+    it arrives and imported once it is complete, so the import's
+    transaction never waits on the client. With ``async=true`` the stored
+    file is imported by a background job instead, and the job is returned
+    with status 202.
+
+    URLs are compared in canonical form (app/urls.py). A bookmark the user
+    already has is left alone with ``on_duplicate=skip``, gets a missing
+    description and an earlier creation time with ``merge``, and takes the
+    imported URL, title, description and access level with ``overwrite``.
+    Importing the same file twice creates nothing the second time.
+    """
+    chunks = await _import_text(request)
     
     # Check import limits for free users
     if current_user.account_type.value == "free":
         bookmark_count = await crud.get_bookmarks_count(db, current_user.id)
-        if bookmark_count >= 100:  # Free tier limit
+        if bookmark_count >= crud.FREE_TIER_BOOKMARK_LIMIT:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Import limit exceeded for free account"
             )
     
-    try:
-        if format == "json":
-            return await import_json(import_request, current_user, db)
-        elif format == "html":
-            return await import_html(import_request, current_user, db)
-        elif format == "csv":
-            return await import_csv(import_request, current_user, db)
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Unsupported import format"
-            )
-    except Exception as e:
+    if format not in IMPORT_RECORDS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Import failed: {str(e)}"
+            detail="Unsupported import format"
         )
-
-
-async def import_json(import_request: schemas.ImportRequest, current_user: User, db: AsyncSession):
-    """Import bookmarks from JSON format"""
+    
+    if run_async:
+        return await _import_job(format, chunks, on_duplicate, current_user, db)
+    
+    # The import is one transaction that locks the user's stats row from
+    # its first write, so a slow upload must not be read inside it
+    file_path = jobs.job_file_path(uuid4(), "upload")
     try:
-        # Decode base64 data if needed
-        if import_request.data.startswith('data:'):
-            # Remove data URL prefix
-            data = import_request.data.split(',')[1]
-            decoded_data = base64.b64decode(data).decode('utf-8')
-        else:
-            decoded_data = import_request.data
-        
-        bookmarks_data = json.loads(decoded_data)
-        
-        # Handle different JSON structures
-        if isinstance(bookmarks_data, dict) and 'bookmarks' in bookmarks_data:
-            bookmarks_list = bookmarks_data['bookmarks']
-        elif isinstance(bookmarks_data, list):
-            bookmarks_list = bookmarks_data
-        else:
-            bookmarks_list = [bookmarks_data]
-        
-        imported_count = 0
-        failed_count = 0
-        errors = []
-        
-        for bookmark_data in bookmarks_list:
-            try:
-                bookmark_create = schemas.BookmarkCreate(
-                    url=bookmark_data['url'],
-                    title=bookmark_data.get('title', bookmark_data['url']),
-                    description=bookmark_data.get('description'),
-                    access_level=AccessLevel(bookmark_data.get('access_level', 'private'))
-                )
-                
-                await crud.create_bookmark(db, bookmark_create, current_user.id)
-                imported_count += 1
-                
-            except Exception as e:
-                failed_count += 1
-                errors.append(f"Failed to import bookmark {bookmark_data.get('title', 'Unknown')}: {str(e)}")
-        
-        return schemas.ImportResponse(
-            imported_count=imported_count,
-            failed_count=failed_count,
-            errors=errors
-        )
-        
+        await jobs.save_upload(chunks, file_path)
+        async with aclosing(jobs.import_file_records(file_path, format)) as records:
+            result = await save_import_records(
+                db,
+                records,
+                current_user.id,
+                limit=_bookmark_limit(current_user),
+                on_duplicate=on_duplicate
+            )
     except json.JSONDecodeError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid JSON format: {str(e)}"
         )
+    except (ValueError, csv.Error) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Import failed: {str(e)}"
+        )
+    finally:
+        jobs.remove_job_file(file_path)
+    
+    return schemas.ImportResponse(
+        imported_count=result.imported,
+        updated_count=result.updated,
+        skipped_count=result.skipped,
+        failed_count=len(result.errors),
+        errors=result.errors
+    )
 
 
-async def import_html(import_request: schemas.ImportRequest, current_user: User, db: AsyncSession):
-    """Import bookmarks from HTML format (browser bookmarks)"""
+async def _import_job(format: str, chunks: AsyncIterator[str], on_duplicate: str, current_user: User, db: AsyncSession):
+    """Store the upload and queue a background import"""
+    if await crud.count_active_jobs(db, current_user.id) >= jobs.JOB_MAX_ACTIVE_PER_USER:
+        raise _too_many_jobs()
+    
+    job_id = uuid4()
+    file_path = jobs.job_file_path(job_id, "upload")
     try:
-        # Decode base64 data if needed
-        if import_request.data.startswith('data:'):
-            data = import_request.data.split(',')[1]
-            decoded_data = base64.b64decode(data).decode('utf-8')
-        else:
-            decoded_data = import_request.data
-        
-        # Parse HTML to extract links
-        link_pattern = r'<A HREF="([^"]*)"[^>]*>([^<]*)</A>'
-        matches = re.findall(link_pattern, decoded_data, re.IGNORECASE)
-        
-        imported_count = 0
-        failed_count = 0
-        errors = []
-        
-        for url, title in matches:
-            try:
-                bookmark_create = schemas.BookmarkCreate(
-                    url=url,
-                    title=title.strip()
-                )
-                
-                await crud.create_bookmark(db, bookmark_create, current_user.id)
-                imported_count += 1
-                
-            except Exception as e:
-                failed_count += 1
-                errors.append(f"Failed to import bookmark {title}: {str(e)}")
-        
-        return schemas.ImportResponse(
-            imported_count=imported_count,
-            failed_count=failed_count,
-            errors=errors
+        await jobs.save_upload(chunks, file_path)
+        job = await crud.create_job(
+            db,
+            current_user.id,
+            JobKind.IMPORT,
+            format,
+            file_path=file_path,
+            job_id=job_id,
+            max_active=jobs.JOB_MAX_ACTIVE_PER_USER,
+            on_duplicate=on_duplicate
         )
-        
-    except Exception as e:
+    except (ValueError, csv.Error) as e:
+        jobs.remove_job_file(file_path)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Failed to parse HTML: {str(e)}"
+            detail=f"Import failed: {str(e)}"
         )
+    if job is None:
+        jobs.remove_job_file(file_path)
+        raise _too_many_jobs()
+    
+    jobs.runner.submit(job.id)
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=jsonable_encoder(schemas.Job.model_validate(job))
+    )
+
+
+def _too_many_jobs() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many active jobs"
+    )
 
 
-async def import_csv(import_request: schemas.ImportRequest, current_user: User, db: AsyncSession):
-    """Import bookmarks from CSV format"""
+async def _import_text(request: Request) -> AsyncIterator[str]:
+    """Text chunks of the imported file, whichever way it was sent"""
+    content_type = request.headers.get("content-type", "")
+    media_type = content_type.split(";")[0].strip().lower()
+    
+    if media_type == "multipart/form-data":
+        return iter_upload_text(iter_multipart_file(request.stream(), content_type))
+    if media_type == "application/octet-stream":
+        return iter_upload_text(request.stream())
+    
+    # JSON body with the file inside ImportRequest.data
     try:
-        import csv
-        from io import StringIO
-        
-        # Decode base64 data if needed
-        if import_request.data.startswith('data:'):
-            data = import_request.data.split(',')[1]
-            decoded_data = base64.b64decode(data).decode('utf-8')
-        else:
-            decoded_data = import_request.data
-        
-        csv_reader = csv.DictReader(StringIO(decoded_data))
-        
-        imported_count = 0
-        failed_count = 0
-        errors = []
-        
-        for row in csv_reader:
-            try:
-                bookmark_create = schemas.BookmarkCreate(
-                    url=row['URL'],
-                    title=row.get('Title', row['URL']),
-                    description=row.get('Description', ''),
-                    access_level=AccessLevel(row.get('Access Level', 'private'))
-                )
-                
-                await crud.create_bookmark(db, bookmark_create, current_user.id)
-                imported_count += 1
-                
-            except Exception as e:
-                failed_count += 1
-                errors.append(f"Failed to import bookmark {row.get('Title', 'Unknown')}: {str(e)}")
-        
-        return schemas.ImportResponse(
-            imported_count=imported_count,
-            failed_count=failed_count,
-            errors=errors
+        body = await request.json()
+    except json.JSONDecodeError as e:
+        raise RequestValidationError(
+            [{"type": "json_invalid", "loc": ("body", e.pos), "msg": "JSON decode error", "input": {}}]
         )
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Failed to parse CSV: {str(e)}"
+    try:
+        import_request = schemas.ImportRequest.model_validate(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
         )
+    return iter_import_text(import_request.data)
+
+
+def _bookmark_limit(current_user: User):
+    """Bookmark limit applied to the imported rows"""
+    return crud.FREE_TIER_BOOKMARK_LIMIT if current_user.account_type.value == "free" else None
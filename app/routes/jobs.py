@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import schemas, crud, auth, exporters
+from app.database import get_db
+from app.models import User, JobKind, JobStatus
+from uuid import UUID
+import os
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+async def _get_job(job_id: UUID, current_user: User, db: AsyncSession):
+    job = await crud.get_job(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+
+@router.get("/{job_id}", response_model=schemas.Job)
+async def get_job(
+    job_id: UUID,
+    current_user: User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the status, progress and errors of a background job"""
+    return await _get_job(job_id, current_user, db)
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(
+    job_id: UUID,
+    current_user: User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Download the file produced by a completed export job"""
+    job = await _get_job(job_id, current_user, db)
+
+    if job.kind != JobKind.EXPORT:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job has no result file"
+        )
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Job is not completed"
+        )
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Result file is no longer available"
+        )
+
+    return FileResponse(
+        job.file_path,
+        media_type=exporters.EXPORT_MEDIA_TYPES[job.format],
+        filename=exporters.export_filename(job.format)
+    )
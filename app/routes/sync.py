@@ -0,0 +1,155 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
+from app import schemas, crud, auth, events
+from app.database import get_db
+from app.models import User
+from typing import Optional
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+
+@router.get("", response_model=schemas.SyncResponse)
+async def get_changes(
+    since: int = Query(0, ge=0, description="server_version from the previous sync, 0 for a full sync"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum number of changes to return"),
+    device_id: Optional[str] = Query(
+        None, min_length=1, max_length=64,
+        description="Stable id of the syncing device, lets deletions be compacted once it has seen them"
+    ),
+    current_user: User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(auth.get_read_db),
+    write_db: AsyncSession = Depends(get_db)
+):
+    """Get the bookmarks changed and deleted since the last sync.
+
+    Pass the returned server_version as ``since`` on the next call. While
+    has_more is true the delta is incomplete and the client should keep
+    paging before it considers itself in sync. full_resync means some
+    deletions after ``since`` are no longer known: the client should drop
+    its copy and sync again from 0.
+    """
+    if device_id is not None:
+        # Asking for changes after ``since`` acknowledges everything up to it
+        await crud.register_sync_device(write_db, current_user.id, device_id, since)
+
+    delta = await crud.get_sync_data(
+        db=db,
+        owner_id=current_user.id,
+        since=since,
+        limit=limit
+    )
+
+    return schemas.SyncResponse(
+        bookmarks=delta.bookmarks,
+        deleted_bookmarks=delta.deleted_ids,
+        server_version=delta.server_version,
+        has_more=delta.has_more,
+        full_resync=delta.full_resync
+    )
+
+
+@router.get("/events", response_class=StreamingResponse)
+async def change_events(
+    since: int = Query(0, ge=0, description="server_version the client has already synced to"),
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream a server-sent "changed" event whenever the user's bookmarks change.
+
+    Events only carry the new server_version; the client fetches the
+    changes with GET /sync. On reconnect the EventSource sends the last
+    event id, and a change missed in between is announced right away.
+    """
+    if last_event_id is not None and last_event_id.isdigit():
+        since = max(since, int(last_event_id))
+
+    # Subscribe before reading change_seq so no write falls in between
+    subscription = events.broker.subscribe(current_user.id)
+    subscription.notify(await crud.get_change_seq(db, current_user.id))
+    # Don't hold a pooled connection for the life of the stream
+    await db.commit()
+
+    return StreamingResponse(
+        events.change_stream(subscription, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also covers a client that leaves before the stream starts
+        background=BackgroundTask(events.broker.unsubscribe, subscription)
+    )
+
+
+@router.post("/resolve", response_model=schemas.SyncResolveResponse)
+async def resolve_conflicts(
+    request: schemas.SyncResolveRequest,
+    current_user: User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Apply a batch of conflict resolutions in one transaction.
+
+    A "client" resolution overwrites the bookmark with client_data, but
+    only if it is still at the sync_version the client resolved against
+    (server_data's, else client_data's). A bookmark changed in the
+    meantime is reported as a conflict with its current sync_version, so
+    the client can fetch it and resolve again. Resolutions that would give
+    two bookmarks the same URL are rejected together with 409.
+    """
+    bookmark_ids = [resolution.bookmark_id for resolution in request.resolutions]
+    if len(set(bookmark_ids)) != len(bookmark_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Duplicate bookmark_id in resolutions"
+        )
+
+    changes = []
+    for resolution in request.resolutions:
+        if resolution.resolution != "client":
+            continue
+        if resolution.client_data is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="client_data is required for a client resolution"
+            )
+        data = resolution.client_data
+        changes.append(crud.ResolutionChange(
+            bookmark_id=resolution.bookmark_id,
+            expected_version=(resolution.server_data or data).sync_version,
+            values={
+                "url": str(data.url),
+                "title": data.title,
+                "description": data.description,
+                "access_level": data.access_level,
+                "status": data.status,
+            }
+        ))
+
+    try:
+        applied, server_version = await crud.apply_resolutions(db, current_user.id, changes)
+    except crud.DuplicateURLError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A bookmark with this URL already exists"
+        )
+    current = await crud.get_sync_versions(
+        db, current_user.id, [bookmark_id for bookmark_id in bookmark_ids if bookmark_id not in applied]
+    )
+
+    results = []
+    for resolution in request.resolutions:
+        bookmark_id = resolution.bookmark_id
+        if bookmark_id in applied:
+            result = schemas.ResolutionResult(bookmark_id=bookmark_id, status="applied", sync_version=applied[bookmark_id])
+        elif bookmark_id not in current:
+            result = schemas.ResolutionResult(bookmark_id=bookmark_id, status="not_found")
+        else:
+            outcome = "kept" if resolution.resolution == "server" else "conflict"
+            result = schemas.ResolutionResult(bookmark_id=bookmark_id, status=outcome, sync_version=current[bookmark_id])
+        results.append(result)
+
+    return schemas.SyncResolveResponse(
+        resolved_count=sum(result.status in ("applied", "kept") for result in results),
+        sync_version=server_version,
+        results=results
+    )
@@ -2,7 +2,7 @@ from pydantic import BaseModel, EmailStr, Field, HttpUrl
 from datetime import datetime
 from typing import Optional, List
 from uuid import UUID
-from app.models import AccountType, BookmarkStatus, AccessLevel
+from app.models import AccountType, BookmarkStatus, AccessLevel, JobKind, JobStatus
 
 
 # User schemas
@@ -55,6 +55,11 @@ class BookmarkCreate(BookmarkBase):
     pass
 
 
+class BookmarkImport(BookmarkCreate):
+    # Original creation time kept from the imported file
+    created_at: Optional[datetime] = None
+
+
 class BookmarkUpdate(BaseModel):
     url: Optional[HttpUrl] = Field(None, max_length=2000)
     title: Optional[str] = Field(None, max_length=255)
@@ -77,8 +82,51 @@ class Bookmark(BookmarkBase):
 # Bookmark list response
 class BookmarkListResponse(BaseModel):
     bookmarks: List[Bookmark]
-    total_count: int
+    total_count: Optional[int] = None
     has_more: bool
+    next_cursor: Optional[str] = None
+
+
+class BookmarkSuggestion(BaseModel):
+    id: UUID
+    title: str
+    url: str
+
+    class Config:
+        from_attributes = True
+
+
+class BookmarkSuggestResponse(BaseModel):
+    suggestions: List[BookmarkSuggestion]
+
+
+class BookmarkBatchOperation(BaseModel):
+    op: str = Field(..., pattern="^(create|update|delete)$")
+    # Bookmark to update or delete
+    id: Optional[UUID] = None
+    # New bookmark for create
+    bookmark: Optional[BookmarkCreate] = None
+    # Fields to change for update, as for PUT /bookmarks/{id}
+    changes: Optional[BookmarkUpdate] = None
+
+
+class BookmarkBatchRequest(BaseModel):
+    operations: List[BookmarkBatchOperation] = Field(..., min_length=1, max_length=1000)
+
+
+class BookmarkOperationResult(BaseModel):
+    # created, updated, deleted, not_found, limit_exceeded or duplicate
+    status: str
+    # Bookmark id, of the new bookmark for create
+    id: Optional[UUID] = None
+    sync_version: Optional[int] = None
+
+
+class BookmarkBatchResponse(BaseModel):
+    # Results in the order of the operations
+    results: List[BookmarkOperationResult]
+    # Change sequence after the batch, as server_version of GET /sync
+    server_version: int
 
 
 # Import/Export schemas
@@ -89,10 +137,35 @@ class ImportRequest(BaseModel):
 
 class ImportResponse(BaseModel):
     imported_count: int
+    # Bookmarks the user already had: changed by merge/overwrite, or left alone
+    updated_count: int = 0
+    skipped_count: int = 0
     failed_count: int
     errors: List[str] = []
 
 
+# Background job schemas
+class Job(BaseModel):
+    id: UUID
+    kind: JobKind
+    format: str
+    status: JobStatus
+    processed_count: int = 0
+    total_count: Optional[int] = None
+    imported_count: int = 0
+    updated_count: int = 0
+    skipped_count: int = 0
+    failed_count: int = 0
+    errors: List[str] = []
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Sync schemas
 class SyncRequest(BaseModel):
     last_sync: Optional[datetime] = None
@@ -104,6 +177,9 @@ class SyncResponse(BaseModel):
     deleted_bookmarks: List[UUID] = []
     deleted_collections: List[UUID] = []
     server_version: int
+    has_more: bool = False
+    # Deletions before ``since`` were compacted: sync again from 0
+    full_resync: bool = False
     has_conflicts: bool = False
 
 
@@ -115,12 +191,21 @@ class ConflictResolution(BaseModel):
 
 
 class SyncResolveRequest(BaseModel):
-    resolutions: List[ConflictResolution]
+    resolutions: List[ConflictResolution] = Field(..., max_length=1000)
+
+
+class ResolutionResult(BaseModel):
+    bookmark_id: UUID
+    # applied, kept (server version), conflict (changed meanwhile) or not_found
+    status: str
+    # Current sync_version of the bookmark, None if it doesn't exist
+    sync_version: Optional[int] = None
 
 
 class SyncResolveResponse(BaseModel):
     resolved_count: int
     sync_version: int
+    results: List[ResolutionResult] = []
 
 
 # Error schema
@@ -23,6 +23,33 @@ const Bookmarks = {
         document.getElementById('bookmark-search').addEventListener('input', () => {
             this.filterBookmarks();
         });
+
+        // Typeahead from the server, so bookmarks not rendered yet can be found
+        const suggest = Utils.debounce(() => this.loadSuggestions(), 150);
+        document.getElementById('bookmark-search').addEventListener('input', suggest);
+    },
+
+    loadSuggestions: async function() {
+        const prefix = document.getElementById('bookmark-search').value.trim();
+        const datalist = document.getElementById('bookmark-suggestions');
+
+        if (!prefix) {
+            datalist.innerHTML = '';
+            return;
+        }
+
+        try {
+            const token = sessionStorage.getItem('authToken');
+            const suggestions = await Utils.suggestBookmarks(token, prefix);
+            // Ignore a response for text the user has already changed
+            if (document.getElementById('bookmark-search').value.trim() !== prefix) return;
+
+            datalist.innerHTML = suggestions.map(suggestion => `
+                <option value="${Utils.escapeHtml(suggestion.title)}">${Utils.escapeHtml(suggestion.url)}</option>
+            `).join('');
+        } catch (error) {
+            console.error('Failed to load suggestions:', error);
+        }
     },
 
     loadBookmarks: function() {
@@ -210,6 +210,24 @@ const Utils = {
         }
     },
 
+    suggestBookmarks: async (token, prefix, limit = 10) => {
+        const myHeaders = new Headers();
+        myHeaders.append("Authorization", `Bearer ${token}`);
+
+        const params = new URLSearchParams({ prefix: prefix, limit: limit });
+        const response = await fetch(`http://localhost:8082/bookmarks/suggest?${params}`, {
+            method: "GET",
+            headers: myHeaders
+        });
+
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const result = await response.json();
+        return result.suggestions;
+    },
+
     putBookmark: (token, bookmarkData) => {
         const myHeaders = new Headers();
         myHeaders.append("Content-Type", "application/json");
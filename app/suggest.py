@@ -0,0 +1,86 @@
+import os
+import re
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Iterable, List, NamedTuple, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from app.cache import TTLCache
+
+# Users whose prefix index is kept in memory
+SUGGEST_INDEX_USERS = int(os.getenv("SUGGEST_INDEX_USERS", "1000"))
+
+# Seconds an index is kept before it is rebuilt from the database
+SUGGEST_INDEX_TTL = float(os.getenv("SUGGEST_INDEX_TTL", "600"))
+
+_WORD = re.compile(r"\w+")
+
+
+class Suggestion(NamedTuple):
+    id: Any
+    title: str
+    url: str
+
+
+def _url_keys(url: str) -> List[str]:
+    """The host and its labels: www.github.com -> github.com, github, com"""
+    host = (urlsplit(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return [host, *host.split(".")] if host else []
+
+
+class PrefixIndex:
+    """Sorted keys of one user's bookmarks, searched by prefix with bisect.
+
+    Whole titles are matched first, then the words of titles and the
+    host of URLs, so "gi" finds "Git book" before "Learn git".
+    """
+
+    def __init__(self, rows: Iterable[Tuple], change_seq: int):
+        self.change_seq = change_seq
+        self.rows = [Suggestion(*row) for row in rows]
+        title_keys = []
+        word_keys = []
+        for position, row in enumerate(self.rows):
+            title = row.title.lower()
+            title_keys.append((title, position))
+            for key in {*_WORD.findall(title), *_url_keys(row.url)}:
+                word_keys.append((key, position))
+        self._levels = [sorted(title_keys), sorted(word_keys)]
+
+    def lookup(self, prefix: str, limit: int) -> List[Suggestion]:
+        prefix = prefix.lower()
+        found: List[int] = []
+        for keys in self._levels:
+            for i in range(bisect_left(keys, (prefix, -1)), len(keys)):
+                key, position = keys[i]
+                if len(found) >= limit or not key.startswith(prefix):
+                    break
+                if position not in found:
+                    found.append(position)
+        return [self.rows[position] for position in found]
+
+
+# user id -> PrefixIndex
+prefix_indexes = TTLCache(SUGGEST_INDEX_USERS, SUGGEST_INDEX_TTL)
+
+
+async def suggest_from_index(
+    owner_id,
+    change_seq: int,
+    prefix: str,
+    limit: int,
+    load_rows: Callable[[], Awaitable[Sequence[Tuple]]]
+) -> List[Suggestion]:
+    """Look ``prefix`` up in the user's in-memory index.
+
+    The index is built on first use from ``load_rows`` (id, title, url) and
+    is thrown away as soon as the user's change_seq moves on, i.e. after any
+    write to their bookmarks from any process.
+    """
+    key = str(owner_id)
+    index = prefix_indexes.get(key)
+    if index is None or index.change_seq != change_seq:
+        index = PrefixIndex(await load_rows(), change_seq)
+        prefix_indexes.set(key, index)
+    return index.lookup(prefix, limit)
@@ -0,0 +1,56 @@
+import hashlib
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+# Ports dropped from the canonical form
+DEFAULT_PORTS = {"http": 80, "https": 443, "ftp": 21}
+
+# Query parameters that only track where a visit came from
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid",
+    "igshid", "mc_cid", "mc_eid", "_hsenc", "_hsmi",
+})
+TRACKING_PREFIXES = ("utm_",)
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url: str) -> str:
+    """The form two URLs of the same page have in common.
+
+    Lower-cases the scheme and host, drops the default port, a trailing
+    slash of the path and tracking parameters. The rest of the query, its
+    order and the fragment are kept, since sites use them for content.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    userinfo, _, hostport = parts.netloc.rpartition("@")
+    netloc = hostport.lower()
+    try:
+        host, port = parts.hostname, parts.port
+    except ValueError:
+        # Not a valid port, keep the netloc as it is
+        host, port = None, None
+    if host is not None:
+        netloc = f"[{host}]" if ":" in host else host
+        if port is not None and port != DEFAULT_PORTS.get(scheme):
+            netloc = f"{netloc}:{port}"
+    if userinfo:
+        netloc = f"{userinfo}@{netloc}"
+
+    # Parameters are dropped from the raw query, never decoded and
+    # re-encoded, so "%20" and "+" stay as written with or without tracking
+    query = "&".join(
+        param for param in parts.query.split("&")
+        if not _is_tracking(unquote_plus(param.partition("=")[0]))
+    )
+
+    return urlunsplit((scheme, netloc, parts.path.rstrip("/"), query, parts.fragment))
+
+
+def url_hash(url: str) -> bytes:
+    """16-byte digest of the canonical URL, unique per user's bookmarks"""
+    return hashlib.blake2b(canonical_url(url).encode("utf-8"), digest_size=16).digest()
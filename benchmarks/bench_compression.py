@@ -0,0 +1,87 @@
+"""
+Benchmark of gzip compression for export payloads.
+
+Renders synthetic bookmarks with the export writers and compresses the
+stream the way GZipMiddleware does (one Z_SYNC_FLUSH per writer chunk),
+for each format and a few zlib levels. Reports bytes on the wire, the
+compression ratio and the CPU time spent compressing per MiB of output.
+
+Usage: python benchmarks/bench_compression.py [bookmarks]
+"""
+import asyncio
+import os
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import exporters
+from app.models import AccessLevel, BookmarkStatus
+
+LEVELS = (1, 6, 9)
+
+
+def build_rows(count: int):
+    """Bookmark rows shaped like the ones streamed from the database"""
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        SimpleNamespace(
+            id=uuid4(),
+            url=f"https://example{i % 500}.com/articles/{i}?utm_source=newsletter",
+            title=f"Example bookmark number {i}",
+            description=f"Notes about bookmark {i}" if i % 3 == 0 else None,
+            access_level=AccessLevel.PRIVATE,
+            status=BookmarkStatus.ACTIVE,
+            created_at=created_at + timedelta(seconds=i),
+            updated_at=None,
+        )
+        for i in range(count)
+    ]
+
+
+def render(format: str, rows) -> list:
+    """Writer output as the list of encoded body messages"""
+    async def chunks():
+        for i in range(0, len(rows), exporters.EXPORT_CHUNK_SIZE):
+            yield rows[i:i + exporters.EXPORT_CHUNK_SIZE]
+
+    async def collect():
+        return [piece.encode("utf-8") async for piece in exporters.export_writer(format, chunks(), len(rows))]
+
+    return asyncio.run(collect())
+
+
+def compress(pieces: list, level: int) -> int:
+    """Compressed size of the streamed body"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    size = 0
+    for piece in pieces:
+        size += len(compressor.compress(piece)) + len(compressor.flush(zlib.Z_SYNC_FLUSH))
+    return size + len(compressor.flush())
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rows = build_rows(count)
+    print(f"{count} bookmarks")
+
+    for format in exporters.EXPORT_MEDIA_TYPES:
+        pieces = render(format, rows)
+        raw = sum(len(piece) for piece in pieces)
+        print(f"{format:5} identity {raw / 2**20:8.2f} MiB")
+        for level in LEVELS:
+            start = time.process_time()
+            size = compress(pieces, level)
+            cpu = time.process_time() - start
+            print(
+                f"{format:5} gzip -{level}  {size / 2**20:8.2f} MiB  ratio {raw / size:5.1f}x  "
+                f"cpu {cpu * 1000 / (raw / 2**20):6.1f} ms/MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark of parsing a large Netscape bookmark file for import.
+
+Compares the old whole-document regex extraction with the incremental
+html.parser-based reader on a synthetic browser export with nested
+folders. Reports throughput and the peak memory allocated while parsing
+(tracemalloc), not counting the input document itself.
+
+Usage: python benchmarks/bench_html_import.py [links]
+"""
+import asyncio
+import base64
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.importers import iter_import_text, iter_netscape_bookmarks
+
+
+def build_export(links: int) -> str:
+    """Synthetic export: 100 links per folder, folders nested two deep"""
+    parts = [
+        '<!DOCTYPE NETSCAPE-Bookmark-file-1>\n'
+        '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">\n'
+        '<TITLE>Bookmarks</TITLE>\n<H1>Bookmarks</H1>\n<DL><p>\n'
+    ]
+    for i in range(links):
+        if i % 1000 == 0:
+            if i:
+                parts.append('    </DL><p>\n')
+            parts.append(f'    <DT><H3 ADD_DATE="1600000000">Folder {i // 1000}</H3>\n    <DL><p>\n')
+        if i % 100 == 0:
+            if i % 1000:
+                parts.append('        </DL><p>\n')
+            parts.append(f'        <DT><H3 ADD_DATE="1600000000">Sub {i // 100}</H3>\n        <DL><p>\n')
+        parts.append(
+            f'            <DT><A HREF="https://example{i}.com/path?q={i}" ADD_DATE="{1600000000 + i}" '
+            f'ICON="data:image/png;base64,iVBORw0KGgo=">Example bookmark number {i}</A>\n'
+        )
+        if i % 10 == 0:
+            parts.append(f'            <DD>Description of bookmark {i}\n')
+    parts.append('        </DL><p>\n    </DL><p>\n</DL><p>\n')
+    return ''.join(parts)
+
+
+def parse_regex(document: str) -> int:
+    """Previous implementation: decode everything, then re.findall"""
+    if document.startswith('data:'):
+        document = base64.b64decode(document.split(',')[1]).decode('utf-8')
+    matches = re.findall(r'<A HREF="([^"]*)"[^>]*>([^<]*)</A>', document, re.IGNORECASE)
+    return len([(url, title.strip()) for url, title in matches])
+
+
+def parse_stream(document: str) -> int:
+    """Incremental reader"""
+    async def count():
+        return sum([1 async for _ in iter_netscape_bookmarks(iter_import_text(document))])
+    return asyncio.run(count())
+
+
+def measure(parse, document: str):
+    """Time a run, then repeat it under tracemalloc for the peak"""
+    start = time.perf_counter()
+    count = parse(document)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    parse(document)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main():
+    links = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    plain = build_export(links)
+    encoded = 'data:text/html;base64,' + base64.b64encode(plain.encode('utf-8')).decode('ascii')
+    print(f"{links} links, {len(plain) / 2**20:.1f} MiB of HTML")
+
+    for label, document in (("plain text", plain), ("base64 data URL", encoded)):
+        for name, parse in (("regex", parse_regex), ("stream", parse_stream)):
+            count, elapsed, peak = measure(parse, document)
+            print(
+                f"{label:16} {name:7} {count:7} links  {count / elapsed:9.0f} links/s  "
+                f"peak {peak / 2**20:7.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
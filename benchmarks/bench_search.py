@@ -0,0 +1,127 @@
+"""
+Benchmark of GET /bookmarks/search query latency on Postgres.
+
+Fills one user with synthetic bookmarks (100k by default), then times
+crud.search_bookmarks for a few kinds of queries: a word most bookmarks
+contain, a rare word, two words, a quoted phrase and the tenth page of a
+common word. The client-side alternative, streaming the whole account as
+for /export/json and filtering it in Python, is timed for comparison.
+
+Needs a database migrated to head (alembic upgrade head) at DATABASE_URL.
+The bench user and its bookmarks are deleted afterwards.
+
+Usage: DATABASE_URL=postgresql+asyncpg://... python benchmarks/bench_search.py [bookmarks]
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import crud, database
+from app.models import Bookmark, User, UserBookmarkStats
+from app.schemas import BookmarkCreate
+
+WORDS = (
+    "python rust postgres index query cache async design recipe garden travel music "
+    "history physics kernel compiler network security browser editor terminal keyboard "
+    "camera coffee bread climbing running budget taxes housing course lecture paper"
+).split()
+
+INSERT_CHUNK = 5000
+REPEAT = 20
+
+
+def build_bookmarks(count: int, rng: random.Random):
+    """Titles and descriptions with a skewed word distribution"""
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    for i in range(count):
+        title = " ".join(rng.choices(WORDS, weights, k=4))
+        description = " ".join(rng.choices(WORDS, weights, k=12)) if i % 2 else None
+        yield BookmarkCreate(
+            url=f"https://{rng.choice(WORDS)}.example.com/{i}",
+            title=title.capitalize(),
+            description=description
+        )
+
+
+async def timed(coro_factory) -> list:
+    """Milliseconds per call over REPEAT calls, after one warm-up call"""
+    await coro_factory()
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        await coro_factory()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name: str, samples: list):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{name:28} median {statistics.median(samples):8.2f} ms  p95 {p95:8.2f} ms")
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    engine = create_async_engine(database.DATABASE_URL)
+    rng = random.Random(42)
+    owner_id = uuid4()
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        db.add(User(id=owner_id, username=f"bench-{owner_id}", email=f"{owner_id}@bench.invalid", hashed_password="-"))
+        db.add(UserBookmarkStats(user_id=owner_id))
+        await db.commit()
+
+        try:
+            start = time.perf_counter()
+            bookmarks = list(build_bookmarks(count, rng))
+            for i in range(0, count, INSERT_CHUNK):
+                await crud.create_bookmarks_bulk(db, bookmarks[i:i + INSERT_CHUNK], owner_id)
+            await db.execute(text("ANALYZE bookmarks"))
+            await db.commit()
+            print(f"{count} bookmarks inserted in {time.perf_counter() - start:.1f} s")
+
+            async def search(query: str, pages: int = 1):
+                cursor = None
+                for _ in range(pages):
+                    page = await crud.search_bookmarks(db, owner_id, query, limit=50, cursor=cursor)
+                    cursor = page.last_position
+                await db.rollback()
+
+            report("common word", await timed(lambda: search(WORDS[0])))
+            report("rare word", await timed(lambda: search(WORDS[-1])))
+            report("two words", await timed(lambda: search(f"{WORDS[1]} {WORDS[5]}")))
+            report("phrase", await timed(lambda: search(f'"{WORDS[0]} {WORDS[1]}"')))
+            report("common word, page 10", await timed(lambda: search(WORDS[0], pages=10)))
+
+            async def filter_locally():
+                word = WORDS[-1]
+                matches = []
+                async for rows in crud.stream_user_bookmarks(db, owner_id):
+                    matches.extend(
+                        row for row in rows
+                        if word in row.title.lower() or word in (row.description or "").lower() or word in row.url
+                    )
+                await db.rollback()
+
+            report("client-side filter", await timed(filter_locally))
+        finally:
+            await db.rollback()
+            await db.execute(delete(Bookmark).where(Bookmark.owner_id == owner_id))
+            await db.execute(delete(UserBookmarkStats).where(UserBookmarkStats.user_id == owner_id))
+            await db.execute(delete(User).where(User.id == owner_id))
+            await db.commit()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
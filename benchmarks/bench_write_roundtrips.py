@@ -0,0 +1,171 @@
+"""
+Benchmark of database round trips per bookmark write on Postgres.
+
+Runs create, update and delete of one bookmark, and the creation of a
+user, through app.crud and through the previous implementations kept
+below: those read the row before changing it, refreshed it after the
+commit and set sync_version in Python. For each it prints the round trips
+(statements plus the commit) and the median latency.
+
+Needs a database migrated to head (alembic upgrade head) at DATABASE_URL.
+The bench users and their bookmarks are deleted afterwards. The round
+trips of the current write paths, counted the same way, are also asserted
+by TestPostgresRoundTrips in tests/test_postgres.py, which runs in CI.
+
+Usage: DATABASE_URL=postgresql+asyncpg://... python benchmarks/bench_write_roundtrips.py [repeat]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import crud, database
+from app.models import Bookmark, BookmarkTombstone, User, UserBookmarkStats
+from app.schemas import BookmarkCreate, UserCreate
+
+
+# Previous write path
+
+async def legacy_create_user(db: AsyncSession, user: UserCreate):
+    db_user = User(username=user.username, email=user.email, hashed_password="-")
+    db.add(db_user)
+    await db.flush()
+    db.add(UserBookmarkStats(user_id=db_user.id))
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+
+async def legacy_create_bookmark(db: AsyncSession, bookmark: BookmarkCreate, owner_id):
+    await crud._ensure_bookmark_stats(db, owner_id)
+    await crud._touch_bookmark_stats(db, owner_id, count_delta=1, changes=0)
+    db_bookmark = Bookmark(
+        url=str(bookmark.url),
+        title=bookmark.title,
+        owner_id=owner_id,
+        change_seq=await crud._touch_bookmark_stats(db, owner_id)
+    )
+    db.add(db_bookmark)
+    await db.commit()
+    await db.refresh(db_bookmark)
+    return db_bookmark
+
+
+async def legacy_update_bookmark(db: AsyncSession, bookmark_id, owner_id, **values):
+    bookmark = await crud.get_bookmark(db, bookmark_id, owner_id)
+    for key, value in values.items():
+        setattr(bookmark, key, value)
+    bookmark.sync_version += 1
+    bookmark.change_seq = await crud._touch_bookmark_stats(db, owner_id, sync_version=bookmark.sync_version)
+    await db.commit()
+    await db.refresh(bookmark)
+    return bookmark
+
+
+async def legacy_delete_bookmark(db: AsyncSession, bookmark_id, owner_id):
+    bookmark = await crud.get_bookmark(db, bookmark_id, owner_id)
+    await db.delete(bookmark)
+    change_seq = await crud._touch_bookmark_stats(db, owner_id, count_delta=-1)
+    db.add(BookmarkTombstone(bookmark_id=bookmark.id, owner_id=owner_id, change_seq=change_seq))
+    await db.commit()
+    return True
+
+
+class RoundTrips:
+    """Counts statements and commits sent on an engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_statement)
+        event.listen(engine.sync_engine, "commit", self._on_statement)
+
+    def _on_statement(self, *args, **kwargs):
+        self.count += 1
+
+
+async def measure(db: AsyncSession, trips: RoundTrips, repeat: int, operation):
+    """(median round trips, median milliseconds) over ``repeat`` calls"""
+    counts, samples = [], []
+    for i in range(repeat):
+        # Every session starts empty, as in a request
+        db.expunge_all()
+        before = trips.count
+        start = time.perf_counter()
+        await operation(i)
+        samples.append((time.perf_counter() - start) * 1000)
+        counts.append(trips.count - before)
+    return statistics.median_low(counts), statistics.median(samples)
+
+
+def report(name: str, before: tuple, after: tuple):
+    print(
+        f"{name:16} round trips {before[0]:2} -> {after[0]:2}   "
+        f"median {before[1]:7.2f} ms -> {after[1]:7.2f} ms"
+    )
+
+
+async def skip_password_hash(password: str) -> str:
+    return "-"
+
+
+async def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    engine = create_async_engine(database.DATABASE_URL)
+    trips = RoundTrips(engine)
+    # Hashing is CPU time, not a round trip, and would hide the difference
+    crud.get_password_hash_async = skip_password_hash
+    run = uuid4().hex[:8]
+    user_ids = []
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        try:
+            results = {}
+            for label, create_user, create, update, remove in (
+                ("before", legacy_create_user, legacy_create_bookmark, legacy_update_bookmark, legacy_delete_bookmark),
+                ("after", crud.create_user, crud.create_bookmark, crud.update_bookmark, crud.delete_bookmark),
+            ):
+                async def new_user(i):
+                    user = UserCreate(username=f"bench-{run}-{label}-{i}", email=f"{run}-{label}-{i}@bench.invalid", password="bench-password")
+                    user_ids.append((await create_user(db, user)).id)
+
+                results[label, "create user"] = await measure(db, trips, repeat, new_user)
+                owner_id = user_ids[-1]
+
+                bookmark_ids = []
+
+                async def create_bookmark(i):
+                    bookmark = await create(db, BookmarkCreate(url=f"https://bench.example.com/{i}", title=f"Bench {i}"), owner_id)
+                    bookmark_ids.append(bookmark.id)
+
+                async def update_bookmark(i):
+                    await update(db, bookmark_ids[i], owner_id, title=f"Edited {i}")
+
+                async def delete_bookmark(i):
+                    await remove(db, bookmark_ids[i], owner_id)
+
+                results[label, "create bookmark"] = await measure(db, trips, repeat, create_bookmark)
+                results[label, "update bookmark"] = await measure(db, trips, repeat, update_bookmark)
+                results[label, "delete bookmark"] = await measure(db, trips, repeat, delete_bookmark)
+
+            for name in ("create user", "create bookmark", "update bookmark", "delete bookmark"):
+                report(name, results["before", name], results["after", name])
+        finally:
+            await db.rollback()
+            await db.execute(delete(BookmarkTombstone).where(BookmarkTombstone.owner_id.in_(user_ids)))
+            await db.execute(delete(Bookmark).where(Bookmark.owner_id.in_(user_ids)))
+            await db.execute(delete(UserBookmarkStats).where(UserBookmarkStats.user_id.in_(user_ids)))
+            await db.execute(delete(User).where(User.id.in_(user_ids)))
+            await db.commit()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
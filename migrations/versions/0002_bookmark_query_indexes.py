@@ -0,0 +1,55 @@
+"""bookmark query indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:05:00.000000
+
+Composite indexes for the per-owner queries in app.crud. They are built
+with CREATE INDEX CONCURRENTLY outside of the migration transaction so a
+large bookmarks table stays writable while they build.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    # get_user_bookmarks / get_bookmarks_count: owner filter + keyset order
+    ("ix_bookmarks_owner_created_id", [sa.text("owner_id"), sa.text("created_at DESC"), sa.text("id DESC")]),
+    # get_server_version: max(sync_version) per owner
+    ("ix_bookmarks_owner_sync_version", ["owner_id", "sync_version"]),
+    # get_sync_data: updated_at > last_sync per owner, ordered by updated_at
+    ("ix_bookmarks_owner_updated_at", ["owner_id", "updated_at"]),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(
+                name,
+                "bookmarks",
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name="bookmarks",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,51 @@
+"""user bookmark stats
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00.000000
+
+Per-user aggregates read by the list, quota and sync paths instead of
+aggregating the user's bookmarks on every request. Existing users are
+backfilled from the bookmarks table.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_bookmark_stats",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("bookmark_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("max_sync_version", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("last_modified", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.execute(
+        """
+        INSERT INTO user_bookmark_stats (user_id, bookmark_count, max_sync_version, last_modified)
+        SELECT u.id,
+               count(b.id),
+               coalesce(max(b.sync_version), 0),
+               coalesce(max(coalesce(b.updated_at, b.created_at)), now())
+        FROM users u
+        LEFT JOIN bookmarks b ON b.owner_id = u.id
+        GROUP BY u.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_bookmark_stats")
@@ -0,0 +1,60 @@
+"""jobs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00.000000
+
+Background import and export jobs. The table doubles as the queue the
+in-process job runner claims work from, and stores the import checkpoint
+that lets an interrupted job resume.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "jobs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("owner_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("kind", sa.Enum("IMPORT", "EXPORT", name="jobkind"), nullable=False),
+        sa.Column("format", sa.String(length=10), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "RUNNING", "COMPLETED", "FAILED", name="jobstatus"),
+            nullable=False,
+        ),
+        sa.Column("file_path", sa.String(), nullable=True),
+        sa.Column("processed_count", sa.Integer(), nullable=False),
+        sa.Column("total_count", sa.Integer(), nullable=True),
+        sa.Column("imported_count", sa.Integer(), nullable=False),
+        sa.Column("failed_count", sa.Integer(), nullable=False),
+        sa.Column("errors", sa.JSON(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_jobs_owner_status", "jobs", ["owner_id", "status"], unique=False)
+    op.create_index("ix_jobs_status_updated_at", "jobs", ["status", "updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_status_updated_at", table_name="jobs")
+    op.drop_index("ix_jobs_owner_status", table_name="jobs")
+    op.drop_table("jobs")
+    sa.Enum(name="jobstatus").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="jobkind").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,33 @@
+"""bookmark change counter
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:00:00.000000
+
+Per-user change counter on user_bookmark_stats, bumped by every bookmark
+write. List and export responses use it as their ETag, so an unchanged
+poll is answered from the stats row alone.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user_bookmark_stats",
+        sa.Column("change_seq", sa.BigInteger(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("user_bookmark_stats", "change_seq")
@@ -0,0 +1,69 @@
+"""bookmark change sequence
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:00:00.000000
+
+Stamps every bookmark with its owner's change_seq at the time of the
+last write, so GET /sync can return the rows changed since a given
+sequence number with a range scan. Existing bookmarks are numbered per
+owner in creation order, after the owner's current change_seq. The
+index is built concurrently, like the ones from 0002.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "bookmarks",
+        sa.Column("change_seq", sa.BigInteger(), server_default="0", nullable=False),
+    )
+    op.execute(
+        """
+        UPDATE bookmarks b
+        SET change_seq = s.change_seq + n.row_number
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY owner_id ORDER BY created_at, id) AS row_number
+            FROM bookmarks
+        ) n, user_bookmark_stats s
+        WHERE n.id = b.id AND s.user_id = b.owner_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE user_bookmark_stats s
+        SET change_seq = s.change_seq + c.count
+        FROM (SELECT owner_id, count(*) AS count FROM bookmarks GROUP BY owner_id) c
+        WHERE c.owner_id = s.user_id
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_bookmarks_owner_change_seq",
+            "bookmarks",
+            ["owner_id", "change_seq"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_bookmarks_owner_change_seq",
+            table_name="bookmarks",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("bookmarks", "change_seq")
@@ -0,0 +1,61 @@
+"""bookmark tombstones and sync devices
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 15:00:00.000000
+
+Deleted bookmarks leave a tombstone so GET /sync can report deletions
+incrementally. Devices report the change sequence they have synced to;
+tombstones every active device has passed, or older than the expiry, are
+compacted, and user_bookmark_stats.tombstone_floor records how far.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user_bookmark_stats",
+        sa.Column("tombstone_floor", sa.BigInteger(), server_default="0", nullable=False),
+    )
+    op.create_table(
+        "bookmark_tombstones",
+        sa.Column("bookmark_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("owner_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("change_seq", sa.BigInteger(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("bookmark_id"),
+    )
+    op.create_index(
+        "ix_bookmark_tombstones_owner_change_seq", "bookmark_tombstones", ["owner_id", "change_seq"]
+    )
+    op.create_index("ix_bookmark_tombstones_deleted_at", "bookmark_tombstones", ["deleted_at"])
+    op.create_table(
+        "sync_devices",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("device_id", sa.String(length=64), nullable=False),
+        sa.Column("watermark", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column("last_seen_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "device_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sync_devices")
+    op.drop_index("ix_bookmark_tombstones_deleted_at", table_name="bookmark_tombstones")
+    op.drop_index("ix_bookmark_tombstones_owner_change_seq", table_name="bookmark_tombstones")
+    op.drop_table("bookmark_tombstones")
+    op.drop_column("user_bookmark_stats", "tombstone_floor")
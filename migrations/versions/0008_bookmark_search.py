@@ -0,0 +1,64 @@
+"""bookmark full-text search
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 16:00:00.000000
+
+Adds bookmarks.search_vector, a stored generated tsvector over the title
+(weight A), description (B) and the words of the URL (C), for
+GET /bookmarks/search. Postgres fills it for existing rows and keeps it
+current on every write. The column is added with a table rewrite; the
+GIN index over (owner_id, search_vector) is built concurrently and needs
+btree_gin for the owner_id part.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.add_column(
+        "bookmarks",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('simple', title), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(description, '')), 'B') || "
+                "setweight(to_tsvector('simple', regexp_replace(url, '^[[:alpha:]]+://(www[.])?|[^[:alnum:]]+', ' ', 'g')), 'C')",
+                persisted=True,
+            ),
+            nullable=False,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_bookmarks_owner_search",
+            "bookmarks",
+            ["owner_id", "search_vector"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_bookmarks_owner_search",
+            table_name="bookmarks",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("bookmarks", "search_vector")
@@ -0,0 +1,53 @@
+"""bookmark trigram indexes
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 17:00:00.000000
+
+Adds pg_trgm GIN indexes over (owner_id, title) and (owner_id, url) for
+GET /bookmarks/suggest, so a substring match only visits the user's own
+rows. The owner_id part uses btree_gin from 0008. The indexes are built
+concurrently, like the ones from 0002.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGRAM_INDEXES = (
+    ("ix_bookmarks_owner_title_trgm", "title"),
+    ("ix_bookmarks_owner_url_trgm", "url"),
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, column in TRIGRAM_INDEXES:
+            op.create_index(
+                name,
+                "bookmarks",
+                ["owner_id", column],
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in TRIGRAM_INDEXES:
+            op.drop_index(
+                name,
+                table_name="bookmarks",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
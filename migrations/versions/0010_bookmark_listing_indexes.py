@@ -0,0 +1,62 @@
+"""bookmark listing indexes
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 18:00:00.000000
+
+Indexes for the sort orders and filters of GET /bookmarks: one per sort
+order (created_at, last modification, title), plus partial copies
+restricted to active bookmarks for the common status=active listing.
+Built concurrently, like the ones from 0002.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MODIFIED = [sa.text("owner_id"), sa.text("coalesce(updated_at, created_at) DESC"), sa.text("id DESC")]
+ACTIVE = sa.text("status = 'ACTIVE'")
+
+INDEXES = [
+    # sort=updated_at: bookmarks never edited sort by created_at
+    ("ix_bookmarks_owner_modified_id", MODIFIED, None),
+    # sort=title
+    ("ix_bookmarks_owner_title_id", ["owner_id", "title", "id"], None),
+    # status=active with each sort order
+    ("ix_bookmarks_owner_active_created_id", [sa.text("owner_id"), sa.text("created_at DESC"), sa.text("id DESC")], ACTIVE),
+    ("ix_bookmarks_owner_active_modified_id", MODIFIED, ACTIVE),
+    ("ix_bookmarks_owner_active_title_id", ["owner_id", "title", "id"], ACTIVE),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns, where in INDEXES:
+            op.create_index(
+                name,
+                "bookmarks",
+                columns,
+                postgresql_where=where,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name="bookmarks",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,144 @@
+"""bookmark url hash
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 19:00:00.000000
+
+Adds bookmarks.url_hash, a digest of the canonical URL (app/urls.py), and
+a unique index over (owner_id, url_hash) that imports use as their
+ON CONFLICT target. Existing rows are hashed in Python, in chunks, with a
+copy of the app's functions as of this revision, so later changes to
+app/urls.py don't change what this migration writes. Where a user already
+has several bookmarks of the same page only the oldest keeps its hash; the
+others are left as they are with a NULL hash, which the unique index does
+not compare. The index is built concurrently.
+
+The backfill reads the rows it hashes, so the upgrade must run against a
+database; ``alembic upgrade --sql`` stops with an error at this revision.
+
+Also adds the on_duplicate mode and the updated/skipped counters of
+import jobs.
+
+"""
+import hashlib
+from typing import Sequence, Union
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+from uuid import UUID
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL_CHUNK = 5000
+
+# Copy of app/urls.py at this revision
+DEFAULT_PORTS = {"http": 80, "https": 443, "ftp": 21}
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid",
+    "igshid", "mc_cid", "mc_eid", "_hsenc", "_hsmi",
+})
+TRACKING_PREFIXES = ("utm_",)
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    userinfo, _, hostport = parts.netloc.rpartition("@")
+    netloc = hostport.lower()
+    try:
+        host, port = parts.hostname, parts.port
+    except ValueError:
+        host, port = None, None
+    if host is not None:
+        netloc = f"[{host}]" if ":" in host else host
+        if port is not None and port != DEFAULT_PORTS.get(scheme):
+            netloc = f"{netloc}:{port}"
+    if userinfo:
+        netloc = f"{userinfo}@{netloc}"
+
+    query = "&".join(
+        param for param in parts.query.split("&")
+        if not _is_tracking(unquote_plus(param.partition("=")[0]))
+    )
+
+    return urlunsplit((scheme, netloc, parts.path.rstrip("/"), query, parts.fragment))
+
+
+def url_hash(url: str) -> bytes:
+    return hashlib.blake2b(canonical_url(url).encode("utf-8"), digest_size=16).digest()
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        raise RuntimeError(
+            "Migration 0011 hashes existing bookmark URLs in Python and cannot "
+            "be rendered as SQL; run `alembic upgrade 0011` against the database"
+        )
+
+    op.add_column("bookmarks", sa.Column("url_hash", sa.LargeBinary(), nullable=True))
+    op.add_column("jobs", sa.Column("updated_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("jobs", sa.Column("skipped_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("jobs", sa.Column("on_duplicate", sa.String(length=10), server_default="skip", nullable=False))
+
+    connection = op.get_bind()
+    select_chunk = sa.text(
+        "SELECT id, url FROM bookmarks WHERE id > :after ORDER BY id LIMIT :limit"
+    ).bindparams(limit=BACKFILL_CHUNK)
+    set_hash = sa.text("UPDATE bookmarks SET url_hash = :url_hash WHERE id = :id")
+    after = UUID(int=0)
+    while True:
+        rows = connection.execute(select_chunk, {"after": after}).all()
+        if not rows:
+            break
+        connection.execute(set_hash, [{"id": row.id, "url_hash": url_hash(row.url)} for row in rows])
+        after = rows[-1].id
+
+    op.execute(
+        """
+        UPDATE bookmarks b
+        SET url_hash = NULL
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY owner_id, url_hash ORDER BY created_at, id) AS n
+            FROM bookmarks
+            WHERE url_hash IS NOT NULL
+        ) d
+        WHERE b.id = d.id AND d.n > 1
+        """
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_bookmarks_owner_url_hash",
+            "bookmarks",
+            ["owner_id", "url_hash"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_bookmarks_owner_url_hash",
+            table_name="bookmarks",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("jobs", "on_duplicate")
+    op.drop_column("jobs", "skipped_count")
+    op.drop_column("jobs", "updated_count")
+    op.drop_column("bookmarks", "url_hash")
@@ -9,6 +9,7 @@ from typing import AsyncGenerator, Generator
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
+from sqlalchemy import text
 import uuid
 
 # Добавляем корневую директорию проекта в путь
@@ -20,10 +21,10 @@ os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
 
 from app.main import app
 from app.database import get_db
-from app.auth import get_password_hash
+from app.auth import get_password_hash, get_read_db
 from app.schemas import UserCreate
 from tests.test_models import Base, TestUser as User, TestBookmark as Bookmark
-from tests.test_crud import get_user, get_user_by_email, create_user, get_bookmarks, get_user_bookmarks, get_bookmarks_count, get_bookmark, create_bookmark, update_bookmark, delete_bookmark
+from tests.test_crud import get_user, get_user_by_email, create_user, get_user_bookmarks, get_bookmarks_count, get_bookmark, create_bookmark, update_bookmark, delete_bookmark, get_bookmark_stats, get_change_seq, reserve_bookmark_slots, get_bookmark_page, create_bookmarks_bulk, apply_bookmark_batch, stream_user_bookmarks, search_bookmarks, suggest_bookmarks, get_sync_data, register_sync_device, compact_tombstones, apply_resolutions, get_sync_versions, count_active_jobs, create_job, get_job, claim_job, update_job, finish_job, requeue_stale_jobs, delete_finished_jobs, get_job_file_paths
 
 
 # Тестовая база данных
@@ -41,6 +42,23 @@ TestSessionLocal = async_sessionmaker(
     test_engine, class_=AsyncSession, expire_on_commit=False
 )
 
+# Отдельная пустая база Postgres для тестов с меткой postgres: все ее
+# таблицы пересоздаются. Без нее эти тесты пропускаются
+TEST_POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "postgres: тест настоящих запросов app.crud на Postgres из TEST_POSTGRES_URL")
+
+
+def pytest_collection_modifyitems(config, items):
+    if TEST_POSTGRES_URL:
+        return
+    skip = pytest.mark.skip(reason="TEST_POSTGRES_URL не задан")
+    for item in items:
+        if "postgres" in item.keywords:
+            item.add_marker(skip)
+
 
 @pytest.fixture(scope="session")
 def event_loop() -> Generator:
@@ -66,27 +84,88 @@ async def test_db() -> AsyncGenerator[AsyncSession, None]:
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest.fixture(scope="session")
+async def pg_engine():
+    """Движок Postgres со схемой из app.models"""
+    from app.database import Base as AppBase
+    import app.models  # noqa: F401 - регистрирует таблицы в AppBase.metadata
+    
+    engine = create_async_engine(TEST_POSTGRES_URL)
+    async with engine.begin() as conn:
+        # Нужны индексам поиска и подсказок, как в миграциях 0008 и 0009
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gin"))
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.run_sync(AppBase.metadata.drop_all)
+        await conn.run_sync(AppBase.metadata.create_all)
+    yield engine
+    async with engine.begin() as conn:
+        await conn.run_sync(AppBase.metadata.drop_all)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def pg_sessions(pg_engine):
+    """Фабрика сессий Postgres; таблицы очищаются после каждого теста"""
+    from app.database import Base as AppBase
+    
+    yield async_sessionmaker(pg_engine, class_=AsyncSession, expire_on_commit=False)
+    async with pg_engine.begin() as conn:
+        await conn.execute(text(f"TRUNCATE {', '.join(AppBase.metadata.tables)} CASCADE"))
+
+
+@pytest.fixture
+async def pg_user(pg_sessions):
+    """Пользователь в Postgres, созданный настоящим crud.create_user"""
+    from app import crud
+    
+    async with pg_sessions() as db:
+        return await crud.create_user(db, UserCreate(username="pguser", email="pg@example.com", password="pass123"))
+
+
 @pytest.fixture(scope="function")
-async def client(test_db: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+async def client(test_db: AsyncSession, monkeypatch) -> AsyncGenerator[AsyncClient, None]:
     """Создаем тестовый клиент"""
     
     def override_get_db():
         return test_db
     
-    # Переопределяем CRUD операции для тестов
+    # Переопределяем CRUD операции для тестов; после теста monkeypatch
+    # возвращает настоящие, их вызывают тесты на Postgres
     import app.crud as crud
-    crud.get_user = get_user
-    crud.get_user_by_email = get_user_by_email
-    crud.create_user = create_user
-    crud.get_bookmarks = get_bookmarks
-    crud.get_user_bookmarks = get_user_bookmarks
-    crud.get_bookmarks_count = get_bookmarks_count
-    crud.get_bookmark = get_bookmark
-    crud.create_bookmark = create_bookmark
-    crud.update_bookmark = update_bookmark
-    crud.delete_bookmark = delete_bookmark
+    monkeypatch.setattr(crud, "get_user", get_user)
+    monkeypatch.setattr(crud, "get_user_by_email", get_user_by_email)
+    monkeypatch.setattr(crud, "create_user", create_user)
+    monkeypatch.setattr(crud, "get_user_bookmarks", get_user_bookmarks)
+    monkeypatch.setattr(crud, "get_bookmarks_count", get_bookmarks_count)
+    monkeypatch.setattr(crud, "get_bookmark", get_bookmark)
+    monkeypatch.setattr(crud, "create_bookmark", create_bookmark)
+    monkeypatch.setattr(crud, "update_bookmark", update_bookmark)
+    monkeypatch.setattr(crud, "delete_bookmark", delete_bookmark)
+    monkeypatch.setattr(crud, "get_bookmark_stats", get_bookmark_stats)
+    monkeypatch.setattr(crud, "get_change_seq", get_change_seq)
+    monkeypatch.setattr(crud, "get_bookmark_page", get_bookmark_page)
+    monkeypatch.setattr(crud, "create_bookmarks_bulk", create_bookmarks_bulk)
+    monkeypatch.setattr(crud, "apply_bookmark_batch", apply_bookmark_batch)
+    monkeypatch.setattr(crud, "stream_user_bookmarks", stream_user_bookmarks)
+    monkeypatch.setattr(crud, "search_bookmarks", search_bookmarks)
+    monkeypatch.setattr(crud, "suggest_bookmarks", suggest_bookmarks)
+    monkeypatch.setattr(crud, "get_sync_data", get_sync_data)
+    monkeypatch.setattr(crud, "register_sync_device", register_sync_device)
+    monkeypatch.setattr(crud, "compact_tombstones", compact_tombstones)
+    monkeypatch.setattr(crud, "apply_resolutions", apply_resolutions)
+    monkeypatch.setattr(crud, "get_sync_versions", get_sync_versions)
+    monkeypatch.setattr(crud, "count_active_jobs", count_active_jobs)
+    monkeypatch.setattr(crud, "create_job", create_job)
+    monkeypatch.setattr(crud, "get_job", get_job)
+    monkeypatch.setattr(crud, "claim_job", claim_job)
+    monkeypatch.setattr(crud, "update_job", update_job)
+    monkeypatch.setattr(crud, "finish_job", finish_job)
+    monkeypatch.setattr(crud, "requeue_stale_jobs", requeue_stale_jobs)
+    monkeypatch.setattr(crud, "delete_finished_jobs", delete_finished_jobs)
+    monkeypatch.setattr(crud, "get_job_file_paths", get_job_file_paths)
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     
     async with AsyncClient(app=app, base_url="http://test") as ac:
         yield ac
@@ -173,6 +252,7 @@ async def test_bookmark(test_db: AsyncSession, test_user: User) -> Bookmark:
     )
     
     test_db.add(bookmark)
+    await reserve_bookmark_slots(test_db, test_user.id, 1)
     await test_db.commit()
     await test_db.refresh(bookmark)
     
@@ -194,6 +274,7 @@ async def multiple_bookmarks(test_db: AsyncSession, test_user: User) -> list[Boo
         bookmarks.append(bookmark)
         test_db.add(bookmark)
     
+    await reserve_bookmark_slots(test_db, test_user.id, len(bookmarks))
     await test_db.commit()
     for bookmark in bookmarks:
         await test_db.refresh(bookmark)
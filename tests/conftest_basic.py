@@ -18,6 +18,7 @@ os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
 
 from app.main import app
 from app.database import get_db, Base
+from app.auth import get_read_db
 
 
 @pytest.fixture(scope="session")
@@ -52,6 +53,7 @@ async def client(test_db: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         return test_db
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     
     async with AsyncClient(app=app, base_url="http://test") as ac:
         yield ac
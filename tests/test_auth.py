@@ -216,3 +216,136 @@ class TestAuthentication:
             "username": "testuser"
         })
         assert response.status_code == 422
+
+
+class TestCurrentUserCache:
+    """Тесты кэша аутентифицированных пользователей"""
+    
+    async def test_repeated_requests_hit_cache(self, client: AsyncClient, auth_headers):
+        """Тест того, что повторный запрос не обращается к БД за пользователем"""
+        from app.auth import user_cache
+        user_cache.clear()
+        
+        response = await client.get("/bookmarks/", headers=auth_headers)
+        assert response.status_code == 200
+        hits, misses = user_cache.hits, user_cache.misses
+        
+        response = await client.get("/bookmarks/", headers=auth_headers)
+        assert response.status_code == 200
+        assert user_cache.hits == hits + 1
+        assert user_cache.misses == misses
+    
+    async def test_user_change_invalidates_cache(self, client: AsyncClient, test_db):
+        """Тест инвалидации кэша при изменении пользователя"""
+        import uuid
+        from app.auth import user_cache, get_password_hash
+        from app.models import User, AccountType
+        
+        user = User(
+            id=uuid.uuid4(),
+            username="cacheduser",
+            email="cached@example.com",
+            hashed_password=get_password_hash("pass123")
+        )
+        test_db.add(user)
+        await test_db.commit()
+        
+        response = await client.post("/auth/login", json={"email": user.email, "password": "pass123"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        
+        user_cache.clear()
+        response = await client.get("/bookmarks/", headers=headers)
+        assert response.status_code == 200
+        assert len(user_cache) == 1
+        
+        # Повышение типа аккаунта должно сбросить кэш
+        user.account_type = AccountType.PREMIUM
+        await test_db.commit()
+        
+        assert len(user_cache) == 0
+
+
+    async def test_invalidation_from_other_process(self, client: AsyncClient, auth_headers, test_user):
+        """Тест сброса пользователя из кэша по инвалидации из другого процесса"""
+        from app import events
+        from app.auth import user_cache, USER_CACHE_INVALIDATION_PREFIX
+        user_cache.clear()
+        
+        await client.get("/bookmarks/", headers=auth_headers)
+        assert len(user_cache) == 1
+        
+        events.broker._invalidate(USER_CACHE_INVALIDATION_PREFIX + "other-user")
+        assert len(user_cache) == 1
+        
+        events.broker._invalidate(USER_CACHE_INVALIDATION_PREFIX + str(test_user.id))
+        assert len(user_cache) == 0
+    
+    async def test_cache_stats_exposed(self, client: AsyncClient, auth_headers):
+        """Тест счетчиков кэшей в GET /health"""
+        from app.auth import user_cache, token_cache
+        user_cache.clear()
+        
+        await client.get("/bookmarks/", headers=auth_headers)
+        await client.get("/bookmarks/", headers=auth_headers)
+        
+        response = await client.get("/health")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ok"
+        assert data["caches"]["user"] == user_cache.stats()
+        assert data["caches"]["user"]["hits"] >= 1
+        assert data["caches"]["token"] == token_cache.stats()
+
+
+class TestTokenCache:
+    """Тесты кэша проверенных JWT токенов"""
+    
+    def test_repeated_token_hits_cache(self):
+        """Тест того, что повторная проверка токена берется из кэша"""
+        from app.auth import create_access_token, verify_token, token_cache
+        token_cache.clear()
+        token = create_access_token({"sub": "user-1"})
+        
+        assert verify_token(token)["sub"] == "user-1"
+        hits = token_cache.hits
+        assert verify_token(token)["sub"] == "user-1"
+        assert token_cache.hits == hits + 1
+    
+    def test_tampered_token_rejected(self):
+        """Тест отклонения измененного токена после кэширования оригинала"""
+        from app.auth import create_access_token, verify_token, token_cache
+        token_cache.clear()
+        token = create_access_token({"sub": "user-1"})
+        assert verify_token(token) is not None
+        
+        header, payload, signature = token.split(".")
+        tampered = f"{header}.{payload}.{signature[:-2]}AA"
+        assert verify_token(tampered) is None
+        
+        # Токен другого типа не берется из кэша
+        assert verify_token(token, "refresh") is None
+    
+    def test_expired_token_evicted(self):
+        """Тест вытеснения токена из кэша в момент его истечения"""
+        import time
+        from datetime import timedelta
+        from app.auth import create_access_token, verify_token, token_cache
+        token_cache.clear()
+        token = create_access_token({"sub": "user-1"}, expires_delta=timedelta(seconds=1))
+        assert verify_token(token) is not None
+        assert len(token_cache) == 1
+        
+        time.sleep(2)
+        
+        assert verify_token(token) is None
+        assert len(token_cache) == 0
+    
+    def test_expired_token_not_cached(self):
+        """Тест того, что просроченный токен не попадает в кэш"""
+        from datetime import timedelta
+        from app.auth import create_access_token, verify_token, token_cache
+        token_cache.clear()
+        token = create_access_token({"sub": "user-1"}, expires_delta=timedelta(seconds=-10))
+        
+        assert verify_token(token) is None
+        assert len(token_cache) == 0
@@ -83,6 +83,86 @@ class TestBookmarks:
         assert data["total_count"] == 5
         assert data["has_more"] is False
     
+    async def test_get_bookmarks_cursor_pagination(self, client: AsyncClient, auth_headers, multiple_bookmarks):
+        """Тест курсорной пагинации закладок"""
+        seen_ids = []
+        url = "/bookmarks/?limit=2"
+        
+        while True:
+            response = await client.get(url, headers=auth_headers)
+            assert response.status_code == 200
+            data = response.json()
+            seen_ids.extend(b["id"] for b in data["bookmarks"])
+            
+            if not data["has_more"]:
+                assert data["next_cursor"] is None
+                break
+            
+            assert data["next_cursor"]
+            url = f"/bookmarks/?limit=2&cursor={data['next_cursor']}"
+        
+        # Все закладки получены ровно один раз
+        assert len(seen_ids) == 5
+        assert set(seen_ids) == {str(b.id) for b in multiple_bookmarks}
+    
+    async def test_get_bookmarks_invalid_cursor(self, client: AsyncClient, auth_headers):
+        """Тест невалидного курсора"""
+        response = await client.get("/bookmarks/?cursor=not-a-cursor", headers=auth_headers)
+        
+        assert response.status_code == 400
+        assert "cursor" in response.json()["detail"]
+    
+    async def test_get_bookmarks_without_total(self, client: AsyncClient, auth_headers, multiple_bookmarks):
+        """Тест получения закладок без подсчета общего количества"""
+        response = await client.get("/bookmarks/?limit=2&include_total=false", headers=auth_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["bookmarks"]) == 2
+        assert data["total_count"] is None
+        assert data["has_more"] is True
+        assert data["next_cursor"]
+    
+    async def test_get_bookmarks_not_modified(self, client: AsyncClient, auth_headers, multiple_bookmarks, monkeypatch):
+        """Тест ответа 304 без запроса страницы, если закладки не менялись"""
+        response = await client.get("/bookmarks/", headers=auth_headers)
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"] == "private, no-cache"
+
+        import app.crud as crud
+
+        async def fail(*args, **kwargs):
+            raise AssertionError("page must not be queried")
+
+        monkeypatch.setattr(crud, "get_bookmark_page", fail)
+        response = await client.get("/bookmarks/", headers={**auth_headers, "If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+    async def test_get_bookmarks_etag_changes_on_write(self, client: AsyncClient, auth_headers, test_bookmark):
+        """Тест смены ETag после создания, изменения и удаления закладки"""
+        etags = [(await client.get("/bookmarks/", headers=auth_headers)).headers["etag"]]
+
+        response = await client.post(
+            "/bookmarks/",
+            json={"url": "https://new.com", "title": "New"},
+            headers=auth_headers
+        )
+        new_id = response.json()["id"]
+        etags.append((await client.get("/bookmarks/", headers=auth_headers)).headers["etag"])
+
+        await client.put(f"/bookmarks/{test_bookmark.id}", json={"title": "Changed"}, headers=auth_headers)
+        etags.append((await client.get("/bookmarks/", headers=auth_headers)).headers["etag"])
+
+        await client.delete(f"/bookmarks/{new_id}", headers=auth_headers)
+        response = await client.get("/bookmarks/", headers={**auth_headers, "If-None-Match": etags[-1]})
+        assert response.status_code == 200
+        etags.append(response.headers["etag"])
+
+        assert len(set(etags)) == 4
+
     async def test_get_bookmarks_invalid_pagination(self, client: AsyncClient, auth_headers):
         """Тест невалидной пагинации"""
         # Отрицательный limit
@@ -193,6 +273,27 @@ class TestBookmarks:
         response = await client.post("/bookmarks/", json={"url": "https://example.com"}, headers=auth_headers)
         assert response.status_code == 422
     
+    async def test_create_bookmark_duplicate_url(self, client: AsyncClient, auth_headers):
+        """Тест: закладка того же канонического URL отклоняется с 409"""
+        response = await client.post("/bookmarks/", json={"url": "https://dup.com/page", "title": "First"}, headers=auth_headers)
+        assert response.status_code == 201
+        
+        response = await client.post(
+            "/bookmarks/",
+            json={"url": "HTTPS://DUP.com:443/page/?utm_source=feed", "title": "Second"},
+            headers=auth_headers
+        )
+        assert response.status_code == 409
+        
+        # Другой URL другой закладки тоже нельзя поменять на существующий
+        response = await client.post("/bookmarks/", json={"url": "https://dup.com/other", "title": "Other"}, headers=auth_headers)
+        other_id = response.json()["id"]
+        response = await client.put(f"/bookmarks/{other_id}", json={"url": "https://dup.com/page/"}, headers=auth_headers)
+        assert response.status_code == 409
+        
+        response = await client.get("/bookmarks/", headers=auth_headers)
+        assert sorted(b["title"] for b in response.json()["bookmarks"]) == ["First", "Other"]
+    
     async def test_update_bookmark_success(self, client: AsyncClient, auth_headers, test_bookmark):
         """Тест успешного обновления закладки"""
         update_data = {
@@ -235,6 +336,31 @@ class TestBookmarks:
         assert data["description"] == test_bookmark.description  # Не изменилось
         assert data["url"] == test_bookmark.url or data["url"] == test_bookmark.url + "/"  # Не изменилось
     
+    async def test_update_bookmark_clears_description(self, client: AsyncClient, auth_headers, test_bookmark):
+        """Тест: явный null очищает описание, null обязательного поля игнорируется"""
+        response = await client.put(
+            f"/bookmarks/{test_bookmark.id}",
+            json={"description": None, "title": None},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["description"] is None
+        assert data["title"] == test_bookmark.title
+    
+    async def test_update_bookmark_increments_version(self, client: AsyncClient, auth_headers, test_bookmark):
+        """Тест: каждое обновление увеличивает sync_version ровно на единицу"""
+        sync_version = test_bookmark.sync_version
+        
+        versions = []
+        for title in ("First", "Second"):
+            response = await client.put(f"/bookmarks/{test_bookmark.id}", json={"title": title}, headers=auth_headers)
+            assert response.status_code == 200
+            versions.append(response.json()["sync_version"])
+        
+        assert versions == [sync_version + 1, sync_version + 2]
+    
     async def test_update_bookmark_not_found(self, client: AsyncClient, auth_headers):
         """Тест обновления несуществующей закладки"""
         update_data = {"title": "Updated Title"}
@@ -338,3 +464,412 @@ class TestBookmarks:
         response = await client.delete(f"/bookmarks/{other_bookmark_id}", headers=auth_headers)
         
         assert response.status_code == 404  # Не найдена для текущего пользователя
+
+
+class TestBookmarkBatch:
+    """Тесты для POST /bookmarks/batch"""
+
+    async def test_batch_mixed(self, client: AsyncClient, auth_headers, multiple_bookmarks):
+        """Тест создания, изменения и удаления закладок одним запросом"""
+        edited, removed = str(multiple_bookmarks[0].id), str(multiple_bookmarks[1].id)
+        missing = str(uuid4())
+        sync_version = multiple_bookmarks[0].sync_version
+        since = (await client.get("/sync", headers=auth_headers)).json()["server_version"]
+
+        response = await client.post("/bookmarks/batch", json={"operations": [
+            {"op": "create", "bookmark": {"url": "https://batch.com", "title": "Batch"}},
+            {"op": "update", "id": edited, "changes": {"title": "Edited", "access_level": "public"}},
+            {"op": "delete", "id": removed},
+            {"op": "update", "id": missing, "changes": {"title": "Nobody"}},
+        ]}, headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [result["status"] for result in data["results"]] == ["created", "updated", "deleted", "not_found"]
+        created_id = data["results"][0]["id"]
+        assert data["results"][1]["sync_version"] == sync_version + 1
+        assert data["results"][3]["id"] == missing
+        assert data["server_version"] == since + 4
+
+        bookmarks = {b["id"]: b for b in (await client.get("/bookmarks/", headers=auth_headers)).json()["bookmarks"]}
+        assert created_id in bookmarks and removed not in bookmarks
+        assert bookmarks[edited]["title"] == "Edited"
+        assert bookmarks[edited]["access_level"] == "public"
+        # Незаданные поля не меняются
+        assert bookmarks[edited]["description"] == "Test description 0"
+
+        delta = (await client.get(f"/sync?since={since}", headers=auth_headers)).json()
+        assert {b["id"] for b in delta["bookmarks"]} == {created_id, edited}
+        assert delta["deleted_bookmarks"] == [removed]
+
+    async def test_batch_update_clears_description(self, client: AsyncClient, auth_headers, multiple_bookmarks):
+        """Тест: явный null в изменении пакета очищает описание, как в PUT"""
+        cleared, kept = str(multiple_bookmarks[0].id), str(multiple_bookmarks[1].id)
+
+        response = await client.post("/bookmarks/batch", json={"operations": [
+            {"op": "update", "id": cleared, "changes": {"description": None, "title": None}},
+            {"op": "update", "id": kept, "changes": {"title": "Kept"}},
+        ]}, headers=auth_headers)
+
+        assert response.status_code == 200
+        assert [result["status"] for result in response.json()["results"]] == ["updated", "updated"]
+        bookmarks = {b["id"]: b for b in (await client.get("/bookmarks/", headers=auth_headers)).json()["bookmarks"]}
+        assert bookmarks[cleared]["description"] is None
+        assert bookmarks[cleared]["title"] == multiple_bookmarks[0].title
+        assert bookmarks[kept]["description"] == "Test description 1"
+        assert bookmarks[kept]["title"] == "Kept"
+
+    async def test_batch_nothing_applied(self, client: AsyncClient, auth_headers, test_bookmark):
+        """Тест пакета без существующих закладок: версия не меняется"""
+        since = (await client.get("/sync", headers=auth_headers)).json()["server_version"]
+
+        response = await client.post("/bookmarks/batch", json={"operations": [
+            {"op": "delete", "id": str(uuid4())},
+        ]}, headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json()["results"][0]["status"] == "not_found"
+        assert response.json()["server_version"] == since
+
+    async def test_batch_limit(self, client: AsyncClient, auth_headers, test_db, test_user, multiple_bookmarks):
+        """Тест лимита бесплатного аккаунта: удаления в пакете освобождают место"""
+        from app.crud import FREE_TIER_BOOKMARK_LIMIT
+        from tests.test_crud import reserve_bookmark_slots
+
+        await reserve_bookmark_slots(test_db, test_user.id, FREE_TIER_BOOKMARK_LIMIT - 1 - len(multiple_bookmarks))
+        await test_db.commit()
+
+        response = await client.post("/bookmarks/batch", json={"operations": [
+            {"op": "create", "bookmark": {"url": f"https://new{i}.com", "title": f"New {i}"}} for i in range(3)
+        ] + [{"op": "delete", "id": str(multiple_bookmarks[0].id)}]}, headers=auth_headers)
+
+        assert response.status_code == 200
+        statuses = [result["status"] for result in response.json()["results"]]
+        assert statuses == ["created", "created", "limit_exceeded", "deleted"]
+
+    async def test_batch_duplicate_takes_no_slot(self, client: AsyncClient, auth_headers, test_db, test_user):
+        """Тест: дубликат в пакете не тратит последнее свободное место"""
+        from app.crud import FREE_TIER_BOOKMARK_LIMIT
+        from tests.test_crud import reserve_bookmark_slots
+
+        response = await client.post("/bookmarks/", json={"url": "https://dup.com", "title": "Existing"}, headers=auth_headers)
+        assert response.status_code == 201
+        await reserve_bookmark_slots(test_db, test_user.id, FREE_TIER_BOOKMARK_LIMIT - 2)
+        await test_db.commit()
+
+        response = await client.post("/bookmarks/batch", json={"operations": [
+            {"op": "create", "bookmark": {"url": "https://dup.com/", "title": "Again"}},
+            {"op": "create", "bookmark": {"url": "https://fresh.com", "title": "Fresh"}},
+            {"op": "create", "bookmark": {"url": "https://FRESH.com", "title": "Fresh again"}},
+            {"op": "create", "bookmark": {"url": "https://late.com", "title": "Late"}},
+        ]}, headers=auth_headers)
+
+        assert response.status_code == 200
+        statuses = [result["status"] for result in response.json()["results"]]
+        assert statuses == ["duplicate", "created", "duplicate", "limit_exceeded"]
+
+    async def test_batch_duplicate_url(self, client: AsyncClient, auth_headers, test_db, test_user):
+        """Тест: создание уже имеющегося URL пропускается, изменение на него отклоняется"""
+        response = await client.post("/bookmarks/", json={"url": "https://dup.com", "title": "Existing"}, headers=auth_headers)
+        existing_id = response.json()["id"]
+
+        response = await client.post("/bookmarks/batch", json={"operations": [
+            {"op": "create", "bookmark": {"url": "https://DUP.com/", "title": "Again"}},
+            {"op": "create", "bookmark": {"url": "https://fresh.com", "title": "Fresh"}},
+        ]}, headers=auth_headers)
+
+        assert response.status_code == 200
+        assert [result["status"] for result in response.json()["results"]] == ["duplicate", "created"]
+        fresh_id = response.json()["results"][1]["id"]
+        # Дубликат не занимает места
+        from tests.test_crud import get_bookmark_stats
+        stats = await get_bookmark_stats(test_db, test_user.id)
+        await test_db.refresh(stats)
+        assert stats.bookmark_count == 2
+
+        response = await client.post("/bookmarks/batch", json={"operations": [
+            {"op": "create", "bookmark": {"url": "https://another.com", "title": "Another"}},
+            {"op": "update", "id": fresh_id, "changes": {"url": "https://dup.com"}},
+        ]}, headers=auth_headers)
+        assert response.status_code == 409
+
+        # Пакет не применен целиком
+        bookmarks = (await client.get("/bookmarks/", headers=auth_headers)).json()["bookmarks"]
+        assert {b["id"] for b in bookmarks} == {existing_id, fresh_id}
+
+    async def test_batch_invalid(self, client: AsyncClient, auth_headers, test_bookmark):
+        """Тест некорректных операций"""
+        bookmark_id = str(test_bookmark.id)
+        for operations in (
+            [{"op": "create"}],
+            [{"op": "delete"}],
+            [{"op": "update", "id": bookmark_id}],
+            [{"op": "delete", "id": bookmark_id}, {"op": "update", "id": bookmark_id, "changes": {"title": "Twice"}}],
+        ):
+            response = await client.post("/bookmarks/batch", json={"operations": operations}, headers=auth_headers)
+            assert response.status_code == 400
+
+        response = await client.post("/bookmarks/batch", json={"operations": [{"op": "move", "id": bookmark_id}]}, headers=auth_headers)
+        assert response.status_code == 422
+
+        response = await client.post("/bookmarks/batch", json={"operations": []}, headers=auth_headers)
+        assert response.status_code == 422
+
+    async def test_batch_unauthorized(self, client: AsyncClient):
+        """Тест пакетной операции без авторизации"""
+        response = await client.post("/bookmarks/batch", json={"operations": [{"op": "delete", "id": str(uuid4())}]})
+
+        assert response.status_code in [401, 403]
+
+
+class TestBookmarkFilters:
+    """Тесты для фильтров и сортировки GET /bookmarks"""
+
+    async def _add(self, test_db, test_user, bookmarks: list) -> list:
+        """Добавляет закладки с заданными полями напрямую в базу"""
+        from datetime import datetime
+        from tests.test_models import TestBookmark as Bookmark
+        from tests.test_crud import reserve_bookmark_slots
+
+        rows = []
+        for i, fields in enumerate(bookmarks):
+            fields = {"title": f"Bookmark {i}", "created_at": datetime(2026, 1, 1 + i), **fields}
+            row = Bookmark(id=str(uuid4()), url=f"https://filter{i}.com", owner_id=str(test_user.id), **fields)
+            rows.append(row)
+            test_db.add(row)
+        await reserve_bookmark_slots(test_db, test_user.id, len(rows))
+        await test_db.commit()
+        return [row.id for row in rows]
+
+    async def _ids(self, client: AsyncClient, headers: dict, url: str) -> list:
+        response = await client.get(url, headers=headers)
+        assert response.status_code == 200
+        return [bookmark["id"] for bookmark in response.json()["bookmarks"]]
+
+    async def test_filter_status_and_access_level(self, client: AsyncClient, auth_headers, test_db, test_user):
+        """Тест фильтров по статусу и уровню доступа"""
+        from app.models import BookmarkStatus, AccessLevel
+
+        active, archived, public = await self._add(test_db, test_user, [
+            {},
+            {"status": BookmarkStatus.ARCHIVED},
+            {"access_level": AccessLevel.PUBLIC},
+        ])
+
+        assert await self._ids(client, auth_headers, "/bookmarks/?status=active") == [public, active]
+        assert await self._ids(client, auth_headers, "/bookmarks/?status=archived") == [archived]
+        assert await self._ids(client, auth_headers, "/bookmarks/?status=active&access_level=public") == [public]
+
+        response = await client.get("/bookmarks/?status=active", headers=auth_headers)
+        assert response.json()["total_count"] is None
+
+    async def test_filter_created_range(self, client: AsyncClient, auth_headers, test_db, test_user):
+        """Тест фильтра по дате создания"""
+        ids = await self._add(test_db, test_user, [{}, {}, {}, {}])
+
+        url = "/bookmarks/?created_after=2026-01-01T12:00:00&created_before=2026-01-04T00:00:00"
+        assert await self._ids(client, auth_headers, url) == [ids[2], ids[1]]
+
+    async def test_sort_by_title(self, client: AsyncClient, auth_headers, test_db, test_user):
+        """Тест сортировки по заголовку с курсорной пагинацией"""
+        ids = await self._add(test_db, test_user, [
+            {"title": "Charlie"}, {"title": "Alpha"}, {"title": "Bravo"}, {"title": "Alpha"},
+        ])
+
+        response = await client.get("/bookmarks/?sort=title&limit=2", headers=auth_headers)
+        data = response.json()
+        # Одинаковые заголовки упорядочены по id
+        assert [b["id"] for b in data["bookmarks"]] == sorted([ids[1], ids[3]])
+
+        rest = await self._ids(client, auth_headers, f"/bookmarks/?sort=title&limit=2&cursor={data['next_cursor']}")
+        assert rest == [ids[2], ids[0]]
+
+    async def test_sort_by_updated_at(self, client: AsyncClient, auth_headers, test_db, test_user):
+        """Тест сортировки по времени изменения: без изменений считается время создания"""
+        from datetime import datetime
+
+        untouched, edited, edited_later = await self._add(test_db, test_user, [
+            {"created_at": datetime(2026, 3, 1)},
+            {"updated_at": datetime(2026, 2, 1)},
+            {"updated_at": datetime(2026, 4, 1)},
+        ])
+
+        response = await client.get("/bookmarks/?sort=updated_at&limit=1", headers=auth_headers)
+        data = response.json()
+        assert [b["id"] for b in data["bookmarks"]] == [edited_later]
+
+        rest = await self._ids(client, auth_headers, f"/bookmarks/?sort=updated_at&cursor={data['next_cursor']}")
+        assert rest == [untouched, edited]
+
+        after = await self._ids(client, auth_headers, "/bookmarks/?sort=updated_at&updated_after=2026-02-15T00:00:00")
+        assert after == [edited_later, untouched]
+
+    async def test_date_filter_requires_matching_sort(self, client: AsyncClient, auth_headers):
+        """Тест: фильтр по дате допускается только с соответствующей сортировкой"""
+        response = await client.get("/bookmarks/?sort=title&created_after=2026-01-01T00:00:00", headers=auth_headers)
+        assert response.status_code == 400
+
+        response = await client.get("/bookmarks/?updated_after=2026-01-01T00:00:00", headers=auth_headers)
+        assert response.status_code == 400
+
+    async def test_cursor_from_other_sort(self, client: AsyncClient, auth_headers, multiple_bookmarks):
+        """Тест: курсор другой сортировки отклоняется"""
+        response = await client.get("/bookmarks/?limit=2", headers=auth_headers)
+        cursor = response.json()["next_cursor"]
+
+        response = await client.get(f"/bookmarks/?sort=title&cursor={cursor}", headers=auth_headers)
+        assert response.status_code == 400
+
+    async def test_invalid_sort(self, client: AsyncClient, auth_headers):
+        """Тест неизвестной сортировки"""
+        response = await client.get("/bookmarks/?sort=url", headers=auth_headers)
+
+        assert response.status_code == 422
+
+
+class TestBookmarkSearch:
+    """Тесты для GET /bookmarks/search"""
+
+    async def _create(self, client: AsyncClient, headers: dict, bookmarks: list) -> list:
+        ids = []
+        for bookmark in bookmarks:
+            response = await client.post("/bookmarks/", json=bookmark, headers=headers)
+            ids.append(response.json()["id"])
+        return ids
+
+    async def test_search_ranked(self, client: AsyncClient, auth_headers):
+        """Тест: совпадение в заголовке выше совпадения в описании и URL"""
+        in_url, in_description, in_title, _ = await self._create(client, auth_headers, [
+            {"url": "https://python.org/docs", "title": "Language reference"},
+            {"url": "https://example.com", "title": "Snakes", "description": "Notes on Python packaging"},
+            {"url": "https://example.org", "title": "Python tutorial"},
+            {"url": "https://rust-lang.org", "title": "Rust book"},
+        ])
+
+        response = await client.get("/bookmarks/search?q=python", headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [bookmark["id"] for bookmark in data["bookmarks"]] == [in_title, in_description, in_url]
+        assert data["has_more"] is False
+        assert data["next_cursor"] is None
+        assert data["total_count"] is None
+
+    async def test_search_all_words_required(self, client: AsyncClient, auth_headers):
+        """Тест поиска по нескольким словам"""
+        ids = await self._create(client, auth_headers, [
+            {"url": "https://a.com", "title": "Async database drivers"},
+            {"url": "https://b.com", "title": "Database design"},
+        ])
+
+        data = (await client.get("/bookmarks/search?q=database async", headers=auth_headers)).json()
+
+        assert [bookmark["id"] for bookmark in data["bookmarks"]] == [ids[0]]
+
+    async def test_search_keyset_pages(self, client: AsyncClient, auth_headers):
+        """Тест постраничной выдачи результатов поиска"""
+        ids = await self._create(client, auth_headers, [
+            {"url": f"https://page{i}.com", "title": f"Recipe {i}"} for i in range(5)
+        ])
+
+        seen = []
+        cursor = None
+        for _ in range(5):
+            url = "/bookmarks/search?q=recipe&limit=2" + (f"&cursor={cursor}" if cursor else "")
+            data = (await client.get(url, headers=auth_headers)).json()
+            seen.extend(bookmark["id"] for bookmark in data["bookmarks"])
+            cursor = data["next_cursor"]
+            if not data["has_more"]:
+                break
+
+        assert sorted(seen) == sorted(ids)
+        assert len(seen) == len(set(seen))
+
+    async def test_search_reflects_updates(self, client: AsyncClient, auth_headers):
+        """Тест: изменения и удаления сразу видны в поиске"""
+        kept, deleted = await self._create(client, auth_headers, [
+            {"url": "https://kept.com", "title": "Old title"},
+            {"url": "https://deleted.com", "title": "Gardening"},
+        ])
+        await client.put(f"/bookmarks/{kept}", json={"title": "Gardening tools"}, headers=auth_headers)
+        await client.delete(f"/bookmarks/{deleted}", headers=auth_headers)
+
+        data = (await client.get("/bookmarks/search?q=gardening", headers=auth_headers)).json()
+        assert [bookmark["id"] for bookmark in data["bookmarks"]] == [kept]
+
+        data = (await client.get("/bookmarks/search?q=old", headers=auth_headers)).json()
+        assert data["bookmarks"] == []
+
+    async def test_search_only_own_bookmarks(self, client: AsyncClient, auth_headers, test_user_2):
+        """Тест изоляции результатов поиска между пользователями"""
+        response = await client.post("/auth/login", json={"email": "test2@example.com", "password": "pass123"})
+        other_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await self._create(client, other_headers, [{"url": "https://secret.com", "title": "Secret plans"}])
+
+        data = (await client.get("/bookmarks/search?q=secret", headers=auth_headers)).json()
+
+        assert data["bookmarks"] == []
+
+    async def test_search_invalid_params(self, client: AsyncClient, auth_headers):
+        """Тест невалидных параметров поиска"""
+        response = await client.get("/bookmarks/search?q=", headers=auth_headers)
+        assert response.status_code == 422
+
+        response = await client.get("/bookmarks/search?q=test&cursor=garbage", headers=auth_headers)
+        assert response.status_code == 400
+
+    async def test_search_unauthorized(self, client: AsyncClient):
+        """Тест поиска без авторизации"""
+        response = await client.get("/bookmarks/search?q=test")
+
+        assert response.status_code in [401, 403]
+
+
+class TestBookmarkSuggest:
+    """Тесты для GET /bookmarks/suggest"""
+
+    async def test_suggest(self, client: AsyncClient, auth_headers, multiple_bookmarks):
+        """Тест подсказок по началу заголовка"""
+        response = await client.get("/bookmarks/suggest?prefix=test bookmark 3", headers=auth_headers)
+
+        assert response.status_code == 200
+        suggestions = response.json()["suggestions"]
+        assert [suggestion["title"] for suggestion in suggestions] == ["Test Bookmark 3"]
+        assert set(suggestions[0]) == {"id", "title", "url"}
+
+    async def test_suggest_limit(self, client: AsyncClient, auth_headers, multiple_bookmarks):
+        """Тест ограничения числа подсказок"""
+        response = await client.get("/bookmarks/suggest?prefix=te&limit=2", headers=auth_headers)
+
+        assert len(response.json()["suggestions"]) == 2
+
+    async def test_suggest_sees_writes(self, client: AsyncClient, auth_headers):
+        """Тест: новая и удаленная закладки сразу учитываются"""
+        response = await client.post("/bookmarks/", json={"url": "https://kotlinlang.org", "title": "Kotlin docs"}, headers=auth_headers)
+        bookmark_id = response.json()["id"]
+
+        response = await client.get("/bookmarks/suggest?prefix=kot", headers=auth_headers)
+        assert [suggestion["id"] for suggestion in response.json()["suggestions"]] == [bookmark_id]
+
+        await client.delete(f"/bookmarks/{bookmark_id}", headers=auth_headers)
+
+        response = await client.get("/bookmarks/suggest?prefix=kot", headers=auth_headers)
+        assert response.json()["suggestions"] == []
+
+    async def test_suggest_only_own_bookmarks(self, client: AsyncClient, auth_headers, test_user_2):
+        """Тест изоляции подсказок между пользователями"""
+        response = await client.post("/auth/login", json={"email": "test2@example.com", "password": "pass123"})
+        other_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await client.post("/bookmarks/", json={"url": "https://private.com", "title": "Private notes"}, headers=other_headers)
+
+        response = await client.get("/bookmarks/suggest?prefix=priv", headers=auth_headers)
+
+        assert response.json()["suggestions"] == []
+
+    async def test_suggest_invalid_params(self, client: AsyncClient, auth_headers):
+        """Тест невалидных параметров"""
+        response = await client.get("/bookmarks/suggest?prefix=", headers=auth_headers)
+        assert response.status_code == 422
+
+        response = await client.get("/bookmarks/suggest?prefix=a&limit=100", headers=auth_headers)
+        assert response.status_code == 422
@@ -0,0 +1,63 @@
+"""
+Тесты для TTL-кэша
+"""
+import sys
+import os
+import pytest
+
+# Добавляем корневую директорию проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import cache
+from app.cache import TTLCache
+
+
+class TestTTLCache:
+    """Тесты для TTLCache"""
+    
+    def test_get_set_and_counters(self):
+        """Тест попаданий и промахов"""
+        c = TTLCache(maxsize=10, ttl=60)
+        
+        assert c.get("a") is None
+        c.set("a", 1)
+        assert c.get("a") == 1
+        
+        assert c.stats() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 10}
+    
+    def test_expiry(self, monkeypatch):
+        """Тест истечения TTL"""
+        now = [1000.0]
+        monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+        c = TTLCache(maxsize=10, ttl=5)
+        
+        c.set("a", 1)
+        c.set("b", 2, expires_at=now[0] + 100)
+        now[0] += 6
+        
+        assert c.get("a") is None
+        assert c.get("b") == 2
+        assert len(c) == 1
+    
+    def test_size_bound_evicts_least_recently_used(self):
+        """Тест вытеснения давно неиспользуемых записей"""
+        c = TTLCache(maxsize=2, ttl=60)
+        
+        c.set("a", 1)
+        c.set("b", 2)
+        c.get("a")
+        c.set("c", 3)
+        
+        assert c.get("a") == 1
+        assert c.get("b") is None
+        assert c.get("c") == 3
+    
+    def test_invalidate(self):
+        """Тест инвалидации записи"""
+        c = TTLCache(maxsize=10, ttl=60)
+        
+        c.set("a", 1)
+        c.invalidate("a")
+        c.invalidate("missing")
+        
+        assert c.get("a") is None
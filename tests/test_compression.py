@@ -0,0 +1,169 @@
+"""
+Тесты для сжатия ответов
+"""
+import sys
+import os
+import asyncio
+import gzip
+import json
+import zlib
+import pytest
+from httpx import AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+# Добавляем корневую директорию проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import exporters
+from app.compression import GZipMiddleware, accepts_gzip
+
+
+class TestAcceptEncoding:
+    """Тесты для accepts_gzip"""
+
+    @pytest.mark.parametrize("header, expected", [
+        ("gzip, deflate, br", True),
+        ("br;q=1.0, gzip;q=0.8", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("identity", False),
+        ("", False),
+    ])
+    def test_accepts_gzip(self, header, expected):
+        """Тест разбора заголовка Accept-Encoding с весами"""
+        assert accepts_gzip(header) is expected
+
+
+async def _events(request):
+    async def events():
+        for i in range(3):
+            yield f"data: {i}\n\n"
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+async def _pieces(request):
+    async def pieces():
+        for i in range(3):
+            yield f"piece {i} " * 200
+    return StreamingResponse(pieces(), media_type="text/plain")
+
+
+async def _small(request):
+    return PlainTextResponse("small")
+
+
+def _app(**options):
+    app = Starlette(routes=[
+        Route("/events", _events),
+        Route("/pieces", _pieces),
+        Route("/small", _small),
+    ])
+    return GZipMiddleware(app, **options)
+
+
+class TestGZipMiddleware:
+    """Тесты для GZipMiddleware"""
+
+    async def test_streamed_pieces_decompress_separately(self):
+        """Тест потокового сжатия: каждая порция распаковывается сразу"""
+        messages = []
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "method": "GET", "path": "/pieces", "query_string": b"",
+            "headers": [(b"accept-encoding", b"gzip")],
+        }
+        await _app()(scope, receive, send)
+
+        headers = dict(messages[0]["headers"])
+        assert headers[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in headers
+        assert headers[b"vary"] == b"Accept-Encoding"
+
+        decompressor = zlib.decompressobj(31)
+        pieces = [decompressor.decompress(message["body"]) for message in messages[1:]]
+
+        # Порция доступна клиенту до окончания ответа
+        assert pieces[0].decode() == "piece 0 " * 200
+        assert b"".join(pieces).decode() == "".join(f"piece {i} " * 200 for i in range(3))
+        assert decompressor.eof
+
+    async def test_event_stream_not_compressed(self):
+        """Тест: поток событий передается без сжатия"""
+        async with AsyncClient(app=_app(), base_url="http://test") as client:
+            response = await client.get("/events", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+        assert response.text == "data: 0\n\ndata: 1\n\ndata: 2\n\n"
+
+    async def test_small_response_not_compressed(self):
+        """Тест порога размера для полных ответов"""
+        async with AsyncClient(app=_app(), base_url="http://test") as client:
+            response = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+        async with AsyncClient(app=_app(minimum_size=1), base_url="http://test") as client:
+            response = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-length"] == str(len(gzip.compress(b"small", mtime=0)))
+        assert response.text == "small"
+
+
+class TestCompressedEndpoints:
+    """Тесты сжатия ответов API"""
+
+    async def test_bookmarks_page_compressed(self, client: AsyncClient, auth_headers, multiple_bookmarks):
+        """Тест сжатия страницы списка закладок"""
+        response = await client.get(
+            "/bookmarks/?limit=200",
+            headers={**auth_headers, "Accept-Encoding": "gzip"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()["bookmarks"]) == 5
+
+    async def test_no_compression_without_accept_encoding(self, client: AsyncClient, auth_headers, multiple_bookmarks):
+        """Тест ответа без сжатия, если клиент его не поддерживает"""
+        response = await client.get("/export/json", headers={**auth_headers, "Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in response.headers
+        assert len(response.json()["bookmarks"]) == 5
+
+    async def test_export_compressed(self, client: AsyncClient, auth_headers, multiple_bookmarks, monkeypatch):
+        """Тест сжатия потокового экспорта"""
+        monkeypatch.setattr(exporters, "EXPORT_CHUNK_SIZE", 2)
+
+        response = await client.get("/export/csv", headers={**auth_headers, "Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.text.strip().split("\n")) == 6
+
+    @pytest.mark.parametrize("format", ["json", "html", "csv"])
+    async def test_export_gz_file(self, client: AsyncClient, auth_headers, multiple_bookmarks, format):
+        """Тест загрузки экспорта файлом .gz"""
+        response = await client.get(
+            f"/export/{format}?gzip=true",
+            headers={**auth_headers, "Accept-Encoding": "gzip"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/gzip"
+        assert f".{format}.gz" in response.headers["content-disposition"]
+        # Файл уже сжат, повторно ответ не кодируется
+        assert "content-encoding" not in response.headers
+
+        content = gzip.decompress(response.content).decode("utf-8")
+        if format == "json":
+            assert len(json.loads(content)["bookmarks"]) == 5
+        else:
+            assert "Test Bookmark 0" in content
@@ -11,8 +11,9 @@ from sqlalchemy.orm import selectinload
 # Добавляем корневую директорию проекта в путь
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from tests.test_models import TestUser as User, TestBookmark as Bookmark
+from tests.test_models import TestUser as User, TestBookmark as Bookmark, TestUserBookmarkStats as BookmarkStats, TestBookmarkTombstone as BookmarkTombstone, TestSyncDevice as SyncDevice, TestJob as Job
 from app.schemas import UserCreate, BookmarkCreate, BookmarkUpdate
+from app import events
 
 
 async def get_user(db: AsyncSession, user_id: str) -> Optional[User]:
@@ -30,46 +31,214 @@ async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
 async def create_user(db: AsyncSession, user: UserCreate) -> User:
     """Создать пользователя"""
     import uuid
-    from app.auth import get_password_hash
+    from app.auth import get_password_hash_async
     
     db_user = User(
         id=str(uuid.uuid4()),
         username=user.username,
         email=user.email,
-        hashed_password=get_password_hash(user.password)  # Хешируем пароль
+        hashed_password=await get_password_hash_async(user.password)  # Хешируем пароль
     )
     db.add(db_user)
+    db.add(BookmarkStats(user_id=db_user.id))
     await db.commit()
     await db.refresh(db_user)
     return db_user
 
 
-async def get_bookmarks(db: AsyncSession, owner_id: str, skip: int = 0, limit: int = 100) -> List[Bookmark]:
-    """Получить закладки пользователя"""
+async def get_user_bookmarks(db: AsyncSession, owner_id: str, limit: int = 50, offset: int = 0, cursor=None, sort: str = "created_at", filters=None) -> List[Bookmark]:
+    """Получить закладки пользователя в порядке и с курсором, как в app.crud"""
+    from sqlalchemy import func, tuple_
+    from app.crud import _sort_order
+    
+    query = select(Bookmark).filter(Bookmark.owner_id == str(owner_id))
+    key, order, descending = _sort_order(Bookmark.__table__.c, sort)
+    if filters is not None:
+        if filters.status is not None:
+            query = query.filter(Bookmark.status == filters.status)
+        if filters.access_level is not None:
+            query = query.filter(Bookmark.access_level == filters.access_level)
+        if filters.created_after is not None:
+            query = query.filter(Bookmark.created_at > filters.created_after)
+        if filters.created_before is not None:
+            query = query.filter(Bookmark.created_at < filters.created_before)
+        if filters.updated_after is not None:
+            query = query.filter(func.coalesce(Bookmark.updated_at, Bookmark.created_at) > filters.updated_after)
+    
+    if cursor is not None:
+        value, bookmark_id = cursor
+        position = tuple_(key, Bookmark.id)
+        after = tuple_(value, str(bookmark_id))
+        query = query.filter(position < after if descending else position > after)
+    else:
+        query = query.offset(offset)
+    
+    result = await db.execute(query.order_by(*order).limit(limit))
+    return result.scalars().all()
+
+
+async def get_bookmark_page(db: AsyncSession, owner_id: str, limit: int = 50, offset: int = 0, cursor=None, include_total: bool = True, sort: str = "created_at", filters=None):
+    """Получить страницу закладок вместе с общим количеством"""
+    bookmarks = await get_user_bookmarks(db, owner_id, limit=limit + 1, offset=offset, cursor=cursor, sort=sort, filters=filters)
+    total_count = await get_bookmarks_count(db, owner_id) if include_total and filters is None else None
+    return bookmarks[:limit], total_count, len(bookmarks) > limit
+
+
+async def stream_user_bookmarks(db: AsyncSession, owner_id: str, chunk_size: int = 1000):
+    """Выдать все закладки пользователя порциями строк, новые первыми"""
+    from sqlalchemy import desc
+    
+    result = await db.stream(
+        select(*Bookmark.__table__.c)
+        .filter(Bookmark.owner_id == str(owner_id))
+        .order_by(desc(Bookmark.created_at), desc(Bookmark.id))
+        .execution_options(yield_per=chunk_size)
+    )
+    async for rows in result.partitions():
+        yield rows
+
+
+async def search_bookmarks(db: AsyncSession, owner_id: str, query: str, limit: int = 50, cursor=None):
+    """Полнотекстовый поиск по FTS5, лучшие совпадения первыми"""
+    import re
+    from sqlalchemy import text
+    from app.crud import SearchPage
+    
+    # Все слова запроса обязательны, как в websearch_to_tsquery без операторов
+    words = re.findall(r"\w+", query)
+    if not words:
+        return SearchPage([], None, False)
     result = await db.execute(
-        select(Bookmark)
-        .filter(Bookmark.owner_id == owner_id)
-        .offset(skip)
-        .limit(limit)
+        text(
+            "SELECT bookmarks.id, -bm25(bookmarks_fts, 10.0, 5.0, 1.0) FROM bookmarks_fts "
+            "JOIN bookmarks ON bookmarks.rowid = bookmarks_fts.rowid "
+            "WHERE bookmarks_fts MATCH :match AND bookmarks.owner_id = :owner_id"
+        ),
+        {"match": " ".join(f'"{word}"' for word in words), "owner_id": str(owner_id)}
     )
-    return result.scalars().all()
+    ranked = sorted(result.all(), key=lambda row: (row[1], row[0]), reverse=True)
+    if cursor is not None:
+        cursor_rank, bookmark_id = cursor
+        ranked = [row for row in ranked if (row[1], row[0]) < (cursor_rank, str(bookmark_id))]
+    
+    page = ranked[:limit]
+    bookmarks = {}
+    if page:
+        loaded = await db.execute(select(Bookmark).filter(Bookmark.id.in_([row[0] for row in page])))
+        bookmarks = {bookmark.id: bookmark for bookmark in loaded.scalars()}
+    last_position = (page[-1][1], page[-1][0]) if page else None
+    return SearchPage([bookmarks[row[0]] for row in page], last_position, len(ranked) > limit)
 
 
-async def get_user_bookmarks(db: AsyncSession, owner_id: str, skip: int = 0, limit: int = 100, offset: int = 0) -> List[Bookmark]:
-    """Получить закладки пользователя (алиас для совместимости)"""
-    # Используем offset если передан, иначе skip
-    actual_offset = offset if offset > 0 else skip
-    return await get_bookmarks(db, owner_id, actual_offset, limit)
+async def suggest_bookmarks(db: AsyncSession, owner_id: str, prefix: str, limit: int = 10):
+    """Подсказки по префиксу из индекса в памяти, как в приложении без Postgres"""
+    from app import suggest
+    
+    async def load_rows():
+        result = await db.execute(
+            select(Bookmark.id, Bookmark.title, Bookmark.url).filter(Bookmark.owner_id == str(owner_id))
+        )
+        return result.all()
+    
+    change_seq = await get_change_seq(db, owner_id)
+    return await suggest.suggest_from_index(owner_id, change_seq, prefix, limit, load_rows)
 
 
 async def get_bookmarks_count(db: AsyncSession, owner_id: str) -> int:
-    """Получить количество закладок пользователя"""
-    from sqlalchemy import func
+    """Получить количество закладок пользователя из статистики"""
+    stats = await get_bookmark_stats(db, owner_id)
+    return stats.bookmark_count if stats else 0
+
+
+async def get_bookmark_stats(db: AsyncSession, owner_id: str) -> Optional[BookmarkStats]:
+    """Получить строку статистики закладок пользователя"""
     result = await db.execute(
-        select(func.count(Bookmark.id))
-        .filter(Bookmark.owner_id == owner_id)
+        select(BookmarkStats).filter(BookmarkStats.user_id == str(owner_id))
+    )
+    return result.scalar_one_or_none()
+
+
+async def ensure_bookmark_stats(db: AsyncSession, owner_id: str):
+    """Создать строку статистики пользователя, если ее еще нет"""
+    from sqlalchemy.dialects.sqlite import insert
+    
+    await db.execute(
+        insert(BookmarkStats).values(user_id=str(owner_id)).on_conflict_do_nothing(index_elements=["user_id"])
+    )
+
+
+async def reserve_bookmark_slots(db: AsyncSession, owner_id: str, count: int = 1, limit: Optional[int] = None) -> Optional[int]:
+    """Одним UPDATE увеличить счетчик закладок с учетом лимита и change_seq, вернуть change_seq"""
+    from sqlalchemy import update, func
+    
+    owner_id = str(owner_id)
+    query = update(BookmarkStats).where(BookmarkStats.user_id == owner_id)
+    if limit is not None:
+        query = query.where(BookmarkStats.bookmark_count + count <= limit)
+    query = (
+        query
+        .values(
+            bookmark_count=BookmarkStats.bookmark_count + count,
+            change_seq=BookmarkStats.change_seq + count,
+            last_modified=func.now()
+        )
+        .returning(BookmarkStats.change_seq)
+    )
+    
+    change_seq = (await db.execute(query)).scalar_one_or_none()
+    if change_seq is None and await get_bookmark_stats(db, owner_id) is None:
+        await ensure_bookmark_stats(db, owner_id)
+        change_seq = (await db.execute(query)).scalar_one_or_none()
+    return change_seq
+
+
+def value_rows(name: str, columns, rows):
+    """CTE из строк литералов вместо VALUES: в SQLite у VALUES нет имен столбцов"""
+    from sqlalchemy import literal, union_all
+    
+    selects = [
+        select(*(literal(value, type_).label(column) for (column, type_), value in zip(columns, row)))
+        for row in rows
+    ]
+    return (selects[0] if len(selects) == 1 else union_all(*selects)).cte(name)
+
+
+async def get_change_seq(db: AsyncSession, owner_id: str) -> int:
+    """Получить счетчик изменений закладок пользователя"""
+    result = await db.execute(
+        select(BookmarkStats.change_seq).filter(BookmarkStats.user_id == str(owner_id))
+    )
+    return result.scalar_one_or_none() or 0
+
+
+async def update_bookmark_stats(db: AsyncSession, owner_id: str, query):
+    """UPDATE ... RETURNING строки статистики; строка создается, если ее нет"""
+    row = (await db.execute(query)).one_or_none()
+    if row is None:
+        await ensure_bookmark_stats(db, owner_id)
+        row = (await db.execute(query)).one()
+    return row
+
+
+async def touch_bookmark_stats(db: AsyncSession, owner_id: str, sync_version: Optional[int] = None, count_delta: int = 0, changes: int = 1) -> int:
+    """Отметить изменение закладок пользователя в статистике, вернуть новый change_seq"""
+    from sqlalchemy import update, func
+    
+    values = {"last_modified": func.now(), "change_seq": BookmarkStats.change_seq + changes}
+    if count_delta:
+        values["bookmark_count"] = BookmarkStats.bookmark_count + count_delta
+    if sync_version is not None:
+        # В SQLite скалярный max() заменяет greatest()
+        values["max_sync_version"] = func.max(BookmarkStats.max_sync_version, sync_version)
+    
+    row = await update_bookmark_stats(
+        db, owner_id,
+        update(BookmarkStats)
+        .where(BookmarkStats.user_id == str(owner_id))
+        .values(**values)
+        .returning(BookmarkStats.change_seq)
     )
-    return result.scalar() or 0
+    return row.change_seq
 
 
 async def get_bookmark(db: AsyncSession, bookmark_id: str, owner_id: str) -> Optional[Bookmark]:
@@ -82,59 +251,668 @@ async def get_bookmark(db: AsyncSession, bookmark_id: str, owner_id: str) -> Opt
     return result.scalar_one_or_none()
 
 
-async def create_bookmark(db: AsyncSession, bookmark: BookmarkCreate, owner_id: str) -> Bookmark:
-    """Создать закладку"""
-    from app.models import BookmarkStatus
+async def create_bookmark(db: AsyncSession, bookmark: BookmarkCreate, owner_id: str, limit: Optional[int] = None) -> Optional[Bookmark]:
+    """Создать закладку: UPDATE статистики и INSERT ... ON CONFLICT DO NOTHING RETURNING"""
+    from sqlalchemy.dialects.sqlite import insert
+    from app.crud import DuplicateURLError
+    from app.urls import url_hash
     import uuid
-    db_bookmark = Bookmark(
-        id=str(uuid.uuid4()),  # Генерируем UUID
-        url=str(bookmark.url),  # Конвертируем HttpUrl в строку
-        title=bookmark.title,
-        description=bookmark.description,
-        status=BookmarkStatus.ACTIVE,  # По умолчанию активная
-        access_level=bookmark.access_level,
-        owner_id=owner_id,
-        sync_version=1  # Начальная версия синхронизации
-    )
-    db.add(db_bookmark)
+    
+    change_seq = await reserve_bookmark_slots(db, owner_id, 1, limit)
+    if change_seq is None:
+        await db.rollback()
+        return None
+    
+    url = str(bookmark.url)  # Конвертируем HttpUrl в строку
+    result = await db.execute(
+        insert(Bookmark)
+        .values(
+            id=str(uuid.uuid4()),
+            url=url,
+            url_hash=url_hash(url),
+            title=bookmark.title,
+            description=bookmark.description,
+            access_level=bookmark.access_level,
+            owner_id=str(owner_id),
+            change_seq=change_seq
+        )
+        .on_conflict_do_nothing(index_elements=["owner_id", "url_hash"])
+        .returning(Bookmark)
+    )
+    db_bookmark = result.scalar_one_or_none()
+    if db_bookmark is None:
+        await db.rollback()
+        raise DuplicateURLError(url)
     await db.commit()
-    await db.refresh(db_bookmark)
+    events.publish(owner_id, change_seq)
     return db_bookmark
 
 
+def bulk_bookmark_row(bookmark, owner_id: str, change_seq: int) -> dict:
+    """Строка app.crud._bulk_bookmark_row с UUID в виде строк"""
+    from app.crud import _bulk_bookmark_row
+    
+    row = _bulk_bookmark_row(bookmark, owner_id, change_seq)
+    row["id"] = str(row["id"])
+    row["owner_id"] = str(owner_id)
+    return row
+
+
+async def create_bookmarks_bulk(db: AsyncSession, bookmarks, owner_id: str, limit: Optional[int] = None, commit: bool = True, on_duplicate: str = "skip"):
+    """Создать много закладок одной транзакцией, дубликаты URL по on_duplicate"""
+    from itertools import groupby
+    from sqlalchemy import update, func, or_
+    from sqlalchemy.dialects.sqlite import insert
+    from app.crud import BulkResult, UPDATABLE_FIELDS, IMPORT_CHUNK_SIZE
+    from app.urls import url_hash
+    
+    owner_id = str(owner_id)
+    positions = {}
+    for i, bookmark in enumerate(bookmarks):
+        positions.setdefault(url_hash(str(bookmark.url)), i)
+    
+    await ensure_bookmark_stats(db, owner_id)
+    result = await db.execute(
+        select(BookmarkStats.bookmark_count).filter(BookmarkStats.user_id == owner_id).with_for_update()
+    )
+    bookmark_count = result.scalar_one()
+    result = await db.execute(
+        select(Bookmark.url_hash).filter(Bookmark.owner_id == owner_id, Bookmark.url_hash.in_(list(positions)))
+    )
+    existing = set(result.scalars().all())
+    
+    new = [i for digest, i in positions.items() if digest not in existing]
+    room = len(new) if limit is None else max(0, min(len(new), limit - bookmark_count))
+    written = sorted(new[:room] if on_duplicate == "skip" else new[:room] + [positions[digest] for digest in existing])
+    if not written:
+        if commit:
+            await db.rollback()
+        return BulkResult(0, 0, len(bookmarks) - len(new), new[room:])
+    
+    last_seq = await touch_bookmark_stats(db, owner_id, sync_version=0, count_delta=room, changes=len(written))
+    first_seq = last_seq - len(written) + 1
+    rows = [bulk_bookmark_row(bookmarks[i], owner_id, first_seq + n) for n, i in enumerate(written)]
+    
+    updated = []
+    rows.sort(key=lambda row: "created_at" in row)
+    for _, group in groupby(rows, key=lambda row: "created_at" in row):
+        group = list(group)
+        for start in range(0, len(group), IMPORT_CHUNK_SIZE):
+            query = insert(Bookmark).values(group[start:start + IMPORT_CHUNK_SIZE])
+            if not existing or on_duplicate == "skip":
+                await db.execute(query.on_conflict_do_nothing(index_elements=["owner_id", "url_hash"]))
+                continue
+            if on_duplicate == "merge":
+                # В SQLite скалярные min() и max() заменяют least() и greatest()
+                merged = {
+                    "description": func.coalesce(func.nullif(Bookmark.description, ""), query.excluded.description),
+                    "created_at": func.min(Bookmark.created_at, query.excluded.created_at),
+                }
+            else:
+                merged = {field: query.excluded[field] for field in UPDATABLE_FIELDS}
+            result = await db.execute(
+                query.on_conflict_do_update(
+                    index_elements=["owner_id", "url_hash"],
+                    set_={**merged, "sync_version": Bookmark.sync_version + 1, "change_seq": query.excluded.change_seq, "updated_at": func.now()},
+                    where=or_(*(getattr(Bookmark, field).is_distinct_from(value) for field, value in merged.items()))
+                )
+                .returning(Bookmark.url_hash, Bookmark.sync_version)
+            )
+            updated.extend(version for digest, version in result if digest in existing)
+    
+    if updated:
+        await db.execute(
+            update(BookmarkStats)
+            .where(BookmarkStats.user_id == owner_id)
+            .values(max_sync_version=func.max(BookmarkStats.max_sync_version, max(updated)))
+        )
+    if commit:
+        await db.commit()
+        events.publish(owner_id, last_seq)
+    return BulkResult(room, len(updated), len(bookmarks) - room - len(updated) - len(new[room:]), new[room:])
+
+
 async def update_bookmark(db: AsyncSession, bookmark_id, bookmark_update: BookmarkUpdate = None, owner_id: str = None, **kwargs) -> Optional[Bookmark]:
-    """Обновить закладку"""
-    # Конвертируем bookmark_id в строку если это UUID
-    bookmark_id_str = str(bookmark_id)
-    owner_id_str = str(owner_id) if owner_id else None
+    """Обновить закладку: UPDATE статистики, затем UPDATE ... RETURNING с проверкой владельца"""
+    from sqlalchemy import update, func
+    from sqlalchemy.exc import IntegrityError
+    from app.crud import DuplicateURLError, _update_values
     
-    db_bookmark = await get_bookmark(db, bookmark_id_str, owner_id_str)
-    if not db_bookmark:
-        return None
+    owner_id_str = str(owner_id) if owner_id else None
+    values = _update_values(kwargs)
     
-    # Обновляем поля из kwargs (переданные из routes)
-    for field, value in kwargs.items():
-        if hasattr(db_bookmark, field):
-            setattr(db_bookmark, field, value)
+    stats = await update_bookmark_stats(
+        db, owner_id_str,
+        update(BookmarkStats)
+        .where(BookmarkStats.user_id == owner_id_str)
+        .values(change_seq=BookmarkStats.change_seq + 1, last_modified=func.now())
+        .returning(BookmarkStats.change_seq, BookmarkStats.max_sync_version)
+    )
     
-    # Увеличиваем версию синхронизации при обновлении
-    db_bookmark.sync_version += 1
+    # Версия синхронизации увеличивается в SQL, параллельные изменения не теряются
+    try:
+        result = await db.execute(
+            select(Bookmark)
+            .from_statement(
+                update(Bookmark)
+                .where(Bookmark.id == str(bookmark_id), Bookmark.owner_id == owner_id_str)
+                .values(**values, sync_version=Bookmark.sync_version + 1, change_seq=stats.change_seq)
+                .returning(Bookmark)
+            )
+            .execution_options(populate_existing=True)
+        )
+    except IntegrityError:
+        await db.rollback()
+        raise DuplicateURLError(values["url"])
+    db_bookmark = result.scalar_one_or_none()
+    if db_bookmark is None:
+        await db.rollback()
+        return None
     
+    if db_bookmark.sync_version > stats.max_sync_version:
+        await db.execute(
+            update(BookmarkStats)
+            .where(BookmarkStats.user_id == owner_id_str)
+            .values(max_sync_version=db_bookmark.sync_version)
+        )
     await db.commit()
-    await db.refresh(db_bookmark)
+    events.publish(owner_id_str, stats.change_seq)
     return db_bookmark
 
 
 async def delete_bookmark(db: AsyncSession, bookmark_id, owner_id: str = None) -> bool:
-    """Удалить закладку"""
-    # Конвертируем bookmark_id в строку если это UUID
+    """Удалить закладку: сначала UPDATE статистики, затем DELETE ... RETURNING с проверкой владельца"""
+    from sqlalchemy import delete, update, func
+    
     bookmark_id_str = str(bookmark_id)
     owner_id_str = str(owner_id) if owner_id else None
     
-    db_bookmark = await get_bookmark(db, bookmark_id_str, owner_id_str)
-    if not db_bookmark:
-        return False
+    stats = await update_bookmark_stats(
+        db, owner_id_str,
+        update(BookmarkStats)
+        .where(BookmarkStats.user_id == owner_id_str)
+        .values(change_seq=BookmarkStats.change_seq + 1, bookmark_count=BookmarkStats.bookmark_count - 1, last_modified=func.now())
+        .returning(BookmarkStats.change_seq)
+    )
+    change_seq = stats.change_seq
     
-    await db.delete(db_bookmark)
+    # В SQLite нет изменяющих запросов в WITH, запись об удалении добавляется отдельно
+    result = await db.execute(
+        delete(Bookmark)
+        .where(Bookmark.id == bookmark_id_str, Bookmark.owner_id == owner_id_str)
+        .returning(Bookmark.id)
+    )
+    if result.scalar_one_or_none() is None:
+        await db.rollback()
+        return False
+    db.add(BookmarkTombstone(bookmark_id=bookmark_id_str, owner_id=owner_id_str, change_seq=change_seq))
     await db.commit()
+    events.publish(owner_id_str, change_seq)
     return True
+
+
+async def apply_bookmark_batch(db: AsyncSession, owner_id: str, operations, limit: Optional[int] = None):
+    """Применить пакет создания, изменения и удаления закладок одной транзакцией"""
+    from sqlalchemy import update, delete, insert as plain_insert, case, String, Text, Integer, LargeBinary, Boolean
+    from sqlalchemy.dialects.sqlite import insert
+    from sqlalchemy.exc import IntegrityError
+    from app.crud import OperationOutcome, BATCH_UPDATE_FIELDS, IMPORT_CHUNK_SIZE, DuplicateURLError, _update_values
+    from app.urls import url_hash
+    
+    owner_id = str(owner_id)
+    if not operations:
+        return [], await get_change_seq(db, owner_id)
+    
+    positions = {str(operation.bookmark_id): i for i, operation in enumerate(operations) if operation.op != "create"}
+    delete_ids = [str(operation.bookmark_id) for operation in operations if operation.op == "delete"]
+    creates = [i for i, operation in enumerate(operations) if operation.op == "create"]
+    
+    # Строка статистики блокируется раньше удаляемых закладок
+    await ensure_bookmark_stats(db, owner_id)
+    result = await db.execute(
+        select(BookmarkStats.bookmark_count, BookmarkStats.change_seq)
+        .filter(BookmarkStats.user_id == owner_id)
+        .with_for_update()
+    )
+    bookmark_count, change_seq = result.one()
+    first_seq = change_seq + 1
+    
+    deleted = []
+    if delete_ids:
+        # В SQLite нет массивов, удаляем по IN
+        result = await db.execute(
+            delete(Bookmark)
+            .where(Bookmark.owner_id == owner_id, Bookmark.id.in_(delete_ids))
+            .returning(Bookmark.id)
+            .execution_options(synchronize_session=False)
+        )
+        deleted = result.scalars().all()
+        if deleted:
+            await db.execute(plain_insert(BookmarkTombstone), [
+                {"bookmark_id": bookmark_id, "owner_id": owner_id, "change_seq": first_seq + positions[bookmark_id]}
+                for bookmark_id in deleted
+            ])
+    
+    updated = {}
+    updates = [(i, operation) for i, operation in enumerate(operations) if operation.op == "update"]
+    if updates:
+        changed = value_rows(
+            "changed",
+            [
+                ("id", String), ("url", Text), ("title", String), ("description", Text),
+                ("access_level", Bookmark.access_level.type), ("url_hash", LargeBinary),
+                *((f"set_{field}", Boolean) for field in BATCH_UPDATE_FIELDS), ("change_seq", Integer)
+            ],
+            [
+                (
+                    str(operation.bookmark_id),
+                    *(values.get(field) for field in BATCH_UPDATE_FIELDS),
+                    *(field in values for field in BATCH_UPDATE_FIELDS),
+                    first_seq + i
+                )
+                for i, operation in updates
+                for values in (_update_values(operation.data),)
+            ]
+        )
+        try:
+            result = await db.execute(
+                update(Bookmark)
+                .where(Bookmark.owner_id == owner_id, Bookmark.id == changed.c.id)
+                .values(
+                    **{
+                        field: case((changed.c[f"set_{field}"], changed.c[field]), else_=getattr(Bookmark, field))
+                        for field in BATCH_UPDATE_FIELDS
+                    },
+                    sync_version=Bookmark.sync_version + 1,
+                    change_seq=changed.c.change_seq
+                )
+                .returning(Bookmark.id, Bookmark.sync_version)
+                # Сессия теста общая для всех запросов, загруженные закладки обновляются
+                .execution_options(synchronize_session="fetch")
+            )
+        except IntegrityError:
+            await db.rollback()
+            raise DuplicateURLError("Two bookmarks would have the same URL")
+        updated = dict(result.all())
+    
+    rows = {}
+    if creates:
+        digests = {i: url_hash(str(operations[i].data.url)) for i in creates}
+        # Читается после удалений и изменений, которые освобождают и занимают URL
+        result = await db.execute(
+            select(Bookmark.url_hash)
+            .filter(Bookmark.owner_id == owner_id, Bookmark.url_hash.in_(set(digests.values())))
+        )
+        taken = set(result.scalars())
+        room = None if limit is None else max(0, limit + len(deleted) - bookmark_count)
+        for i in creates:
+            if digests[i] in taken or (room is not None and len(rows) >= room):
+                continue
+            taken.add(digests[i])
+            rows[i] = bulk_bookmark_row(operations[i].data, owner_id, first_seq + i)
+    
+    inserted = set()
+    values = list(rows.values())
+    for start in range(0, len(values), IMPORT_CHUNK_SIZE):
+        result = await db.execute(
+            insert(Bookmark)
+            .values(values[start:start + IMPORT_CHUNK_SIZE])
+            .on_conflict_do_nothing(index_elements=["owner_id", "url_hash"])
+            .returning(Bookmark.id)
+        )
+        inserted.update(result.scalars())
+    
+    deleted = set(deleted)
+    outcomes = []
+    for i, operation in enumerate(operations):
+        bookmark_id = str(operation.bookmark_id) if operation.bookmark_id else None
+        if operation.op == "create":
+            if i in rows and rows[i]["id"] in inserted:
+                outcome = OperationOutcome("created", rows[i]["id"], 0)
+            elif i in rows or digests[i] in taken:
+                outcome = OperationOutcome("duplicate")
+            else:
+                outcome = OperationOutcome("limit_exceeded")
+        elif operation.op == "update" and bookmark_id in updated:
+            outcome = OperationOutcome("updated", operation.bookmark_id, updated[bookmark_id])
+        elif operation.op == "delete" and bookmark_id in deleted:
+            outcome = OperationOutcome("deleted", operation.bookmark_id)
+        else:
+            outcome = OperationOutcome("not_found", operation.bookmark_id)
+        outcomes.append(outcome)
+    
+    if not (deleted or updated or inserted):
+        await db.rollback()
+        return outcomes, change_seq
+    
+    last_seq = await touch_bookmark_stats(
+        db, owner_id,
+        sync_version=max(updated.values()) if updated else None,
+        count_delta=len(inserted) - len(deleted),
+        changes=len(operations)
+    )
+    await db.commit()
+    events.publish(owner_id, last_seq)
+    return outcomes, last_seq
+
+
+async def get_sync_data(db: AsyncSession, owner_id: str, since: int = 0, limit: int = 500):
+    """Получить закладки, измененные и удаленные после change_seq = since"""
+    from app.crud import SyncDelta
+    
+    owner_id = str(owner_id)
+    stats = await get_bookmark_stats(db, owner_id)
+    server_version = stats.change_seq if stats else 0
+    full_resync = 0 < since < (stats.tombstone_floor if stats else 0)
+    
+    bookmarks = await db.execute(
+        select(Bookmark)
+        .filter(Bookmark.owner_id == owner_id, Bookmark.change_seq > since, Bookmark.change_seq <= server_version)
+        .order_by(Bookmark.change_seq)
+        .limit(limit + 1)
+    )
+    tombstones = await db.execute(
+        select(BookmarkTombstone)
+        .filter(BookmarkTombstone.owner_id == owner_id, BookmarkTombstone.change_seq > since, BookmarkTombstone.change_seq <= server_version)
+        .order_by(BookmarkTombstone.change_seq)
+        .limit(limit + 1)
+    )
+    changes = sorted(list(bookmarks.scalars()) + list(tombstones.scalars()), key=lambda change: change.change_seq)
+    
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if has_more:
+        server_version = changes[-1].change_seq
+    return SyncDelta(
+        bookmarks=[change for change in changes if isinstance(change, Bookmark)],
+        deleted_ids=[change.bookmark_id for change in changes if isinstance(change, BookmarkTombstone)],
+        server_version=server_version,
+        has_more=has_more,
+        full_resync=full_resync
+    )
+
+
+async def register_sync_device(db: AsyncSession, owner_id: str, device_id: str, watermark: int):
+    """Сохранить версию, до которой синхронизировано устройство"""
+    from sqlalchemy import func
+    from sqlalchemy.dialects.sqlite import insert
+    
+    await db.execute(
+        insert(SyncDevice)
+        .values(user_id=str(owner_id), device_id=device_id, watermark=watermark, last_seen_at=func.now())
+        .on_conflict_do_update(
+            index_elements=["user_id", "device_id"],
+            set_={"watermark": watermark, "last_seen_at": func.now()}
+        )
+    )
+    await db.commit()
+
+
+async def compact_tombstones(db: AsyncSession, active_after, expire_before, batch_size: int = 1000) -> int:
+    """Удалить порцию записей об удалении, которые не нужны ни одному устройству"""
+    from sqlalchemy import delete, update, func, or_
+    
+    # SQLite хранит даты без часового пояса
+    active_after = active_after.replace(tzinfo=None)
+    expire_before = expire_before.replace(tzinfo=None)
+    await db.execute(delete(SyncDevice).where(SyncDevice.last_seen_at < active_after))
+    
+    watermarks = (
+        select(SyncDevice.user_id, func.min(SyncDevice.watermark).label("watermark"))
+        .group_by(SyncDevice.user_id)
+        .subquery()
+    )
+    expired = (
+        select(BookmarkTombstone.bookmark_id)
+        .outerjoin(watermarks, watermarks.c.user_id == BookmarkTombstone.owner_id)
+        .filter(or_(
+            BookmarkTombstone.deleted_at < expire_before,
+            BookmarkTombstone.change_seq <= watermarks.c.watermark
+        ))
+        .limit(batch_size)
+    )
+    result = await db.execute(
+        delete(BookmarkTombstone)
+        .where(BookmarkTombstone.bookmark_id.in_(expired))
+        .returning(BookmarkTombstone.owner_id, BookmarkTombstone.change_seq)
+    )
+    
+    deleted = 0
+    floors = {}
+    for owner_id, change_seq in result:
+        deleted += 1
+        floors[owner_id] = max(change_seq, floors.get(owner_id, 0))
+    for owner_id, floor in floors.items():
+        # В SQLite скалярный max() заменяет greatest()
+        await db.execute(
+            update(BookmarkStats)
+            .where(BookmarkStats.user_id == owner_id)
+            .values(tombstone_floor=func.max(BookmarkStats.tombstone_floor, floor))
+        )
+    await db.commit()
+    return deleted
+
+
+async def apply_resolutions(db: AsyncSession, owner_id: str, changes):
+    """Применить разрешения конфликтов одним UPDATE ... FROM с проверкой версии (compare-and-swap)"""
+    from uuid import UUID
+    from sqlalchemy import update, func, String, Text, Integer, LargeBinary
+    from sqlalchemy.exc import IntegrityError
+    from app.crud import RESOLVABLE_FIELDS, DuplicateURLError
+    from app.urls import url_hash
+    
+    owner_id = str(owner_id)
+    if not changes:
+        return {}, await get_change_seq(db, owner_id)
+    
+    last_seq = await touch_bookmark_stats(db, owner_id, changes=len(changes))
+    first_seq = last_seq - len(changes) + 1
+    resolved = value_rows(
+        "resolved",
+        [
+            ("id", String), ("expected", Integer), ("url", Text), ("title", String), ("description", Text),
+            ("access_level", Bookmark.access_level.type), ("status", Bookmark.status.type),
+            ("url_hash", LargeBinary), ("change_seq", Integer)
+        ],
+        [
+            (
+                str(change.bookmark_id),
+                change.expected_version,
+                *(change.values[field] for field in RESOLVABLE_FIELDS),
+                url_hash(change.values["url"]),
+                first_seq + i
+            )
+            for i, change in enumerate(changes)
+        ]
+    )
+    try:
+        result = await db.execute(
+            update(Bookmark)
+            .where(
+                Bookmark.owner_id == owner_id,
+                Bookmark.id == resolved.c.id,
+                Bookmark.sync_version == resolved.c.expected
+            )
+            .values(
+                **{field: resolved.c[field] for field in (*RESOLVABLE_FIELDS, "url_hash")},
+                sync_version=Bookmark.sync_version + 1,
+                change_seq=resolved.c.change_seq
+            )
+            .returning(Bookmark.id, Bookmark.sync_version)
+            # Сессия теста общая для всех запросов, загруженные закладки обновляются
+            .execution_options(synchronize_session="fetch")
+        )
+    except IntegrityError:
+        await db.rollback()
+        raise DuplicateURLError("Two bookmarks would have the same URL")
+    applied = {UUID(bookmark_id): sync_version for bookmark_id, sync_version in result.all()}
+    if not applied:
+        await db.rollback()
+        return {}, await get_change_seq(db, owner_id)
+    
+    await db.execute(
+        update(BookmarkStats)
+        .where(BookmarkStats.user_id == owner_id)
+        .values(max_sync_version=func.max(BookmarkStats.max_sync_version, max(applied.values())))
+    )
+    await db.commit()
+    events.publish(owner_id, last_seq)
+    return applied, last_seq
+
+
+async def get_sync_versions(db: AsyncSession, owner_id: str, bookmark_ids) -> dict:
+    """Получить текущие sync_version существующих закладок пользователя"""
+    from uuid import UUID
+    
+    if not bookmark_ids:
+        return {}
+    result = await db.execute(
+        select(Bookmark.id, Bookmark.sync_version)
+        .filter(Bookmark.owner_id == str(owner_id), Bookmark.id.in_([str(bookmark_id) for bookmark_id in bookmark_ids]))
+    )
+    return {UUID(bookmark_id): sync_version for bookmark_id, sync_version in result.all()}
+
+
+async def count_active_jobs(db: AsyncSession, owner_id: str) -> int:
+    """Количество задач пользователя в очереди или в работе"""
+    from sqlalchemy import func
+    from app.models import JobStatus
+    
+    result = await db.execute(
+        select(func.count())
+        .select_from(Job)
+        .filter(Job.owner_id == str(owner_id), Job.status.in_([JobStatus.PENDING, JobStatus.RUNNING]))
+    )
+    return result.scalar_one()
+
+
+async def create_job(db: AsyncSession, owner_id: str, kind, format: str, file_path: Optional[str] = None, job_id=None, max_active: Optional[int] = None, on_duplicate: str = "skip") -> Optional[Job]:
+    """Поставить задачу в очередь, блокируя строку статистики на время подсчета"""
+    from app.models import JobStatus
+    import uuid
+    
+    await ensure_bookmark_stats(db, owner_id)
+    await db.execute(
+        select(BookmarkStats.user_id).filter(BookmarkStats.user_id == str(owner_id)).with_for_update()
+    )
+    if max_active is not None and await count_active_jobs(db, owner_id) >= max_active:
+        await db.rollback()
+        return None
+    
+    db_job = Job(
+        id=str(job_id or uuid.uuid4()),
+        owner_id=str(owner_id),
+        kind=kind,
+        format=format,
+        status=JobStatus.PENDING,
+        file_path=file_path,
+        processed_count=0,
+        imported_count=0,
+        updated_count=0,
+        skipped_count=0,
+        failed_count=0,
+        errors=[],
+        on_duplicate=on_duplicate,
+    )
+    db.add(db_job)
+    await db.commit()
+    await db.refresh(db_job)
+    return db_job
+
+
+async def get_job(db: AsyncSession, job_id, owner_id: str) -> Optional[Job]:
+    """Получить задачу пользователя по ID"""
+    result = await db.execute(
+        select(Job).filter(Job.id == str(job_id), Job.owner_id == str(owner_id))
+    )
+    return result.scalar_one_or_none()
+
+
+async def claim_job(db: AsyncSession, job_id) -> Optional[Job]:
+    """Перевести задачу из очереди в работу"""
+    from sqlalchemy import update, func
+    from app.models import JobStatus
+    
+    result = await db.execute(
+        update(Job)
+        .where(Job.id == str(job_id), Job.status == JobStatus.PENDING)
+        .values(status=JobStatus.RUNNING, updated_at=func.now())
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+    job = result.scalar_one_or_none()
+    await db.commit()
+    return job
+
+
+async def update_job(db: AsyncSession, job_id, **values):
+    """Обновить прогресс задачи без коммита"""
+    from sqlalchemy import update, func
+    
+    await db.execute(
+        update(Job)
+        .where(Job.id == str(job_id))
+        .values(updated_at=func.now(), **values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def finish_job(db: AsyncSession, job_id, status, error: Optional[str] = None):
+    """Завершить задачу"""
+    from sqlalchemy import func
+    
+    await update_job(db, job_id, status=status, error=error, finished_at=func.now())
+    await db.commit()
+
+
+async def requeue_stale_jobs(db: AsyncSession, stale_before) -> list:
+    """Вернуть в очередь зависшие задачи, вернуть ID всех задач в очереди"""
+    from sqlalchemy import update
+    from app.models import JobStatus
+    
+    # SQLite хранит даты без часового пояса
+    stale_before = stale_before.replace(tzinfo=None)
+    await db.execute(
+        update(Job)
+        .where(Job.status == JobStatus.RUNNING, Job.updated_at < stale_before)
+        .values(status=JobStatus.PENDING)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(
+        select(Job.id).filter(Job.status == JobStatus.PENDING).order_by(Job.created_at)
+    )
+    job_ids = list(result.scalars().all())
+    await db.commit()
+    return job_ids
+
+
+async def delete_finished_jobs(db: AsyncSession, finished_before, batch_size: int = 1000) -> List[Optional[str]]:
+    """Удалить порцию задач, завершенных до finished_before"""
+    from sqlalchemy import delete
+    from app.models import JobStatus
+    
+    # SQLite хранит даты без часового пояса
+    finished_before = finished_before.replace(tzinfo=None)
+    expired = (
+        select(Job.id)
+        .filter(
+            Job.status.in_([JobStatus.COMPLETED, JobStatus.FAILED]),
+            Job.updated_at < finished_before
+        )
+        .limit(batch_size)
+    )
+    result = await db.execute(
+        delete(Job)
+        .where(Job.id.in_(expired))
+        .returning(Job.file_path)
+        .execution_options(synchronize_session=False)
+    )
+    file_paths = list(result.scalars().all())
+    await db.commit()
+    return file_paths
+
+
+async def get_job_file_paths(db: AsyncSession, file_paths) -> set:
+    """Файлы из file_paths, принадлежащие задачам"""
+    result = await db.execute(select(Job.file_path).filter(Job.file_path.in_(file_paths)))
+    return set(result.scalars().all())
@@ -0,0 +1,116 @@
+"""
+Тесты маршрутизации сессий между основной БД и репликой
+"""
+import sys
+import os
+import pytest
+from types import SimpleNamespace
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette.requests import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+
+# Добавляем корневую директорию проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import auth, crud, database
+
+
+@pytest.fixture
+async def primary_and_replica(tmp_path, monkeypatch):
+    """Две локальные SQLite базы в роли основной БД и реплики, реплика отстает"""
+    engines = {}
+    for role, change_seq in (("primary", 7), ("replica", 5)):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / role}.db")
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE node (role TEXT, change_seq INTEGER)"))
+            await conn.execute(
+                text("INSERT INTO node VALUES (:role, :change_seq)"),
+                {"role": role, "change_seq": change_seq}
+            )
+        engines[role] = engine
+
+    async def get_change_seq(db, owner_id):
+        return (await db.execute(text("SELECT change_seq FROM node"))).scalar()
+
+    monkeypatch.setattr(database, "AsyncSessionLocal", async_sessionmaker(engines["primary"], class_=AsyncSession))
+    monkeypatch.setattr(database, "AsyncReadSessionLocal", async_sessionmaker(engines["replica"], class_=AsyncSession))
+    monkeypatch.setattr(crud, "get_change_seq", get_change_seq)
+
+    yield
+
+    for engine in engines.values():
+        await engine.dispose()
+
+
+async def _read_role(user_id: str, cookie: str = None) -> str:
+    """Определяет, к какой базе подключена сессия для чтения"""
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    request = Request({"type": "http", "headers": headers})
+
+    sessions = auth.get_read_db(request, SimpleNamespace(id=user_id))
+    session = await sessions.__anext__()
+    try:
+        return (await session.execute(text("SELECT role FROM node"))).scalar()
+    finally:
+        await sessions.aclose()
+
+
+class TestReadReplicaRouting:
+    """Тесты для get_read_db"""
+
+    async def test_reads_go_to_replica(self, primary_and_replica):
+        """Тест чтения с реплики, если клиент недавно ничего не писал"""
+        assert await _read_role("user-1") == "replica"
+
+    async def test_read_your_writes(self, primary_and_replica):
+        """Тест чтения с основной БД, пока реплика не догнала запись клиента"""
+        assert await _read_role("user-1", "last_write=user-1:7") == "primary"
+        # Запись, которую реплика уже получила, не мешает читать с нее
+        assert await _read_role("user-1", "last_write=user-1:5") == "replica"
+
+    async def test_cookie_of_other_user_ignored(self, primary_and_replica):
+        """Тест того, что cookie другого пользователя не влияет на чтение"""
+        assert await _read_role("user-2", "last_write=user-1:7") == "replica"
+        assert await _read_role("user-1", "last_write=garbage") == "replica"
+
+
+class TestReadYourWritesMiddleware:
+    """Тесты для ReadYourWritesMiddleware"""
+
+    @pytest.fixture
+    async def client(self):
+        app = FastAPI()
+        app.add_middleware(database.ReadYourWritesMiddleware)
+
+        @app.post("/write")
+        async def write():
+            database.pin_to_primary("user-1", 3)
+            database.pin_to_primary("user-1", 4)
+            return {}
+
+        @app.get("/read")
+        async def read():
+            return {}
+
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            yield ac
+
+    async def test_write_sets_cookie(self, client: AsyncClient, monkeypatch):
+        """Тест выдачи cookie с последней записью пользователя"""
+        monkeypatch.setattr(database, "READ_YOUR_WRITES_WINDOW", 2.5)
+        response = await client.post("/write")
+
+        assert response.cookies[database.READ_YOUR_WRITES_COOKIE] == "user-1:4"
+        assert "Max-Age=3" in response.headers["set-cookie"]
+
+    async def test_read_sets_no_cookie(self, client: AsyncClient):
+        """Тест того, что запросы без записи не выдают cookie"""
+        response = await client.get("/read")
+
+        assert "set-cookie" not in response.headers
+
+    def test_pin_outside_request(self):
+        """Тест того, что запись вне запроса (фоновые задачи) ничего не ломает"""
+        database.pin_to_primary("user-1", 1)
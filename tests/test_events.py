@@ -0,0 +1,301 @@
+"""
+Тесты для уведомлений об изменениях (server-sent events)
+"""
+import sys
+import os
+import asyncio
+import pytest
+from httpx import AsyncClient
+
+# Добавляем корневую директорию проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import events
+from app.main import app
+
+
+class TestLocalBroker:
+    """Тесты для LocalBroker"""
+
+    async def test_publish_to_own_subscribers(self):
+        """Тест доставки изменений только подписчикам пользователя"""
+        broker = events.LocalBroker()
+        first = broker.subscribe("user-1")
+        second = broker.subscribe("user-1")
+        other = broker.subscribe("user-2")
+
+        broker.publish("user-1", 5)
+
+        assert await first.wait(0.1) and first.change_seq == 5
+        assert await second.wait(0.1) and second.change_seq == 5
+        assert not await other.wait(0.01)
+
+    async def test_changes_coalesced(self):
+        """Тест: серия изменений превращается в одно уведомление"""
+        broker = events.LocalBroker()
+        subscription = broker.subscribe("user-1")
+
+        for change_seq in (3, 4, 2):
+            broker.publish("user-1", change_seq)
+
+        assert await subscription.wait(0.1)
+        assert subscription.change_seq == 4
+        assert not await subscription.wait(0.01)
+
+    async def test_unsubscribe(self):
+        """Тест отписки"""
+        broker = events.LocalBroker()
+        subscription = broker.subscribe("user-1")
+
+        broker.unsubscribe(subscription)
+        broker.unsubscribe(subscription)
+        broker.publish("user-1", 1)
+
+        assert broker.subscriber_count() == 0
+        assert subscription.change_seq == 0
+
+    def test_invalidate(self):
+        """Тест доставки инвалидаций кэша слушателям"""
+        broker = events.LocalBroker()
+        received = []
+        broker.add_invalidation_listener(received.append)
+
+        broker.invalidate("user:1")
+        broker.invalidate(None)
+
+        assert received == ["user:1", None]
+
+
+class FakeConnection:
+    """Заменитель соединения asyncpg"""
+
+    def __init__(self, fail_sends: bool = False):
+        self.fail_sends = fail_sends
+        self.listeners = {}
+        self.termination_listeners = []
+        self.sent = []
+        self.closed = False
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    def add_termination_listener(self, callback):
+        self.termination_listeners.append(callback)
+
+    def is_closed(self):
+        return self.closed
+
+    async def executemany(self, query, args):
+        if self.fail_sends:
+            raise ConnectionResetError("connection lost")
+        self.sent.extend(args)
+
+    def terminate(self):
+        if not self.closed:
+            self.closed = True
+            for callback in self.termination_listeners:
+                callback(self)
+
+    async def close(self, timeout=None):
+        self.terminate()
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Соединения, которые открывает PostgresBroker; первое не может отправлять"""
+    import asyncpg
+
+    opened = []
+
+    async def connect(dsn):
+        opened.append(FakeConnection(fail_sends=not opened))
+        return opened[-1]
+
+    monkeypatch.setattr(asyncpg, "connect", connect)
+    monkeypatch.setattr(events, "EVENTS_RECONNECT_DELAY", 0)
+    return opened
+
+
+async def _until(condition):
+    for _ in range(100):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+class TestPostgresBroker:
+    """Тесты переподключения PostgresBroker"""
+
+    async def test_failed_send_closes_and_reconnects(self, connections):
+        """Тест: после ошибки отправки старое соединение закрывается, LISTEN выполняется заново"""
+        broker = events.PostgresBroker("postgresql://test")
+        await broker.start()
+        subscription = broker.subscribe("user-1")
+
+        broker.publish("user-1", 3)
+
+        # Локальные подписчики получают изменение и без базы
+        assert await subscription.wait(1) and subscription.change_seq == 3
+        await _until(lambda: len(connections) == 2)
+        assert connections[0].closed
+        assert events.EVENTS_CHANNEL in connections[1].listeners
+
+        broker.publish("user-1", 4)
+        await _until(lambda: connections[1].sent)
+        assert connections[1].sent == [(events.EVENTS_CHANNEL, "user-1:4")]
+
+        await broker.stop()
+        assert connections[1].closed
+        assert len(connections) == 2
+
+    async def test_dropped_connection_listens_again(self, connections):
+        """Тест: оборванное соединение без отправок переподключается и снова слушает канал"""
+        broker = events.PostgresBroker("postgresql://test")
+        await broker.start()
+        subscription = broker.subscribe("user-1")
+
+        connections[0].terminate()
+
+        await _until(lambda: len(connections) == 2)
+        # Уведомление другого процесса приходит через новое соединение
+        connections[1].listeners[events.EVENTS_CHANNEL](connections[1], 1, events.EVENTS_CHANNEL, "user-1:7")
+        assert await subscription.wait(1) and subscription.change_seq == 7
+
+        await broker.stop()
+        assert len(connections) == 2
+
+
+    async def test_invalidations_reach_other_processes(self, connections):
+        """Тест рассылки инвалидаций кэша через отдельный канал"""
+        broker = events.PostgresBroker("postgresql://test")
+        received = []
+        broker.add_invalidation_listener(received.append)
+        await broker.start()
+        # При подключении кэш сбрасывается целиком
+        assert received == [None]
+
+        broker.invalidate("user:1")
+
+        # Свой процесс сбрасывает кэш сразу, не дожидаясь уведомления
+        assert received == [None, "user:1"]
+        # Отправка не удалась: после переподключения кэш снова сбрасывается
+        await _until(lambda: len(received) == 3)
+        assert received[2] is None
+        assert events.INVALIDATIONS_CHANNEL in connections[1].listeners
+
+        broker.invalidate("user:2")
+        broker.invalidate(None)
+        await _until(lambda: len(connections[1].sent) == 2)
+        assert sorted(connections[1].sent) == [
+            (events.INVALIDATIONS_CHANNEL, ""),
+            (events.INVALIDATIONS_CHANNEL, "user:2"),
+        ]
+
+        # Инвалидации других процессов приходят через LISTEN
+        received.clear()
+        listener = connections[1].listeners[events.INVALIDATIONS_CHANNEL]
+        listener(connections[1], 1, events.INVALIDATIONS_CHANNEL, "user:3")
+        listener(connections[1], 1, events.INVALIDATIONS_CHANNEL, "")
+        assert received == ["user:3", None]
+
+        await broker.stop()
+
+
+class TestChangeStream:
+    """Тесты для change_stream"""
+
+    async def test_events_and_heartbeat(self):
+        """Тест событий об изменениях и комментариев для поддержания соединения"""
+        subscription = events.broker.subscribe("user-1")
+        subscription.notify(3)
+        stream = events.change_stream(subscription, since=1, heartbeat=0.01)
+
+        assert (await stream.__anext__()).startswith("retry:")
+        # Клиент отстал: событие отправляется сразу
+        assert await stream.__anext__() == events.format_change(3)
+        assert await stream.__anext__() == ": ping\n\n"
+
+        events.publish("user-1", 4)
+        assert await stream.__anext__() == events.format_change(4)
+
+        await stream.aclose()
+        assert events.broker.subscriber_count() == 0
+
+    async def test_no_event_when_up_to_date(self):
+        """Тест: синхронизированный клиент не получает событие при подключении"""
+        subscription = events.broker.subscribe("user-1")
+        subscription.notify(3)
+        stream = events.change_stream(subscription, since=3, heartbeat=0.01)
+
+        await stream.__anext__()
+        assert await stream.__anext__() == ": ping\n\n"
+        await stream.aclose()
+
+
+class TestEventsEndpoint:
+    """Тесты для GET /sync/events"""
+
+    async def _open(self, headers: dict, path: str = "/sync/events"):
+        """Запускает поток событий напрямую через ASGI и возвращает (задачу, очередь порций, отключение)"""
+        bodies = asyncio.Queue()
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                await bodies.put(message)
+            elif message.get("body"):
+                await bodies.put(message["body"].decode())
+
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+            "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        }
+        task = asyncio.create_task(app(scope, receive, send))
+        return task, bodies, disconnected
+
+    async def _next(self, bodies: asyncio.Queue):
+        return await asyncio.wait_for(bodies.get(), 5)
+
+    async def test_events_unauthorized(self, client: AsyncClient):
+        """Тест подписки без авторизации"""
+        response = await client.get("/sync/events")
+
+        assert response.status_code in [401, 403]
+
+    async def test_change_pushed(self, client: AsyncClient, auth_headers):
+        """Тест уведомления об изменении с другого устройства"""
+        task, bodies, disconnected = await self._open(auth_headers)
+
+        start = await self._next(bodies)
+        assert start["status"] == 200
+        assert dict(start["headers"])[b"content-type"].startswith(b"text/event-stream")
+        assert (await self._next(bodies)).startswith("retry:")
+
+        response = await client.post("/bookmarks/", json={"url": "https://pushed.com", "title": "Pushed"}, headers=auth_headers)
+        assert response.status_code == 201
+
+        assert await self._next(bodies) == events.format_change(1)
+
+        disconnected.set()
+        await asyncio.wait_for(task, 5)
+        assert events.broker.subscriber_count() == 0
+
+    async def test_missed_change_on_reconnect(self, client: AsyncClient, auth_headers):
+        """Тест: изменение, сделанное без подключения, приходит сразу после Last-Event-ID"""
+        for i in range(2):
+            await client.post("/bookmarks/", json={"url": f"https://missed{i}.com", "title": "Missed"}, headers=auth_headers)
+
+        task, bodies, disconnected = await self._open({**auth_headers, "Last-Event-ID": "1"})
+        await self._next(bodies)
+        await self._next(bodies)
+
+        assert await self._next(bodies) == events.format_change(2)
+
+        disconnected.set()
+        await asyncio.wait_for(task, 5)
@@ -113,7 +113,42 @@ class TestExport:
         for i in range(5):
             assert f"Test Bookmark {i}" in content
             assert f"https://example{i}.com" in content
-    
+
+    @pytest.mark.parametrize("format", ["json", "csv", "html"])
+    async def test_export_streams_in_chunks(self, client: AsyncClient, auth_headers, multiple_bookmarks, monkeypatch, format):
+        """Тест экспорта, читающего закладки несколькими порциями"""
+        from app import exporters
+        monkeypatch.setattr(exporters, "EXPORT_CHUNK_SIZE", 2)
+
+        response = await client.get(f"/export/{format}", headers=auth_headers)
+
+        assert response.status_code == 200
+        content = response.text
+        for i in range(5):
+            assert content.count(f"https://example{i}.com") >= 1
+
+        if format == "json":
+            assert len(json.loads(content)["bookmarks"]) == 5
+        elif format == "csv":
+            assert len(content.strip().split('\n')) == 6
+        else:
+            assert "Total bookmarks: 5" in content
+
+    async def test_export_not_modified(self, client: AsyncClient, auth_headers, multiple_bookmarks):
+        """Тест ответа 304 на повторный экспорт без изменений"""
+        response = await client.get("/export/json", headers=auth_headers)
+        etag = response.headers["etag"]
+
+        response = await client.get("/export/json", headers={**auth_headers, "If-None-Match": f'"other", {etag}'})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        await client.post("/bookmarks/", json={"url": "https://new.com", "title": "New"}, headers=auth_headers)
+
+        response = await client.get("/export/json", headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert len(response.json()["bookmarks"]) == 6
+
     async def test_export_unsupported_format(self, client: AsyncClient, auth_headers):
         """Тест экспорта в неподдерживаемом формате"""
         response = await client.get("/export/xml", headers=auth_headers)
@@ -174,8 +209,62 @@ class TestImport:
         bookmarks = response.json()["bookmarks"]
         
         assert len(bookmarks) == 2
-        assert bookmarks[0]["title"] == "Imported Bookmark 1"
-        assert bookmarks[1]["title"] == "Imported Bookmark 2"
+        # Новые первыми, как в выдаче по created_at DESC
+        assert bookmarks[0]["title"] == "Imported Bookmark 2"
+        assert bookmarks[1]["title"] == "Imported Bookmark 1"
+    
+    async def test_import_parse_error_saves_nothing(self, client: AsyncClient, auth_headers, monkeypatch):
+        """Тест: ошибка разбора после записанных порций откатывает весь импорт"""
+        from app import crud
+        
+        from app import jobs
+        
+        # Первые две закладки уходят в базу отдельной порцией до ошибки
+        monkeypatch.setattr(crud, "IMPORT_CHUNK_SIZE", 2)
+        monkeypatch.setattr(jobs, "JOB_PARSE_BATCH", 1)
+        items = ",".join(json.dumps({"url": f"https://partial{i}.com", "title": f"Partial {i}"}) for i in range(3))
+        import_data = {"format": "json", "data": f'[{items}, {{"url": '}
+        
+        response = await client.post("/import/json", json=import_data, headers=auth_headers)
+        
+        assert response.status_code == 400
+        response = await client.get("/bookmarks/", headers=auth_headers)
+        assert response.json()["bookmarks"] == []
+        assert response.json()["total_count"] == 0
+    
+    async def test_import_written_after_upload(self, client: AsyncClient, auth_headers, monkeypatch, tmp_path):
+        """Тест: синхронный импорт пишет в базу только после получения всего файла"""
+        from app import crud, jobs
+        
+        monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path))
+        received = []
+        save_upload = jobs.save_upload
+        create_bookmarks_bulk = crud.create_bookmarks_bulk
+        
+        async def recorded_upload(chunks, path):
+            await save_upload(chunks, path)
+            received.append(path)
+        
+        async def checked_bulk(*args, **kwargs):
+            # Строка статистики блокируется только после загрузки
+            assert received
+            return await create_bookmarks_bulk(*args, **kwargs)
+        
+        monkeypatch.setattr(jobs, "save_upload", recorded_upload)
+        monkeypatch.setattr(crud, "create_bookmarks_bulk", checked_bulk)
+        
+        csv_content = "Title,URL\n" + "".join(f"Row {i},https://row{i}.com\n" for i in range(3))
+        response = await client.post(
+            "/import/csv",
+            content=csv_content.encode("utf-8"),
+            headers={**auth_headers, "Content-Type": "application/octet-stream"}
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["imported_count"] == 3
+        assert len(received) == 1
+        # Сохраненный файл удаляется после импорта
+        assert os.listdir(tmp_path) == []
     
     async def test_import_json_array_format(self, client: AsyncClient, auth_headers):
         """Тест импорта JSON в формате массива"""
@@ -287,9 +376,44 @@ class TestImport:
         bookmarks = response.json()["bookmarks"]
         
         assert len(bookmarks) == 2
-        assert bookmarks[0]["title"] == "HTML Bookmark 1"
-        assert bookmarks[1]["title"] == "HTML Bookmark 2"
-    
+        # Новые первыми, как в выдаче по created_at DESC
+        assert bookmarks[0]["title"] == "HTML Bookmark 2"
+        assert bookmarks[1]["title"] == "HTML Bookmark 1"
+
+    async def test_import_html_browser_export(self, client: AsyncClient, auth_headers):
+        """Тест импорта экспорта браузера с папками, датами и описаниями"""
+        html_content = """
+        <!DOCTYPE NETSCAPE-Bookmark-file-1>
+        <DL><p>
+            <DT><H3 ADD_DATE="1600000000" PERSONAL_TOOLBAR_FOLDER="true">Bookmarks bar</H3>
+            <DL><p>
+                <DT><A HREF='https://chrome.example.com/' ADD_DATE="1600000000" ICON="data:image/png;base64,AA==">Chrome &amp; Co</A>
+                <DD>Imported description
+            </DL><p>
+            <DT><A HREF="place:type=6&sort=14">Recent Tags</A>
+            <DT><A HREF="not a url">Broken</A>
+        </DL><p>
+        """
+
+        import_data = {
+            "format": "html",
+            "data": "data:text/html;base64," + base64.b64encode(html_content.encode("utf-8")).decode("ascii")
+        }
+
+        response = await client.post("/import/html", json=import_data, headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["imported_count"] == 1
+        assert data["failed_count"] == 1
+        assert "Broken" in data["errors"][0]
+
+        response = await client.get("/bookmarks/", headers=auth_headers)
+        bookmark = response.json()["bookmarks"][0]
+        assert bookmark["title"] == "Chrome & Co"
+        assert bookmark["description"] == "Imported description"
+        assert bookmark["created_at"].startswith("2020-09-13")
+
     async def test_import_csv_success(self, client: AsyncClient, auth_headers):
         """Тест успешного импорта CSV"""
         csv_content = """Title,URL,Description,Access Level
@@ -314,8 +438,9 @@ CSV Bookmark 2,https://csv2.com,CSV Description 2,public"""
         bookmarks = response.json()["bookmarks"]
         
         assert len(bookmarks) == 2
-        assert bookmarks[0]["title"] == "CSV Bookmark 1"
-        assert bookmarks[1]["title"] == "CSV Bookmark 2"
+        # Новые первыми, как в выдаче по created_at DESC
+        assert bookmarks[0]["title"] == "CSV Bookmark 2"
+        assert bookmarks[1]["title"] == "CSV Bookmark 1"
     
     async def test_import_csv_missing_required_field(self, client: AsyncClient, auth_headers):
         """Тест импорта CSV с отсутствующим обязательным полем"""
@@ -377,6 +502,109 @@ CSV Bookmark 1,CSV Description 1,private"""
         assert data["imported_count"] == 1
         assert data["failed_count"] == 0
     
+    async def test_import_multipart_upload(self, client: AsyncClient, auth_headers):
+        """Тест импорта файла, загруженного через multipart/form-data"""
+        csv_content = 'Title,URL,Description\r\n"Multipart, CSV",https://multipart.com,"Line 1\nLine 2"\r\n'
+
+        response = await client.post(
+            "/import/csv",
+            files={"file": ("bookmarks.csv", csv_content.encode("utf-8"), "text/csv")},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.json()["imported_count"] == 1
+
+        response = await client.get("/bookmarks/", headers=auth_headers)
+        bookmark = response.json()["bookmarks"][0]
+        assert bookmark["title"] == "Multipart, CSV"
+        assert bookmark["description"] == "Line 1\nLine 2"
+
+    async def test_import_raw_upload(self, client: AsyncClient, auth_headers):
+        """Тест импорта файла, переданного телом application/octet-stream"""
+        bookmarks_data = {"bookmarks": [
+            {"url": f"https://raw{i}.com", "title": f"Raw Bookmark {i}"}
+            for i in range(3)
+        ]}
+
+        async def body():
+            # Тело приходит небольшими фрагментами
+            content = json.dumps(bookmarks_data).encode("utf-8")
+            for i in range(0, len(content), 16):
+                yield content[i:i + 16]
+
+        response = await client.post(
+            "/import/json",
+            content=body(),
+            headers={**auth_headers, "Content-Type": "application/octet-stream"}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["imported_count"] == 3
+        assert data["failed_count"] == 0
+
+    async def test_import_repeated_is_idempotent(self, client: AsyncClient, auth_headers):
+        """Тест: повторный импорт того же файла ничего не создает"""
+        import_data = {"format": "json", "data": json.dumps([
+            {"url": "https://again.com/page", "title": "Again"},
+            {"url": "https://again.com/page/?utm_source=mail", "title": "Again, tracked"},
+            {"url": "https://other.com", "title": "Other"},
+        ])}
+
+        response = await client.post("/import/json", json=import_data, headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["imported_count"], data["updated_count"], data["skipped_count"]) == (2, 0, 1)
+
+        response = await client.post("/import/json", json=import_data, headers=auth_headers)
+        data = response.json()
+        assert (data["imported_count"], data["updated_count"], data["skipped_count"]) == (0, 0, 3)
+        assert data["failed_count"] == 0
+
+        response = await client.get("/bookmarks/", headers=auth_headers)
+        assert [b["title"] for b in response.json()["bookmarks"]] == ["Other", "Again"]
+
+    async def test_import_on_duplicate_modes(self, client: AsyncClient, auth_headers):
+        """Тест режимов merge и overwrite для уже имеющихся закладок"""
+        first = {"format": "json", "data": json.dumps([
+            {"url": "https://mode.com", "title": "Original"},
+        ])}
+        await client.post("/import/json", json=first, headers=auth_headers)
+        second = {"format": "json", "data": json.dumps([
+            {"url": "https://MODE.com/", "title": "Imported", "description": "From file", "access_level": "public"},
+        ])}
+
+        # merge дополняет описание, но не меняет заголовок
+        response = await client.post("/import/json?on_duplicate=merge", json=second, headers=auth_headers)
+        assert response.json()["updated_count"] == 1
+        bookmark = (await client.get("/bookmarks/", headers=auth_headers)).json()["bookmarks"][0]
+        assert (bookmark["title"], bookmark["description"], bookmark["access_level"]) == ("Original", "From file", "private")
+
+        # Повторное слияние ничего не меняет
+        response = await client.post("/import/json?on_duplicate=merge", json=second, headers=auth_headers)
+        assert (response.json()["updated_count"], response.json()["skipped_count"]) == (0, 1)
+
+        response = await client.post("/import/json?on_duplicate=overwrite", json=second, headers=auth_headers)
+        assert response.json()["updated_count"] == 1
+        bookmark = (await client.get("/bookmarks/", headers=auth_headers)).json()["bookmarks"][0]
+        assert (bookmark["title"], bookmark["access_level"]) == ("Imported", "public")
+        assert bookmark["sync_version"] == 2
+
+        response = await client.post("/import/json?on_duplicate=replace", json=second, headers=auth_headers)
+        assert response.status_code == 422
+
+    async def test_import_raw_upload_unsupported_format(self, client: AsyncClient, auth_headers):
+        """Тест загрузки файла в неподдерживаемом формате"""
+        response = await client.post(
+            "/import/xml",
+            content=b"<bookmarks></bookmarks>",
+            headers={**auth_headers, "Content-Type": "application/octet-stream"}
+        )
+
+        assert response.status_code == 400
+        assert "Unsupported import format" in response.json()["detail"]
+
     async def test_import_missing_fields(self, client: AsyncClient, auth_headers):
         """Тест импорта с отсутствующими полями"""
         # Без format
@@ -0,0 +1,211 @@
+"""
+Тесты для потокового чтения файлов закладок
+"""
+import sys
+import os
+import base64
+import json
+import pytest
+from datetime import datetime, timezone
+
+# Добавляем корневую директорию проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.importers import (
+    iter_csv_rows,
+    iter_import_text,
+    iter_json_items,
+    iter_multipart_file,
+    iter_netscape_bookmarks,
+)
+
+
+async def _chunks(*chunks):
+    """Асинхронный источник фрагментов текста"""
+    for chunk in chunks:
+        yield chunk
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+# Фрагмент экспорта Firefox: папки, ADD_DATE, описания и иконки
+FIREFOX_EXPORT = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks Menu</H1>
+
+<DL><p>
+    <DT><A HREF="place:sort=8&maxResults=10" ADD_DATE="1700000000">Recent Tags</A>
+    <DT><H3 ADD_DATE="1600000000" LAST_MODIFIED="1700000000">Mozilla Firefox</H3>
+    <DL><p>
+        <DT><A HREF="https://support.mozilla.org/" ADD_DATE="1600000001" ICON="data:image/png;base64,AAAA">Get Help</A>
+        <DD>Firefox &amp; help
+        <DT><A HREF='https://www.mozilla.org/about/' ADD_DATE="1600000002">About <b>Us</b></A>
+    </DL><p>
+    <DT><H3>Empty folder</H3>
+    <DT><A HREF="https://example.com/root" ADD_DATE="1700000000000000">Root link</A>
+</DL>
+"""
+
+
+class TestNetscapeBookmarks:
+    """Тесты для iter_netscape_bookmarks"""
+
+    async def test_folders_dates_and_descriptions(self):
+        """Тест разбора папок, дат добавления и описаний"""
+        links = await _collect(iter_netscape_bookmarks(_chunks(FIREFOX_EXPORT)))
+
+        assert [link.url for link in links] == [
+            "place:sort=8&maxResults=10",
+            "https://support.mozilla.org/",
+            "https://www.mozilla.org/about/",
+            "https://example.com/root",
+        ]
+
+        help_link = links[1]
+        assert help_link.title == "Get Help"
+        assert help_link.folder == ("Mozilla Firefox",)
+        assert help_link.description == "Firefox & help"
+        assert help_link.add_date == datetime.fromtimestamp(1600000001, tz=timezone.utc)
+
+        # Вложенная разметка в заголовке и одинарные кавычки
+        assert links[2].title == "About Us"
+        assert links[2].description is None
+
+        # Папка без вложенного списка не попадает в путь; дата в микросекундах
+        assert links[3].folder == ()
+        assert links[3].add_date == datetime.fromtimestamp(1700000000, tz=timezone.utc)
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64])
+    async def test_chunked_input(self, chunk_size):
+        """Тест одинакового результата при любом разбиении входа"""
+        chunks = [FIREFOX_EXPORT[i:i + chunk_size] for i in range(0, len(FIREFOX_EXPORT), chunk_size)]
+
+        assert await _collect(iter_netscape_bookmarks(_chunks(*chunks))) == await _collect(iter_netscape_bookmarks(_chunks(FIREFOX_EXPORT)))
+
+    async def test_nested_folders(self):
+        """Тест пути вложенных папок"""
+        html = """
+        <DL><p>
+            <DT><H3>Bar</H3>
+            <DL><p>
+                <DT><H3>Dev</H3>
+                <DL><p>
+                    <DT><A HREF="https://docs.python.org/">Python</A>
+                </DL><p>
+                <DT><A HREF="https://news.ycombinator.com/">HN</A>
+            </DL><p>
+        </DL><p>
+        """
+        links = await _collect(iter_netscape_bookmarks(_chunks(html)))
+
+        assert [(link.title, link.folder) for link in links] == [
+            ("Python", ("Bar", "Dev")),
+            ("HN", ("Bar",)),
+        ]
+
+
+class TestImportText:
+    """Тесты для iter_import_text"""
+
+    @pytest.mark.parametrize("chunk_size", [4, 5, 64])
+    async def test_base64_data_url(self, chunk_size):
+        """Тест декодирования data URL порциями, в том числе посреди символа UTF-8"""
+        text = "Закладки: ✓ " * 10
+        data = "data:text/html;base64," + base64.b64encode(text.encode("utf-8")).decode("ascii")
+
+        assert "".join(await _collect(iter_import_text(data, chunk_size))) == text
+
+    async def test_plain_text(self):
+        """Тест обычного текста"""
+        assert await _collect(iter_import_text("abcdef", 4)) == ["abcd", "ef"]
+
+    async def test_invalid_base64(self):
+        """Тест ошибки для некорректного base64"""
+        with pytest.raises(ValueError):
+            await _collect(iter_import_text("data:text/html;base64,@@@@"))
+
+
+def _split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestJsonItems:
+    """Тесты для iter_json_items"""
+
+    BOOKMARKS = [
+        {"url": "https://a.com", "title": "A [1], {x}"},
+        {"url": "https://b.com", "title": "Б \\\" кавычка", "n": 12345},
+    ]
+
+    @pytest.mark.parametrize("document", [
+        json.dumps(BOOKMARKS),
+        json.dumps({"bookmarks": BOOKMARKS}),
+        json.dumps({"bookmarks": BOOKMARKS}, indent=4),
+        json.dumps({"version": 1, "bookmarks": BOOKMARKS}),
+    ])
+    @pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+    async def test_document_shapes(self, document, chunk_size):
+        """Тест списка, обертки bookmarks и разбиения на фрагменты"""
+        items = await _collect(iter_json_items(_chunks(*_split(document, chunk_size))))
+
+        assert items == self.BOOKMARKS
+
+    async def test_single_object(self):
+        """Тест одиночной закладки"""
+        items = await _collect(iter_json_items(_chunks('{"url": "https://a.com"}')))
+
+        assert items == [{"url": "https://a.com"}]
+
+    @pytest.mark.parametrize("document", ['[{"url": "https://a.com"}, {"url"', '[1, 2', '{"bookmarks": [}'])
+    async def test_invalid_json(self, document):
+        """Тест ошибки для оборванного или некорректного JSON"""
+        with pytest.raises(json.JSONDecodeError):
+            await _collect(iter_json_items(_chunks(*_split(document, 4))))
+
+
+class TestCsvRows:
+    """Тесты для iter_csv_rows"""
+
+    @pytest.mark.parametrize("chunk_size", [1, 5, 1000])
+    async def test_quoted_fields_across_chunks(self, chunk_size):
+        """Тест полей с кавычками и переводами строк на границах фрагментов"""
+        text = 'Title,URL,Description\r\n"A, ""quoted""",https://a.com,"line 1\nline 2"\r\n\r\nB,https://b.com\r\n'
+        rows = await _collect(iter_csv_rows(_chunks(*_split(text, chunk_size))))
+
+        assert rows == [
+            {"Title": 'A, "quoted"', "URL": "https://a.com", "Description": "line 1\nline 2"},
+            {"Title": "B", "URL": "https://b.com", "Description": None},
+        ]
+
+    async def test_no_trailing_newline(self):
+        """Тест последней строки без перевода строки"""
+        rows = await _collect(iter_csv_rows(_chunks("URL\nhttps://a.com")))
+
+        assert rows == [{"URL": "https://a.com"}]
+
+
+class TestMultipartFile:
+    """Тесты для iter_multipart_file"""
+
+    async def test_file_part(self):
+        """Тест извлечения файла из multipart без остальных полей"""
+        body = (
+            b'--XyZ\r\nContent-Disposition: form-data; name="note"\r\n\r\nignored\r\n'
+            b'--XyZ\r\nContent-Disposition: form-data; name="file"; filename="b.csv"\r\n'
+            b'Content-Type: text/csv\r\n\r\nURL\r\nhttps://a.com\r\n'
+            b'--XyZ--\r\n'
+        )
+        chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+        data = await _collect(iter_multipart_file(_chunks(*chunks), "multipart/form-data; boundary=XyZ"))
+
+        assert b"".join(data) == b"URL\r\nhttps://a.com"
+
+    async def test_missing_file(self):
+        """Тест ошибки, если файла в теле нет"""
+        body = b'--XyZ\r\nContent-Disposition: form-data; name="note"\r\n\r\nx\r\n--XyZ--\r\n'
+
+        with pytest.raises(ValueError):
+            await _collect(iter_multipart_file(_chunks(body), "multipart/form-data; boundary=XyZ"))
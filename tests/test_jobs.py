@@ -0,0 +1,344 @@
+"""
+Интеграционные тесты для фоновых задач импорта и экспорта
+"""
+import sys
+import os
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import update
+
+# Добавляем корневую директорию проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, database, jobs
+from app.models import JobKind, JobStatus
+from tests.conftest import TestSessionLocal
+from tests.test_models import TestJob as Job
+
+
+@pytest.fixture
+async def job_runner(client, monkeypatch, tmp_path):
+    """Исполнитель задач на тестовой базе и во временной директории"""
+    monkeypatch.setattr(database, "AsyncSessionLocal", TestSessionLocal)
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path))
+    yield jobs.runner
+    await jobs.runner.join()
+
+
+@pytest.fixture
+def paused_runner(job_runner, monkeypatch):
+    """Задачи ставятся в очередь, но не запускаются"""
+    monkeypatch.setattr(job_runner, "submit", lambda job_id: None)
+    return job_runner
+
+
+def _json_import(count: int) -> dict:
+    return {
+        "format": "json",
+        "data": json.dumps([
+            {"url": f"https://job{i}.com", "title": f"Job Bookmark {i}"}
+            for i in range(count)
+        ])
+    }
+
+
+class TestImportJobs:
+    """Тесты для POST /import/{format}?async=true"""
+
+    async def test_async_import(self, client: AsyncClient, auth_headers, job_runner):
+        """Тест фонового импорта с отчетом о прогрессе"""
+        response = await client.post("/import/json?async=true", json=_json_import(3), headers=auth_headers)
+
+        assert response.status_code == 202
+        job = response.json()
+        assert job["kind"] == "import"
+        assert job["status"] == "pending"
+
+        await job_runner.join()
+
+        response = await client.get(f"/jobs/{job['id']}", headers=auth_headers)
+        assert response.status_code == 200
+        job = response.json()
+        assert job["status"] == "completed"
+        assert job["processed_count"] == 3
+        assert job["imported_count"] == 3
+        assert job["failed_count"] == 0
+        assert job["finished_at"] is not None
+
+        response = await client.get("/bookmarks/", headers=auth_headers)
+        assert response.json()["total_count"] == 3
+
+        # Загруженный файл удаляется после импорта
+        assert os.listdir(jobs.JOBS_DIR) == []
+
+    async def test_async_import_raw_upload_with_errors(self, client: AsyncClient, auth_headers, job_runner):
+        """Тест фонового импорта файла с некорректными строками"""
+        csv_content = "Title,URL\nGood,https://good.com\nBad,not-a-url\n"
+
+        response = await client.post(
+            "/import/csv?async=true",
+            content=csv_content.encode("utf-8"),
+            headers={**auth_headers, "Content-Type": "application/octet-stream"}
+        )
+        assert response.status_code == 202
+
+        await job_runner.join()
+
+        job = (await client.get(f"/jobs/{response.json()['id']}", headers=auth_headers)).json()
+        assert job["status"] == "completed"
+        assert job["imported_count"] == 1
+        assert job["failed_count"] == 1
+        assert "Bad" in job["errors"][0]
+
+    async def test_async_import_on_duplicate(self, client: AsyncClient, auth_headers, job_runner):
+        """Тест повторного фонового импорта с режимом overwrite"""
+        response = await client.post("/import/json?async=true", json=_json_import(2), headers=auth_headers)
+        assert response.status_code == 202
+        await job_runner.join()
+
+        import_data = {"format": "json", "data": json.dumps([
+            {"url": "https://job0.com", "title": "Job Bookmark 0"},
+            {"url": "https://job1.com/", "title": "Renamed"},
+            {"url": "https://job2.com", "title": "Job Bookmark 2"},
+        ])}
+        response = await client.post("/import/json?async=true&on_duplicate=overwrite", json=import_data, headers=auth_headers)
+        assert response.status_code == 202
+        await job_runner.join()
+
+        job = (await client.get(f"/jobs/{response.json()['id']}", headers=auth_headers)).json()
+        assert job["status"] == "completed"
+        assert (job["imported_count"], job["updated_count"], job["skipped_count"]) == (1, 1, 1)
+
+        response = await client.get("/bookmarks/?sort=title", headers=auth_headers)
+        assert [b["title"] for b in response.json()["bookmarks"]] == ["Job Bookmark 0", "Job Bookmark 2", "Renamed"]
+
+    async def test_async_import_invalid_file(self, client: AsyncClient, auth_headers, job_runner):
+        """Тест задачи, завершившейся ошибкой разбора"""
+        response = await client.post(
+            "/import/json?async=true",
+            json={"format": "json", "data": "[{\"url\": "},
+            headers=auth_headers
+        )
+        assert response.status_code == 202
+
+        await job_runner.join()
+
+        job = (await client.get(f"/jobs/{response.json()['id']}", headers=auth_headers)).json()
+        assert job["status"] == "failed"
+        assert job["error"]
+
+    async def test_import_resumes_from_checkpoint(self, client: AsyncClient, test_db, test_user, job_runner, monkeypatch):
+        """Тест продолжения прерванного импорта с последней сохраненной порции"""
+        monkeypatch.setattr(crud, "IMPORT_CHUNK_SIZE", 2)
+
+        path = jobs.job_file_path("resume", "upload")
+        os.makedirs(jobs.JOBS_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Title,URL\n" + "".join(f"Row {i},https://row{i}.com\n" for i in range(5)))
+
+        job = await crud.create_job(test_db, test_user.id, JobKind.IMPORT, "csv", file_path=path)
+        # Первая порция была закоммичена до сбоя процесса
+        await crud.update_job(test_db, job.id, processed_count=2, imported_count=2)
+        await test_db.commit()
+
+        await jobs.run_job(job.id)
+
+        await test_db.refresh(job)
+        assert job.status == JobStatus.COMPLETED
+        assert job.processed_count == 5
+        assert job.imported_count == 5
+
+        bookmarks = await crud.get_user_bookmarks(test_db, test_user.id, limit=10)
+        assert [bookmark.title for bookmark in bookmarks] == ["Row 4", "Row 3", "Row 2"]
+
+    async def test_import_parsed_off_event_loop(self, client: AsyncClient, auth_headers, job_runner, monkeypatch):
+        """Тест: файл фонового импорта разбирается не в потоке цикла событий"""
+        threads = []
+        json_records = jobs.IMPORT_RECORDS["json"]
+
+        async def recorded(chunks):
+            async for record in json_records(chunks):
+                threads.append(threading.get_ident())
+                yield record
+
+        monkeypatch.setitem(jobs.IMPORT_RECORDS, "json", recorded)
+        monkeypatch.setattr(jobs, "JOB_PARSE_BATCH", 2)
+        monkeypatch.setattr(jobs, "JOB_PARSE_AHEAD", 1)
+
+        response = await client.post("/import/json?async=true", json=_json_import(5), headers=auth_headers)
+        assert response.status_code == 202
+        await job_runner.join()
+
+        job = (await client.get(f"/jobs/{response.json()['id']}", headers=auth_headers)).json()
+        assert job["status"] == "completed"
+        assert job["imported_count"] == 5
+        assert len(threads) == 5
+        assert threading.get_ident() not in threads
+
+    async def test_active_jobs_limit(self, client: AsyncClient, auth_headers, paused_runner, monkeypatch):
+        """Тест ограничения числа активных задач пользователя"""
+        monkeypatch.setattr(jobs, "JOB_MAX_ACTIVE_PER_USER", 1)
+
+        response = await client.post("/import/json?async=true", json=_json_import(1), headers=auth_headers)
+        assert response.status_code == 202
+
+        response = await client.post("/import/json?async=true", json=_json_import(1), headers=auth_headers)
+        assert response.status_code == 429
+
+        response = await client.post("/export/json/jobs", headers=auth_headers)
+        assert response.status_code == 429
+
+
+class TestExportJobs:
+    """Тесты для POST /export/{format}/jobs"""
+
+    async def test_export_job(self, client: AsyncClient, auth_headers, multiple_bookmarks, job_runner):
+        """Тест фонового экспорта и загрузки результата"""
+        response = await client.post("/export/csv/jobs", headers=auth_headers)
+
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+
+        await job_runner.join()
+
+        job = (await client.get(f"/jobs/{job_id}", headers=auth_headers)).json()
+        assert job["kind"] == "export"
+        assert job["status"] == "completed"
+        assert job["processed_count"] == 5
+        assert job["total_count"] == 5
+
+        response = await client.get(f"/jobs/{job_id}/result", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "text/csv; charset=utf-8"
+        assert "attachment" in response.headers["content-disposition"]
+        assert len(response.text.strip().split("\n")) == 6
+
+    async def test_failed_export_removes_file(self, client: AsyncClient, auth_headers, multiple_bookmarks, job_runner, monkeypatch):
+        """Тест: недописанный файл упавшего экспорта удаляется"""
+        async def failing_writer(format, chunks, total_count):
+            yield "partial"
+            raise RuntimeError("disk full")
+
+        monkeypatch.setattr(jobs.exporters, "export_writer", failing_writer)
+
+        response = await client.post("/export/csv/jobs", headers=auth_headers)
+        await job_runner.join()
+
+        job = (await client.get(f"/jobs/{response.json()['id']}", headers=auth_headers)).json()
+        assert job["status"] == "failed"
+        assert job["error"] == "disk full"
+        assert os.listdir(jobs.JOBS_DIR) == []
+
+    async def test_export_job_unsupported_format(self, client: AsyncClient, auth_headers, job_runner):
+        """Тест фонового экспорта в неподдерживаемом формате"""
+        response = await client.post("/export/xml/jobs", headers=auth_headers)
+
+        assert response.status_code == 400
+
+    async def test_result_before_completion(self, client: AsyncClient, auth_headers, paused_runner):
+        """Тест загрузки результата незавершенной задачи"""
+        response = await client.post("/export/json/jobs", headers=auth_headers)
+
+        response = await client.get(f"/jobs/{response.json()['id']}/result", headers=auth_headers)
+        assert response.status_code == 409
+
+
+class TestJobRetention:
+    """Тесты для jobs.sweep_jobs"""
+
+    async def _job(self, db, owner_id, status, finished_ago: timedelta, name: str) -> str:
+        path = jobs.job_file_path(name, "csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Title,URL\n")
+        job = await crud.create_job(db, owner_id, JobKind.EXPORT, "csv", file_path=path)
+        # update_job сам выставляет updated_at; SQLite хранит даты без часового пояса
+        await db.execute(
+            update(Job)
+            .where(Job.id == str(job.id))
+            .values(status=status, updated_at=datetime.utcnow() - finished_ago)
+        )
+        await db.commit()
+        return job.id
+
+    async def test_old_finished_jobs_deleted(self, client: AsyncClient, test_db, test_user, job_runner):
+        """Тест: старые завершенные задачи удаляются вместе с файлами"""
+        os.makedirs(jobs.JOBS_DIR, exist_ok=True)
+        old = timedelta(seconds=jobs.JOB_RETENTION + 60)
+        completed = await self._job(test_db, test_user.id, JobStatus.COMPLETED, old, "completed")
+        failed = await self._job(test_db, test_user.id, JobStatus.FAILED, old, "failed")
+        recent = await self._job(test_db, test_user.id, JobStatus.COMPLETED, timedelta(0), "recent")
+        pending = await self._job(test_db, test_user.id, JobStatus.PENDING, old, "pending")
+
+        assert await jobs.sweep_jobs() == 2
+
+        for job_id in (completed, failed):
+            assert await crud.get_job(test_db, job_id, test_user.id) is None
+        for job_id in (recent, pending):
+            assert await crud.get_job(test_db, job_id, test_user.id) is not None
+        assert sorted(os.listdir(jobs.JOBS_DIR)) == ["pending.csv", "recent.csv"]
+
+    async def test_orphan_files_deleted(self, client: AsyncClient, test_db, test_user, job_runner):
+        """Тест: старые файлы без задачи удаляются, файлы задач остаются"""
+        os.makedirs(jobs.JOBS_DIR, exist_ok=True)
+        await self._job(test_db, test_user.id, JobStatus.PENDING, timedelta(0), "queued")
+        for name in ("orphan.upload", "fresh.upload"):
+            with open(os.path.join(jobs.JOBS_DIR, name), "w", encoding="utf-8") as f:
+                f.write("Title,URL\n")
+        old = time.time() - jobs.JOB_RETENTION - 60
+        for name in ("queued.csv", "orphan.upload"):
+            os.utime(os.path.join(jobs.JOBS_DIR, name), (old, old))
+
+        assert await jobs.sweep_jobs() == 0
+
+        assert sorted(os.listdir(jobs.JOBS_DIR)) == ["fresh.upload", "queued.csv"]
+
+
+    async def test_sweep_requeues_stale_jobs(self, client: AsyncClient, test_db, test_user, job_runner, monkeypatch):
+        """Тест: периодическая очистка возвращает в очередь задачи упавших процессов"""
+        os.makedirs(jobs.JOBS_DIR, exist_ok=True)
+        stale = await self._job(
+            test_db, test_user.id, JobStatus.RUNNING, timedelta(seconds=jobs.JOB_STALE_AFTER + 60), "stale"
+        )
+        alive = await self._job(test_db, test_user.id, JobStatus.RUNNING, timedelta(0), "alive")
+
+        submitted = []
+        requeued = asyncio.Event()
+
+        def submit(job_id):
+            submitted.append(job_id)
+            requeued.set()
+
+        monkeypatch.setattr(job_runner, "submit", submit)
+        sweep = asyncio.create_task(jobs.sweep_jobs_periodically())
+        try:
+            await asyncio.wait_for(requeued.wait(), 5)
+        finally:
+            sweep.cancel()
+            await asyncio.gather(sweep, return_exceptions=True)
+
+        assert submitted == [stale]
+        assert (await crud.get_job(test_db, stale, test_user.id)).status == JobStatus.PENDING
+        assert (await crud.get_job(test_db, alive, test_user.id)).status == JobStatus.RUNNING
+
+
+class TestJobAccess:
+    """Тесты доступа к задачам"""
+
+    async def test_job_not_found(self, client: AsyncClient, auth_headers):
+        """Тест запроса несуществующей задачи"""
+        response = await client.get("/jobs/00000000-0000-0000-0000-000000000000", headers=auth_headers)
+
+        assert response.status_code == 404
+
+    async def test_other_users_job(self, client: AsyncClient, auth_headers, test_db, test_user_2):
+        """Тест запроса чужой задачи"""
+        job = await crud.create_job(test_db, test_user_2.id, JobKind.EXPORT, "json")
+
+        response = await client.get(f"/jobs/{job.id}", headers=auth_headers)
+
+        assert response.status_code == 404
@@ -3,6 +3,7 @@
 """
 import sys
 import os
+import json
 import pytest
 from httpx import AsyncClient
 
@@ -61,6 +62,53 @@ class TestFreeAccountLimits:
         assert response.status_code == 400
         assert "Import limit exceeded for free account" in response.json()["detail"]
     
+    async def test_import_does_not_overshoot_limit(self, client: AsyncClient, auth_headers):
+        """Тест того, что импорт не превышает лимит бесплатного аккаунта"""
+        for i in range(98):
+            bookmark_data = {
+                "url": f"https://limit{i}.com",
+                "title": f"Limit Bookmark {i}"
+            }
+            
+            response = await client.post("/bookmarks/", json=bookmark_data, headers=auth_headers)
+            assert response.status_code == 201
+        
+        import_data = {
+            "format": "json",
+            "data": json.dumps([
+                {"url": f"https://import{i}.com", "title": f"Import Bookmark {i}"}
+                for i in range(5)
+            ])
+        }
+        
+        response = await client.post("/import/json", json=import_data, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["imported_count"] == 2
+        assert response.json()["failed_count"] == 3
+        
+        response = await client.get("/bookmarks/", headers=auth_headers)
+        assert response.json()["total_count"] == 100
+    
+    async def test_delete_frees_limit(self, client: AsyncClient, auth_headers):
+        """Тест освобождения лимита после удаления закладки"""
+        bookmark_ids = []
+        for i in range(100):
+            bookmark_data = {
+                "url": f"https://limit{i}.com",
+                "title": f"Limit Bookmark {i}"
+            }
+            
+            response = await client.post("/bookmarks/", json=bookmark_data, headers=auth_headers)
+            assert response.status_code == 201
+            bookmark_ids.append(response.json()["id"])
+        
+        response = await client.delete(f"/bookmarks/{bookmark_ids[0]}", headers=auth_headers)
+        assert response.status_code == 200
+        
+        bookmark_data = {"url": "https://limit-again.com", "title": "Limit Again"}
+        response = await client.post("/bookmarks/", json=bookmark_data, headers=auth_headers)
+        assert response.status_code == 201
+    
     async def test_premium_account_no_limits(self, client: AsyncClient, test_db):
         """Тест отсутствия лимитов для премиум аккаунта"""
         # Создаем премиум пользователя
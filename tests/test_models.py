@@ -3,10 +3,11 @@
 """
 import sys
 import os
-from sqlalchemy import Column, String, DateTime, Enum, Text, Integer
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Column, String, DateTime, Enum, Text, Integer, JSON, LargeBinary, Index, DDL, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
-from app.models import AccountType, BookmarkStatus, AccessLevel
+from app.models import AccountType, BookmarkStatus, AccessLevel, JobKind, JobStatus
 
 # Добавляем корневую директорию проекта в путь
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -14,6 +15,21 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 Base = declarative_base()
 
 
+_last_timestamp = datetime.min
+
+
+def _now():
+    """Текущее время UTC с микросекундами, строго возрастающее.
+
+    CURRENT_TIMESTAMP в SQLite точен до секунды, и закладки одного теста
+    получали бы одинаковый created_at; тогда порядок created_at DESC, id DESC
+    зависел бы от случайных id, а не от порядка создания, как в Postgres.
+    """
+    global _last_timestamp
+    _last_timestamp = max(datetime.now(timezone.utc).replace(tzinfo=None), _last_timestamp + timedelta(microseconds=1))
+    return _last_timestamp
+
+
 class TestUser(Base):
     """Тестовая модель пользователя для SQLite"""
     __tablename__ = "users"
@@ -38,6 +54,88 @@ class TestBookmark(Base):
     status = Column(Enum(BookmarkStatus), default=BookmarkStatus.ACTIVE, nullable=False)
     access_level = Column(Enum(AccessLevel), default=AccessLevel.PRIVATE, nullable=False)
     owner_id = Column(String(36), nullable=False)  # UUID как строка
-    sync_version = Column(Integer, default=1, nullable=False)  # Добавляем sync_version
+    sync_version = Column(Integer, default=0, nullable=False)
+    change_seq = Column(Integer, default=0, server_default="0", nullable=False)
+    created_at = Column(DateTime(timezone=True), default=_now)
+    updated_at = Column(DateTime(timezone=True), onupdate=_now)
+    url_hash = Column(LargeBinary)
+
+    __table_args__ = (
+        # Одна закладка на канонический URL, как ix_bookmarks_owner_url_hash
+        Index("ix_bookmarks_owner_url_hash", owner_id, url_hash, unique=True),
+    )
+
+
+# Полнотекстовый индекс FTS5 вместо tsvector: внешняя таблица содержимого,
+# которую поддерживают триггеры на bookmarks
+for statement in (
+    "CREATE VIRTUAL TABLE bookmarks_fts USING fts5(title, description, url, content='bookmarks')",
+    """CREATE TRIGGER bookmarks_fts_insert AFTER INSERT ON bookmarks BEGIN
+        INSERT INTO bookmarks_fts(rowid, title, description, url) VALUES (new.rowid, new.title, new.description, new.url);
+    END""",
+    """CREATE TRIGGER bookmarks_fts_delete AFTER DELETE ON bookmarks BEGIN
+        INSERT INTO bookmarks_fts(bookmarks_fts, rowid, title, description, url) VALUES ('delete', old.rowid, old.title, old.description, old.url);
+    END""",
+    """CREATE TRIGGER bookmarks_fts_update AFTER UPDATE ON bookmarks BEGIN
+        INSERT INTO bookmarks_fts(bookmarks_fts, rowid, title, description, url) VALUES ('delete', old.rowid, old.title, old.description, old.url);
+        INSERT INTO bookmarks_fts(rowid, title, description, url) VALUES (new.rowid, new.title, new.description, new.url);
+    END""",
+):
+    event.listen(TestBookmark.__table__, "after_create", DDL(statement))
+event.listen(TestBookmark.__table__, "before_drop", DDL("DROP TABLE IF EXISTS bookmarks_fts"))
+
+
+class TestUserBookmarkStats(Base):
+    """Тестовая модель статистики закладок пользователя для SQLite"""
+    __tablename__ = "user_bookmark_stats"
+    
+    user_id = Column(String(36), primary_key=True)  # UUID как строка
+    bookmark_count = Column(Integer, default=0, server_default="0", nullable=False)
+    max_sync_version = Column(Integer, default=0, server_default="0", nullable=False)
+    last_modified = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    change_seq = Column(Integer, default=0, server_default="0", nullable=False)
+    tombstone_floor = Column(Integer, default=0, server_default="0", nullable=False)
+
+
+class TestBookmarkTombstone(Base):
+    """Тестовая модель записи об удаленной закладке для SQLite"""
+    __tablename__ = "bookmark_tombstones"
+    
+    bookmark_id = Column(String(36), primary_key=True)  # UUID как строка
+    owner_id = Column(String(36), nullable=False)  # UUID как строка
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class TestSyncDevice(Base):
+    """Тестовая модель устройства синхронизации для SQLite"""
+    __tablename__ = "sync_devices"
+    
+    user_id = Column(String(36), primary_key=True)  # UUID как строка
+    device_id = Column(String(64), primary_key=True)
+    watermark = Column(Integer, default=0, server_default="0", nullable=False)
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class TestJob(Base):
+    """Тестовая модель фоновой задачи для SQLite"""
+    __tablename__ = "jobs"
+    
+    id = Column(String(36), primary_key=True)  # UUID как строка
+    owner_id = Column(String(36), nullable=False)  # UUID как строка
+    kind = Column(Enum(JobKind), nullable=False)
+    format = Column(String(10), nullable=False)
+    status = Column(Enum(JobStatus), default=JobStatus.PENDING, nullable=False)
+    file_path = Column(String)
+    processed_count = Column(Integer, default=0, nullable=False)
+    total_count = Column(Integer)
+    imported_count = Column(Integer, default=0, nullable=False)
+    updated_count = Column(Integer, default=0, nullable=False)
+    skipped_count = Column(Integer, default=0, nullable=False)
+    failed_count = Column(Integer, default=0, nullable=False)
+    errors = Column(JSON, default=list, nullable=False)
+    on_duplicate = Column(String(10), default="skip", nullable=False)
+    error = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True))
@@ -0,0 +1,300 @@
+"""
+Тесты настоящих запросов записи app.crud на Postgres
+
+Запускаются, когда TEST_POSTGRES_URL указывает на отдельную пустую базу,
+и проверяют то, что SQLite-заменители из tests/test_crud.py только повторяют.
+"""
+import sys
+import os
+import asyncio
+import pytest
+from uuid import uuid4
+from sqlalchemy import event, select, func
+
+# Добавляем корневую директорию проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud
+from app.models import BookmarkTombstone, JobKind
+from app.schemas import BookmarkCreate, BookmarkImport, UserCreate
+
+pytestmark = pytest.mark.postgres
+
+
+def _bookmark(i: int, **fields) -> BookmarkCreate:
+    return BookmarkCreate(url=f"https://pg{i}.com", title=f"PG {i}", **fields)
+
+
+class TestPostgresWrites:
+    """Тесты путей записи закладок на Postgres"""
+
+    async def test_create_update_delete(self, pg_sessions, pg_user):
+        """Тест: версии, change_seq и статистика при создании, изменении и удалении"""
+        async with pg_sessions() as db:
+            bookmark = await crud.create_bookmark(db, _bookmark(1), pg_user.id)
+            assert (bookmark.sync_version, bookmark.change_seq) == (0, 1)
+            # Откат после ошибки сбрасывает загруженные объекты сессии
+            bookmark_id = bookmark.id
+
+            with pytest.raises(crud.DuplicateURLError):
+                await crud.create_bookmark(db, BookmarkCreate(url="https://PG1.com/", title="Again"), pg_user.id)
+
+            updated = await crud.update_bookmark(db, bookmark_id, pg_user.id, title="Edited")
+            assert (updated.title, updated.sync_version, updated.change_seq) == ("Edited", 1, 2)
+            assert await crud.update_bookmark(db, uuid4(), pg_user.id, title="Nobody") is None
+
+            stats = await crud.get_bookmark_stats(db, pg_user.id)
+            assert (stats.bookmark_count, stats.change_seq, stats.max_sync_version) == (1, 2, 1)
+
+            assert await crud.delete_bookmark(db, bookmark_id, pg_user.id) is True
+            assert await crud.delete_bookmark(db, bookmark_id, pg_user.id) is False
+            tombstone = await db.get(BookmarkTombstone, bookmark_id)
+            assert tombstone.change_seq == 3
+            await db.refresh(stats)
+            assert (stats.bookmark_count, stats.change_seq) == (0, 3)
+
+    async def test_create_limit(self, pg_sessions, pg_user):
+        """Тест: создание сверх лимита не меняет статистику"""
+        async with pg_sessions() as db:
+            assert await crud.create_bookmark(db, _bookmark(1), pg_user.id, limit=1) is not None
+            assert await crud.create_bookmark(db, _bookmark(2), pg_user.id, limit=1) is None
+            stats = await crud.get_bookmark_stats(db, pg_user.id)
+            assert (stats.bookmark_count, stats.change_seq) == (1, 1)
+
+    async def test_listing_order_and_cursor(self, pg_sessions, pg_user):
+        """Тест: выдача новыми первыми и продолжение по курсору (created_at, id)"""
+        async with pg_sessions() as db:
+            created = [await crud.create_bookmark(db, _bookmark(i), pg_user.id) for i in range(3)]
+
+            first = await crud.get_user_bookmarks(db, pg_user.id, limit=2)
+            assert [b.id for b in first] == [created[2].id, created[1].id]
+            rest = await crud.get_user_bookmarks(db, pg_user.id, cursor=(first[-1].created_at, first[-1].id))
+            assert [b.id for b in rest] == [created[0].id]
+
+    async def test_bulk_on_duplicate(self, pg_sessions, pg_user):
+        """Тест: повторный импорт пропускает, merge дополняет имеющиеся закладки"""
+        async with pg_sessions() as db:
+            rows = [BookmarkImport(url="https://pg1.com", title="PG 1"), BookmarkImport(url="https://pg2.com", title="PG 2")]
+            assert await crud.create_bookmarks_bulk(db, rows, pg_user.id) == crud.BulkResult(2, 0, 0, [])
+            assert await crud.create_bookmarks_bulk(db, rows, pg_user.id) == crud.BulkResult(0, 0, 2, [])
+
+            rows[0] = BookmarkImport(url="https://PG1.com/?utm_source=x", title="Other", description="Filled")
+            result = await crud.create_bookmarks_bulk(db, rows, pg_user.id, on_duplicate="merge")
+            assert result == crud.BulkResult(0, 1, 1, [])
+
+            bookmarks = {b.url: b for b in await crud.get_user_bookmarks(db, pg_user.id)}
+            merged = bookmarks["https://pg1.com/"]
+            assert (merged.title, merged.description, merged.sync_version) == ("PG 1", "Filled", 1)
+            stats = await crud.get_bookmark_stats(db, pg_user.id)
+            assert (stats.bookmark_count, stats.max_sync_version) == (2, 1)
+
+    async def test_batch(self, pg_sessions, pg_user):
+        """Тест пакета: удаление освобождает место, изменение и дубликат URL"""
+        async with pg_sessions() as db:
+            kept = await crud.create_bookmark(db, _bookmark(1), pg_user.id)
+            removed = await crud.create_bookmark(db, _bookmark(2), pg_user.id)
+            missing = uuid4()
+
+            outcomes, change_seq = await crud.apply_bookmark_batch(db, pg_user.id, [
+                crud.BookmarkOperation("create", data=_bookmark(3)),
+                crud.BookmarkOperation("update", kept.id, {"title": "Edited"}),
+                crud.BookmarkOperation("delete", removed.id),
+                crud.BookmarkOperation("create", data=BookmarkCreate(url="https://pg1.com", title="Dup")),
+                crud.BookmarkOperation("delete", missing),
+            ], limit=3)
+
+            assert [outcome.status for outcome in outcomes] == ["created", "updated", "deleted", "duplicate", "not_found"]
+            assert outcomes[1].sync_version == 1
+            assert change_seq == 2 + 5
+            stats = await crud.get_bookmark_stats(db, pg_user.id)
+            assert (stats.bookmark_count, stats.change_seq, stats.max_sync_version) == (2, change_seq, 1)
+            tombstone = await db.get(BookmarkTombstone, removed.id)
+            assert tombstone.change_seq == 2 + 3
+
+            with pytest.raises(crud.DuplicateURLError):
+                await crud.apply_bookmark_batch(db, pg_user.id, [
+                    crud.BookmarkOperation("update", kept.id, {"url": "https://pg3.com"}),
+                ])
+            assert await crud.get_change_seq(db, pg_user.id) == change_seq
+
+    async def test_batch_update_clears_description(self, pg_sessions, pg_user):
+        """Тест: изменение в пакете пишет NULL только в переданные поля"""
+        async with pg_sessions() as db:
+            cleared = await crud.create_bookmark(db, _bookmark(1, description="One"), pg_user.id)
+            kept = await crud.create_bookmark(db, _bookmark(2, description="Two"), pg_user.id)
+            cleared_id, kept_id = cleared.id, kept.id
+
+            outcomes, _ = await crud.apply_bookmark_batch(db, pg_user.id, [
+                crud.BookmarkOperation("update", cleared_id, {"description": None, "title": None}),
+                crud.BookmarkOperation("update", kept_id, {"title": "Kept"}),
+            ])
+
+            assert [outcome.status for outcome in outcomes] == ["updated", "updated"]
+            bookmarks = {b.id: b for b in await crud.get_user_bookmarks(db, pg_user.id)}
+            assert (bookmarks[cleared_id].title, bookmarks[cleared_id].description) == ("PG 1", None)
+            assert (bookmarks[kept_id].title, bookmarks[kept_id].description) == ("Kept", "Two")
+
+    async def test_batch_duplicate_takes_no_slot(self, pg_sessions, pg_user):
+        """Тест: дубликат в пакете не тратит последнее свободное место"""
+        async with pg_sessions() as db:
+            await crud.create_bookmark(db, _bookmark(1), pg_user.id)
+
+            outcomes, change_seq = await crud.apply_bookmark_batch(db, pg_user.id, [
+                crud.BookmarkOperation("create", data=BookmarkCreate(url="https://PG1.com/", title="Dup")),
+                crud.BookmarkOperation("create", data=_bookmark(2)),
+                crud.BookmarkOperation("create", data=_bookmark(3)),
+            ], limit=2)
+
+            assert [outcome.status for outcome in outcomes] == ["duplicate", "created", "limit_exceeded"]
+            assert change_seq == 1 + 3
+            stats = await crud.get_bookmark_stats(db, pg_user.id)
+            assert (stats.bookmark_count, stats.change_seq) == (2, change_seq)
+
+    async def test_resolutions_compare_and_swap(self, pg_sessions, pg_user):
+        """Тест: разрешение применяется только к неизменившейся версии"""
+        async with pg_sessions() as db:
+            current = await crud.create_bookmark(db, _bookmark(1), pg_user.id)
+            stale = await crud.create_bookmark(db, _bookmark(2), pg_user.id)
+            await crud.update_bookmark(db, stale.id, pg_user.id, title="Moved on")
+
+            def change(bookmark, title):
+                return crud.ResolutionChange(bookmark.id, 0, {
+                    "url": bookmark.url, "title": title, "description": None,
+                    "access_level": bookmark.access_level, "status": bookmark.status,
+                })
+
+            applied, change_seq = await crud.apply_resolutions(db, pg_user.id, [change(current, "Resolved"), change(stale, "Lost")])
+
+            assert applied == {current.id: 1}
+            assert change_seq == 3 + 2
+            assert (await crud.get_bookmark(db, stale.id, pg_user.id)).title == "Moved on"
+
+    async def test_create_job_max_active(self, pg_sessions, pg_user):
+        """Тест: задача сверх max_active не ставится в очередь"""
+        async with pg_sessions() as db:
+            assert await crud.create_job(db, pg_user.id, JobKind.EXPORT, "json", max_active=1) is not None
+            assert await crud.create_job(db, pg_user.id, JobKind.EXPORT, "json", max_active=1) is None
+            assert await crud.count_active_jobs(db, pg_user.id) == 1
+
+
+class TestPostgresLockOrder:
+    """Тесты параллельных записей одного пользователя: строка статистики блокируется первой"""
+
+    async def _create(self, pg_sessions, pg_user, count: int) -> list:
+        async with pg_sessions() as db:
+            return [(await crud.create_bookmark(db, _bookmark(i), pg_user.id)).id for i in range(count)]
+
+    async def _update(self, pg_sessions, pg_user, bookmark_id):
+        async with pg_sessions() as db:
+            return await crud.update_bookmark(db, bookmark_id, pg_user.id, title="Edited")
+
+    async def _delete(self, pg_sessions, pg_user, bookmark_id):
+        async with pg_sessions() as db:
+            return await crud.delete_bookmark(db, bookmark_id, pg_user.id)
+
+    async def _batch(self, pg_sessions, pg_user, operations):
+        async with pg_sessions() as db:
+            return await crud.apply_bookmark_batch(db, pg_user.id, operations)
+
+    async def test_overlapping_updates_and_deletes(self, pg_sessions, pg_user):
+        """Тест: одновременные изменение и удаление каждой закладки не взаимоблокируются"""
+        ids = await self._create(pg_sessions, pg_user, 20)
+
+        results = await asyncio.gather(*(
+            call(pg_sessions, pg_user, bookmark_id)
+            for bookmark_id in ids
+            for call in (self._update, self._delete)
+        ))
+
+        assert all(results[1::2])
+        updated = sum(result is not None for result in results[0::2])
+        async with pg_sessions() as db:
+            stats = await crud.get_bookmark_stats(db, pg_user.id)
+            assert (stats.bookmark_count, stats.change_seq) == (0, 2 * len(ids) + updated)
+
+    async def test_overlapping_batches_updates_and_deletes(self, pg_sessions, pg_user):
+        """Тест: пакеты, изменения и удаления одних и тех же закладок не взаимоблокируются"""
+        ids = await self._create(pg_sessions, pg_user, 20)
+
+        calls = []
+        for first, second in zip(ids[0::2], ids[1::2]):
+            # Каждый пакет удаляет закладку, которую меняет другой
+            calls += [
+                self._batch(pg_sessions, pg_user, [
+                    crud.BookmarkOperation("update", first, {"title": "Batch"}),
+                    crud.BookmarkOperation("delete", second),
+                ]),
+                self._batch(pg_sessions, pg_user, [
+                    crud.BookmarkOperation("update", second, {"title": "Batch"}),
+                    crud.BookmarkOperation("delete", first),
+                ]),
+                self._update(pg_sessions, pg_user, first),
+                self._delete(pg_sessions, pg_user, second),
+            ]
+        await asyncio.gather(*calls)
+
+        async with pg_sessions() as db:
+            stats = await crud.get_bookmark_stats(db, pg_user.id)
+            assert stats.bookmark_count == 0
+            assert await crud.get_user_bookmarks(db, pg_user.id) == []
+            tombstones = await db.execute(select(func.count()).select_from(BookmarkTombstone))
+            assert tombstones.scalar_one() == len(ids)
+
+
+@pytest.fixture
+def round_trips(pg_engine):
+    """Счетчик запросов и коммитов на движке Postgres, как в benchmarks/bench_write_roundtrips.py"""
+    counter = {"count": 0}
+
+    def count(*args, **kwargs):
+        counter["count"] += 1
+
+    for name in ("before_cursor_execute", "commit"):
+        event.listen(pg_engine.sync_engine, name, count)
+    yield counter
+    for name in ("before_cursor_execute", "commit"):
+        event.remove(pg_engine.sync_engine, name, count)
+
+
+class TestPostgresRoundTrips:
+    """Тесты числа обращений к базе на одну запись"""
+
+    async def _trips(self, round_trips, operation) -> int:
+        before = round_trips["count"]
+        await operation
+        return round_trips["count"] - before
+
+    async def test_single_bookmark_writes(self, pg_sessions, pg_user, round_trips):
+        """Тест: число запросов и коммитов при создании, изменении и удалении закладки"""
+        async with pg_sessions() as db:
+            user = UserCreate(username="trips", email="trips@example.com", password="pass123")
+            # INSERT пользователя и строки статистики
+            assert await self._trips(round_trips, crud.create_user(db, user)) == 3
+
+            bookmark = await crud.create_bookmark(db, _bookmark(0), pg_user.id)
+            # UPDATE статистики и INSERT ... RETURNING
+            assert await self._trips(round_trips, crud.create_bookmark(db, _bookmark(1), pg_user.id)) == 3
+            # UPDATE статистики, UPDATE ... RETURNING и новый max_sync_version
+            assert await self._trips(round_trips, crud.update_bookmark(db, bookmark.id, pg_user.id, title="Edited")) == 4
+            # UPDATE статистики и INSERT записи об удалении с DELETE в WITH
+            assert await self._trips(round_trips, crud.delete_bookmark(db, bookmark.id, pg_user.id)) == 3
+
+    async def test_batch_and_bulk_do_not_grow_with_size(self, pg_sessions, pg_user, round_trips):
+        """Тест: пакет и массовое создание - одно число запросов при любом размере"""
+        async with pg_sessions() as db:
+            ids = [(await crud.create_bookmark(db, _bookmark(i), pg_user.id)).id for i in range(20)]
+
+            def batch(start: int, size: int):
+                return crud.apply_bookmark_batch(db, pg_user.id, [
+                    *(crud.BookmarkOperation("create", data=_bookmark(100 + start + i)) for i in range(size)),
+                    *(crud.BookmarkOperation("update", ids[start + i], {"title": "Batch"}) for i in range(size)),
+                    *(crud.BookmarkOperation("delete", ids[start + size + i]) for i in range(size)),
+                ])
+
+            assert await self._trips(round_trips, batch(0, 1)) == await self._trips(round_trips, batch(2, 6))
+
+            def bulk(start: int, size: int):
+                rows = [BookmarkImport(url=f"https://bulk{start + i}.com", title="Bulk") for i in range(size)]
+                return crud.create_bookmarks_bulk(db, rows, pg_user.id)
+
+            assert await self._trips(round_trips, bulk(0, 1)) == await self._trips(round_trips, bulk(1, 200))
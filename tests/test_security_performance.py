@@ -71,6 +71,63 @@ class TestPerformance:
         assert response.status_code == 201
         assert (end_time - start_time) < 1.0
 
+    
+    async def test_login_bcrypt_runs_off_event_loop(self, client: AsyncClient, auth_headers, test_user, monkeypatch):
+        """Тест того, что bcrypt при входе выполняется в пуле потоков, а не в event loop"""
+        import threading
+        from app import auth
+        from app.main import app
+        from app.database import get_db
+        from tests.conftest import TestSessionLocal
+        
+        # Каждому запросу своя сессия, чтобы запросы действительно шли параллельно
+        async def session_per_request():
+            async with TestSessionLocal() as session:
+                yield session
+        
+        app.dependency_overrides[get_db] = session_per_request
+        app.dependency_overrides[auth.get_read_db] = session_per_request
+        
+        started = threading.Event()
+        release = threading.Event()
+        threads = []
+        verify_password = auth.verify_password
+        
+        def blocking_verify(plain_password, hashed_password):
+            threads.append(threading.current_thread().name)
+            started.set()
+            # Пока bcrypt "считает", loop должен обслуживать другие запросы
+            release.wait(5)
+            return verify_password(plain_password, hashed_password)
+        
+        monkeypatch.setattr(auth, "verify_password", blocking_verify)
+        
+        login = asyncio.ensure_future(
+            client.post("/auth/login", json={"email": test_user.email, "password": "pass123"})
+        )
+        try:
+            assert await asyncio.to_thread(started.wait, 5)
+            
+            response = await client.get("/bookmarks/", headers=auth_headers)
+            assert response.status_code == 200
+            assert not login.done()
+        finally:
+            release.set()
+        
+        assert (await login).status_code == 200
+        assert len(threads) == 1
+        assert threads[0].startswith("password-hash")
+    
+    async def test_login_overload_returns_503(self, client: AsyncClient, test_user, monkeypatch):
+        """Тест ответа 503 при переполнении очереди хеширования"""
+        from app import auth
+        monkeypatch.setattr(auth, "_password_jobs", auth.PASSWORD_HASH_WORKERS + auth.PASSWORD_HASH_QUEUE_SIZE)
+        
+        response = await client.post("/auth/login", json={"email": test_user.email, "password": "pass123"})
+        
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == str(auth.PASSWORD_HASH_RETRY_AFTER)
+
 
 class TestErrorHandling:
     """Тесты обработки ошибок"""
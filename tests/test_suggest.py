@@ -0,0 +1,75 @@
+"""
+Тесты для индекса подсказок по префиксу
+"""
+import sys
+import os
+import pytest
+
+# Добавляем корневую директорию проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import suggest
+from app.suggest import PrefixIndex
+
+
+ROWS = [
+    (1, "Learn Git branching", "https://learngitbranching.js.org"),
+    (2, "Git book", "https://git-scm.com/book"),
+    (3, "Python docs", "https://www.python.org/doc"),
+    (4, "Pro Git", "https://git-scm.com/book/en/v2"),
+]
+
+
+class TestPrefixIndex:
+    """Тесты для PrefixIndex"""
+
+    def test_title_prefix_before_word_prefix(self):
+        """Тест: совпадение с началом заголовка выше совпадения со словом"""
+        index = PrefixIndex(ROWS, change_seq=1)
+
+        assert [row.id for row in index.lookup("gi", 10)] == [2, 1, 4]
+
+    def test_case_insensitive_and_limit(self):
+        """Тест регистра и ограничения числа подсказок"""
+        index = PrefixIndex(ROWS, change_seq=1)
+
+        assert [row.id for row in index.lookup("GIT", 2)] == [2, 1]
+
+    def test_url_host(self):
+        """Тест поиска по домену URL"""
+        index = PrefixIndex(ROWS, change_seq=1)
+
+        assert [row.id for row in index.lookup("python.o", 10)] == [3]
+        assert [row.id for row in index.lookup("scm", 10)] == []
+        assert [row.id for row in index.lookup("git-scm", 10)] == [2, 4]
+
+    def test_no_match(self):
+        """Тест префикса без совпадений"""
+        assert PrefixIndex(ROWS, change_seq=1).lookup("zzz", 10) == []
+        assert PrefixIndex([], change_seq=0).lookup("a", 10) == []
+
+
+class TestSuggestFromIndex:
+    """Тесты для suggest_from_index"""
+
+    @pytest.fixture(autouse=True)
+    def clear_indexes(self):
+        suggest.prefix_indexes.clear()
+        yield
+        suggest.prefix_indexes.clear()
+
+    async def test_index_built_lazily_and_rebuilt_on_change(self):
+        """Тест: индекс строится при первом запросе и перестраивается после записи"""
+        loads = []
+
+        async def load_rows():
+            loads.append(1)
+            return ROWS[:len(loads) + 1]
+
+        assert [row.id for row in await suggest.suggest_from_index("user", 5, "p", 10, load_rows)] == []
+        assert [row.id for row in await suggest.suggest_from_index("user", 5, "p", 10, load_rows)] == []
+        assert len(loads) == 1
+
+        # change_seq изменился: индекс строится заново
+        assert [row.id for row in await suggest.suggest_from_index("user", 6, "p", 10, load_rows)] == [3]
+        assert len(loads) == 2
@@ -0,0 +1,337 @@
+"""
+Интеграционные тесты для синхронизации
+"""
+import sys
+import os
+import json
+import asyncio
+import pytest
+from httpx import AsyncClient
+
+# Добавляем корневую директорию проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def _create(client: AsyncClient, headers: dict, count: int, prefix: str = "sync") -> list:
+    ids = []
+    for i in range(count):
+        response = await client.post(
+            "/bookmarks/",
+            json={"url": f"https://{prefix}{i}.com", "title": f"{prefix} {i}"},
+            headers=headers
+        )
+        ids.append(response.json()["id"])
+    return ids
+
+
+class TestSync:
+    """Тесты для GET /sync"""
+
+    async def test_sync_unauthorized(self, client: AsyncClient):
+        """Тест синхронизации без авторизации"""
+        response = await client.get("/sync")
+
+        assert response.status_code in [401, 403], response.text
+
+    async def test_full_sync(self, client: AsyncClient, auth_headers):
+        """Тест первой синхронизации со since=0"""
+        ids = await _create(client, auth_headers, 3)
+
+        response = await client.get("/sync", headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [bookmark["id"] for bookmark in data["bookmarks"]] == ids
+        assert data["server_version"] == 3
+        assert data["has_more"] is False
+
+    async def test_delta_since_version(self, client: AsyncClient, auth_headers):
+        """Тест получения только измененных закладок"""
+        ids = await _create(client, auth_headers, 3)
+        version = (await client.get("/sync", headers=auth_headers)).json()["server_version"]
+
+        await client.put(f"/bookmarks/{ids[0]}", json={"title": "Changed"}, headers=auth_headers)
+        new_ids = await _create(client, auth_headers, 1, prefix="new")
+
+        data = (await client.get(f"/sync?since={version}", headers=auth_headers)).json()
+
+        assert [bookmark["id"] for bookmark in data["bookmarks"]] == [ids[0], new_ids[0]]
+        assert data["bookmarks"][0]["title"] == "Changed"
+        assert data["server_version"] > version
+
+        # Повторный запрос с новой версией пуст
+        data = (await client.get(f"/sync?since={data['server_version']}", headers=auth_headers)).json()
+        assert data["bookmarks"] == []
+        assert data["has_more"] is False
+
+    async def test_paged_delta_after_import(self, client: AsyncClient, auth_headers):
+        """Тест постраничной выдачи изменений после массового импорта"""
+        data = json.dumps([{"url": f"https://imported{i}.com", "title": f"Imported {i}"} for i in range(5)])
+        await client.post("/import/json", json={"format": "json", "data": data}, headers=auth_headers)
+
+        seen = []
+        since = 0
+        for _ in range(3):
+            page = (await client.get(f"/sync?since={since}&limit=2", headers=auth_headers)).json()
+            seen.extend(bookmark["url"] for bookmark in page["bookmarks"])
+            since = page["server_version"]
+            if not page["has_more"]:
+                break
+        else:
+            pytest.fail("delta did not finish in 3 pages")
+
+        assert seen == [f"https://imported{i}.com/" for i in range(5)]
+        assert since == 5
+
+    async def test_sync_only_own_changes(self, client: AsyncClient, auth_headers, test_user_2):
+        """Тест изоляции изменений других пользователей"""
+        response = await client.post("/auth/login", json={"email": "test2@example.com", "password": "pass123"})
+        other_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await _create(client, other_headers, 2, prefix="other")
+        await _create(client, auth_headers, 1)
+
+        data = (await client.get("/sync", headers=auth_headers)).json()
+
+        assert [bookmark["url"] for bookmark in data["bookmarks"]] == ["https://sync0.com/"]
+
+    async def test_sync_invalid_params(self, client: AsyncClient, auth_headers):
+        """Тест невалидных параметров синхронизации"""
+        response = await client.get("/sync?since=-1", headers=auth_headers)
+        assert response.status_code == 422
+
+        response = await client.get("/sync?limit=5000", headers=auth_headers)
+        assert response.status_code == 422
+
+
+class TestSyncDeletions:
+    """Тесты передачи удалений и сжатия записей об удалении"""
+
+    @pytest.fixture
+    def compactor(self, client, monkeypatch):
+        """Сжатие записей об удалении на тестовой базе"""
+        from app import database, jobs
+        from tests.conftest import TestSessionLocal
+        monkeypatch.setattr(database, "AsyncSessionLocal", TestSessionLocal)
+        return jobs
+
+    async def test_deletions_in_delta(self, client: AsyncClient, auth_headers):
+        """Тест передачи удаленных закладок в порядке изменений"""
+        ids = await _create(client, auth_headers, 3)
+        version = (await client.get("/sync", headers=auth_headers)).json()["server_version"]
+
+        await client.delete(f"/bookmarks/{ids[1]}", headers=auth_headers)
+        await client.put(f"/bookmarks/{ids[0]}", json={"title": "Changed"}, headers=auth_headers)
+
+        data = (await client.get(f"/sync?since={version}&limit=1", headers=auth_headers)).json()
+        assert data["deleted_bookmarks"] == [ids[1]]
+        assert data["bookmarks"] == []
+        assert data["has_more"] is True
+
+        data = (await client.get(f"/sync?since={data['server_version']}", headers=auth_headers)).json()
+        assert data["deleted_bookmarks"] == []
+        assert [bookmark["id"] for bookmark in data["bookmarks"]] == [ids[0]]
+
+        # Полная синхронизация не содержит удаленную закладку
+        data = (await client.get("/sync", headers=auth_headers)).json()
+        assert sorted(bookmark["id"] for bookmark in data["bookmarks"]) == sorted([ids[0], ids[2]])
+
+    async def test_compaction_waits_for_all_devices(self, client: AsyncClient, auth_headers, compactor):
+        """Тест удаления записей только после синхронизации всех устройств"""
+        ids = await _create(client, auth_headers, 2)
+        for device in ("phone", "laptop"):
+            await client.get(f"/sync?device_id={device}", headers=auth_headers)
+        await client.delete(f"/bookmarks/{ids[0]}", headers=auth_headers)
+
+        data = (await client.get("/sync?since=2&device_id=phone", headers=auth_headers)).json()
+        assert data["deleted_bookmarks"] == [ids[0]]
+        await client.get(f"/sync?since={data['server_version']}&device_id=phone", headers=auth_headers)
+
+        # Ноутбук еще не получил удаление
+        assert await compactor.compact_tombstones() == 0
+
+        data = (await client.get("/sync?since=2&device_id=laptop", headers=auth_headers)).json()
+        assert data["deleted_bookmarks"] == [ids[0]]
+        await client.get(f"/sync?since={data['server_version']}&device_id=laptop", headers=auth_headers)
+
+        assert await compactor.compact_tombstones() == 1
+
+        # Клиент, отставший до сжатия, должен синхронизироваться заново
+        data = (await client.get("/sync?since=2", headers=auth_headers)).json()
+        assert data["deleted_bookmarks"] == []
+        assert data["full_resync"] is True
+
+        data = (await client.get("/sync?since=3", headers=auth_headers)).json()
+        assert data["full_resync"] is False
+
+    async def test_expired_tombstones_and_stale_devices(self, client: AsyncClient, auth_headers, compactor, monkeypatch):
+        """Тест удаления по возрасту и забывания неактивных устройств"""
+        ids = await _create(client, auth_headers, 2)
+        await client.get("/sync?device_id=old-tablet", headers=auth_headers)
+        for bookmark_id in ids:
+            await client.delete(f"/bookmarks/{bookmark_id}", headers=auth_headers)
+
+        assert await compactor.compact_tombstones() == 0
+
+        monkeypatch.setattr(compactor, "TOMBSTONE_TTL", -60)
+        monkeypatch.setattr(compactor, "TOMBSTONE_COMPACT_BATCH", 1)
+        assert await compactor.compact_tombstones() == 2
+
+        data = (await client.get("/sync?since=1&device_id=old-tablet", headers=auth_headers)).json()
+        assert data["full_resync"] is True
+
+
+    async def test_failed_compaction_logged(self, compactor, monkeypatch, caplog):
+        """Тест: ошибка сжатия попадает в журнал, следующий запуск выполняется"""
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            raise RuntimeError("database unavailable")
+
+        monkeypatch.setattr(compactor, "compact_tombstones", failing)
+        monkeypatch.setattr(compactor, "TOMBSTONE_COMPACT_INTERVAL", 0)
+        task = asyncio.create_task(compactor.compact_tombstones_periodically())
+        while calls < 2:
+            await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        assert "Tombstone compaction failed" in caplog.text
+        assert "database unavailable" in caplog.text
+
+class TestSyncResolve:
+    """Тесты для POST /sync/resolve"""
+
+    async def _synced(self, client: AsyncClient, headers: dict, count: int) -> list:
+        await _create(client, headers, count)
+        return (await client.get("/sync", headers=headers)).json()["bookmarks"]
+
+    async def test_client_resolution_applied(self, client: AsyncClient, auth_headers):
+        """Тест применения версии клиента"""
+        server = (await self._synced(client, auth_headers, 1))[0]
+        version = (await client.get("/sync", headers=auth_headers)).json()["server_version"]
+
+        response = await client.post("/sync/resolve", json={"resolutions": [{
+            "bookmark_id": server["id"],
+            "resolution": "client",
+            "client_data": {**server, "title": "From phone"},
+            "server_data": server
+        }]}, headers=auth_headers)
+
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["resolved_count"] == 1
+        assert data["results"] == [{"bookmark_id": server["id"], "status": "applied", "sync_version": server["sync_version"] + 1}]
+        assert data["sync_version"] > version
+
+        # Изменение попадает в дельту других устройств
+        delta = (await client.get(f"/sync?since={version}", headers=auth_headers)).json()
+        assert [bookmark["title"] for bookmark in delta["bookmarks"]] == ["From phone"]
+
+    async def test_resolution_without_stats_row(self, client: AsyncClient, auth_headers, test_db, test_user):
+        """Тест: разрешение и изменения работают у пользователя без строки статистики"""
+        from sqlalchemy import delete
+        from tests.test_models import TestUserBookmarkStats as BookmarkStats
+
+        server = (await self._synced(client, auth_headers, 2))[0]
+        # Пользователь, созданный до таблицы статистики
+        await test_db.execute(delete(BookmarkStats).where(BookmarkStats.user_id == str(test_user.id)))
+        await test_db.commit()
+
+        response = await client.post("/sync/resolve", json={"resolutions": [{
+            "bookmark_id": server["id"],
+            "resolution": "client",
+            "client_data": {**server, "title": "From phone"},
+            "server_data": server
+        }]}, headers=auth_headers)
+
+        assert response.status_code == 200, response.text
+        assert response.json()["resolved_count"] == 1
+
+        await test_db.execute(delete(BookmarkStats).where(BookmarkStats.user_id == str(test_user.id)))
+        await test_db.commit()
+        response = await client.put(f"/bookmarks/{server['id']}", json={"title": "Edited"}, headers=auth_headers)
+        assert response.status_code == 200
+
+        await test_db.execute(delete(BookmarkStats).where(BookmarkStats.user_id == str(test_user.id)))
+        await test_db.commit()
+        response = await client.delete(f"/bookmarks/{server['id']}", headers=auth_headers)
+        assert response.status_code in (200, 204)
+
+    async def test_stale_resolution_conflict(self, client: AsyncClient, auth_headers):
+        """Тест отказа, если закладка изменилась после получения конфликта"""
+        server = (await self._synced(client, auth_headers, 1))[0]
+        await client.put(f"/bookmarks/{server['id']}", json={"title": "Changed meanwhile"}, headers=auth_headers)
+
+        response = await client.post("/sync/resolve", json={"resolutions": [{
+            "bookmark_id": server["id"],
+            "resolution": "client",
+            "client_data": {**server, "title": "From phone"},
+            "server_data": server
+        }]}, headers=auth_headers)
+
+        data = response.json()
+        assert data["resolved_count"] == 0
+        assert data["results"][0]["status"] == "conflict"
+        assert data["results"][0]["sync_version"] == server["sync_version"] + 1
+
+        response = await client.get("/sync", headers=auth_headers)
+        assert response.json()["bookmarks"][0]["title"] == "Changed meanwhile"
+
+    async def test_batch_outcomes(self, client: AsyncClient, auth_headers):
+        """Тест пакета с разными исходами в одном запросе"""
+        synced = await self._synced(client, auth_headers, 4)
+        missing = "00000000-0000-0000-0000-000000000000"
+
+        resolutions = [
+            {"bookmark_id": bookmark["id"], "resolution": "client", "client_data": {**bookmark, "title": f"Client {i}"}}
+            for i, bookmark in enumerate(synced[:3])
+        ]
+        resolutions.append({"bookmark_id": synced[3]["id"], "resolution": "server"})
+        resolutions.append({"bookmark_id": missing, "resolution": "server"})
+
+        data = (await client.post("/sync/resolve", json={"resolutions": resolutions}, headers=auth_headers)).json()
+
+        assert [result["status"] for result in data["results"]] == ["applied"] * 3 + ["kept", "not_found"]
+        assert data["resolved_count"] == 4
+        assert data["results"][4]["sync_version"] is None
+
+        titles = {bookmark["id"]: bookmark["title"] for bookmark in (await client.get("/sync", headers=auth_headers)).json()["bookmarks"]}
+        assert [titles[bookmark["id"]] for bookmark in synced[:3]] == ["Client 0", "Client 1", "Client 2"]
+        assert titles[synced[3]["id"]] == synced[3]["title"]
+
+    async def test_other_users_bookmark_not_found(self, client: AsyncClient, auth_headers, test_user_2):
+        """Тест разрешения конфликта для чужой закладки"""
+        response = await client.post("/auth/login", json={"email": "test2@example.com", "password": "pass123"})
+        other_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        other = (await self._synced(client, other_headers, 1))[0]
+        await _create(client, auth_headers, 1)
+
+        data = (await client.post("/sync/resolve", json={"resolutions": [{
+            "bookmark_id": other["id"], "resolution": "client", "client_data": {**other, "title": "Hijacked"}
+        }]}, headers=auth_headers)).json()
+
+        assert data["results"][0]["status"] == "not_found"
+        response = await client.get("/sync", headers=other_headers)
+        assert response.json()["bookmarks"][0]["title"] == other["title"]
+
+    async def test_invalid_resolutions(self, client: AsyncClient, auth_headers):
+        """Тест невалидных пакетов разрешений"""
+        server = (await self._synced(client, auth_headers, 1))[0]
+
+        response = await client.post("/sync/resolve", json={"resolutions": [
+            {"bookmark_id": server["id"], "resolution": "server"},
+            {"bookmark_id": server["id"], "resolution": "server"}
+        ]}, headers=auth_headers)
+        assert response.status_code == 400
+
+        response = await client.post("/sync/resolve", json={"resolutions": [
+            {"bookmark_id": server["id"], "resolution": "client"}
+        ]}, headers=auth_headers)
+        assert response.status_code == 400
+
+        response = await client.post("/sync/resolve", json={"resolutions": [
+            {"bookmark_id": server["id"], "resolution": "server"}
+        ] * 1001}, headers=auth_headers)
+        assert response.status_code == 422